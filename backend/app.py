@@ -1,7 +1,8 @@
 import os
+from datetime import timedelta
 
 from dotenv import load_dotenv
-from flask import Flask, send_from_directory
+from flask import Flask, jsonify
 from flask_jwt_extended import JWTManager
 from flask_socketio import SocketIO
 from flask_cors import CORS
@@ -11,60 +12,134 @@ from pathlib import Path
 env_path = Path(__file__).parent.parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
+from utils.log import install_flask_logging, setup_logging
+from utils.static_files import send_cached_file, send_precompressed
+
 app = Flask(__name__)
 app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "dev_secret")
 app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "change-me")
+app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(
+    minutes=int(os.getenv("JWT_ACCESS_TOKEN_MINUTES", "15"))
+)
+app.config["JWT_REFRESH_TOKEN_EXPIRES"] = timedelta(
+    days=int(os.getenv("JWT_REFRESH_TOKEN_DAYS", "30"))
+)
+
+# Reject oversized request bodies before reading them (per-request overrides
+# are possible via request.max_content_length, e.g. for admin imports)
+app.config["MAX_CONTENT_LENGTH"] = int(
+    os.getenv("MAX_CONTENT_LENGTH", str(6 * 1024 * 1024))
+)
 
 # Upload folder configuration
 UPLOAD_FOLDER = Path(__file__).parent.parent / "uploads"
 UPLOAD_FOLDER.mkdir(exist_ok=True)
 
+# Production frontend build (python build_frontend.py)
+FRONTEND_DIST = Path(__file__).parent.parent / "frontend" / "dist"
 
-CORS(app, resources={r"/*": {"origins": "*"}})
 
+CORS(app, resources={r"/*": {"origins": "*"}})
 
 jwt = JWTManager(app)
+
 socketio = SocketIO(app, cors_allowed_origins="*")
 
+_bootstrapped = False
+
+
+def create_app():
+    """Wire up logging, blueprints, socket events and background jobs.
+
+    Importing this module has no side effects: worker processes (e.g. the
+    password hashing pool, which re-imports the main module) must not start
+    a second copy of the spool drainer, schedulers or table setup. Returns
+    (app, socketio); calling it again is a no-op.
+    """
+    global _bootstrapped
+    if _bootstrapped:
+        return app, socketio
+    _bootstrapped = True
+
+    # Queue-backed structured logging (LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE_RATES)
+    setup_logging()
+    install_flask_logging(app)
+
+    try:
+        from utils.metrics import install_flask_metrics
+
+        install_flask_metrics(app)
+    except Exception as e:
+        print("Warning: failed to install request metrics:", e)
 
-try:
-    from routes.auth_routes import auth_bp
+    try:
+        from models.revoked_token_model import is_token_revoked, start_revocation_sync
 
-    app.register_blueprint(auth_bp, url_prefix="/auth")
-except Exception as e:
+        @jwt.token_in_blocklist_loader
+        def check_if_token_revoked(jwt_header, jwt_payload):
+            return is_token_revoked(jwt_payload.get("jti"))
 
-    print("Warning: failed to register auth blueprint:", e)
+        start_revocation_sync()
+    except Exception as e:
+        print("Warning: failed to set up token revocation:", e)
 
-try:
-    from routes.health_routes import health_bp
+    try:
+        from routes.auth_routes import auth_bp
 
-    app.register_blueprint(health_bp)
-except Exception as e:
-    print("Warning: failed to register health blueprint:", e)
+        app.register_blueprint(auth_bp, url_prefix="/auth")
+    except Exception as e:
+        print("Warning: failed to register auth blueprint:", e)
 
-try:
-    from routes.chat_routes import chat_bp
+    try:
+        from routes.health_routes import health_bp
 
-    app.register_blueprint(chat_bp, url_prefix="/chat")
-except Exception as e:
-    print("Warning: failed to register chat blueprint:", e)
+        app.register_blueprint(health_bp)
+    except Exception as e:
+        print("Warning: failed to register health blueprint:", e)
 
-try:
-    from routes.profile_routes import profile_bp
+    try:
+        from routes.chat_routes import chat_bp
 
-    app.register_blueprint(profile_bp, url_prefix="/profile")
-except Exception as e:
-    print("Warning: failed to register profile blueprint:", e)
+        app.register_blueprint(chat_bp, url_prefix="/chat")
+    except Exception as e:
+        print("Warning: failed to register chat blueprint:", e)
 
+    try:
+        from routes.profile_routes import profile_bp
 
-try:
-    from sockets.chat_events import register_socket_events
+        app.register_blueprint(profile_bp, url_prefix="/profile")
+    except Exception as e:
+        print("Warning: failed to register profile blueprint:", e)
 
-    register_socket_events(socketio)
-except Exception as e:
-    print("Warning: failed to register socket events:", e)
+    try:
+        from routes.admin_routes import admin_bp
 
-# (AI events removed)
+        app.register_blueprint(admin_bp, url_prefix="/admin")
+    except Exception as e:
+        print("Warning: failed to register admin blueprint:", e)
+
+    try:
+        from sockets.chat_events import register_socket_events
+
+        register_socket_events(socketio)
+    except Exception as e:
+        print("Warning: failed to register socket events:", e)
+
+    # (AI events removed)
+
+    try:
+        from utils.retention import start_retention_scheduler
+
+        start_retention_scheduler()
+    except Exception as e:
+        print("Warning: failed to start message retention scheduler:", e)
+
+    return app, socketio
+
+
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({"message": "request body too large"}), 413
 
 
 @app.route("/")
@@ -74,9 +149,17 @@ def home():
 
 @app.route("/uploads/<path:filename>")
 def uploaded_file(filename):
-    """Serve uploaded files (avatars, etc.)."""
-    return send_from_directory(str(UPLOAD_FOLDER), filename)
+    """Serve uploaded files (avatars, etc.) with long-lived caching for hashed names."""
+    return send_cached_file(UPLOAD_FOLDER, filename)
+
+
+@app.route("/app/", defaults={"filename": "index.html"})
+@app.route("/app/<path:filename>")
+def frontend_asset(filename):
+    """Serve the built frontend, precompressed and with immutable caching for hashed assets."""
+    return send_precompressed(FRONTEND_DIST, filename)
 
 
 if __name__ == "__main__":
+    create_app()
     socketio.run(app, host="0.0.0.0", port=5000, debug=True)
@@ -1,16 +1,22 @@
 import os
+import time
 from typing import Optional
 from pathlib import Path
 
-import mysql.connector
-from mysql.connector import Error
 from dotenv import load_dotenv
 
+from utils.circuit_breaker import CircuitBreaker, backoff_delay
+
 # Load .env from backend directory
 backend_dir = Path(__file__).parent.parent
 env_path = backend_dir / ".env"
 load_dotenv(dotenv_path=env_path)
 
+# Connect attempts after the first one, with jittered exponential backoff
+DB_CONNECT_RETRIES = int(os.getenv("DB_CONNECT_RETRIES", "1"))
+DB_RETRY_BASE_SECONDS = float(os.getenv("DB_RETRY_BASE_MS", "50")) / 1000
+DB_RETRY_CAP_SECONDS = float(os.getenv("DB_RETRY_CAP_MS", "500")) / 1000
+
 
 def _get_env(name: str, fallback: Optional[str] = None) -> Optional[str]:
     """Read env var with optional fallback key name.
@@ -38,35 +44,61 @@ def _get_env(name: str, fallback: Optional[str] = None) -> Optional[str]:
     return fallback
 
 
-def get_connection():
-    """Create a new MySQL connection using environment variables.
+def _probe_database() -> bool:
+    """Health probe for db_breaker: open a connection and run SELECT 1."""
+    from models.storage import get_storage
+
+    conn = get_storage().connect()
+    if not conn:
+        return False
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+            cur.fetchone()
+        return True
+    finally:
+        conn.close()
+
+
+# Opens after DB_BREAKER_FAILURES consecutive failed connects; see utils.circuit_breaker
+db_breaker = CircuitBreaker(
+    "database",
+    _probe_database,
+    failure_threshold=int(os.getenv("DB_BREAKER_FAILURES", "3")),
+    probe_interval=float(os.getenv("DB_PROBE_INTERVAL_SECONDS", "2")),
+)
 
-    Env keys supported (preferred): MYSQL_HOST, MYSQL_PORT, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DB
+
+def get_connection(read_only: bool = False):
+    """Open a database connection on the backend selected by DB_BACKEND.
+
+    ``mysql`` (default) connects to a MySQL server. Env keys supported
+    (preferred): MYSQL_HOST, MYSQL_PORT, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DB
     Also supported (fallback): DATABASE_HOST, DATABASE_PORT, DATABASE_USER, DATABASE_PASSWORD, DATABASE_NAME
+
+    ``sqlite`` opens the embedded database at SQLITE_PATH (see models.storage).
+    Returns None when the database is unavailable.
+
+    Pass ``read_only=True`` from functions that only read and can tolerate
+    replication lag; with MYSQL_REPLICAS set they are served by a replica
+    unless the session wrote recently (see models.replicas).
+
+    A failed connect is retried DB_CONNECT_RETRIES times with jittered
+    backoff. Repeated failures open db_breaker, after which this returns None
+    immediately until a background probe finds the database healthy again.
     """
-    host = _get_env("MYSQL_HOST", "127.0.0.1")
-    port = int(_get_env("MYSQL_PORT", "3306") or 3306)
-    user = _get_env("MYSQL_USER", "root")
-    password = _get_env("MYSQL_PASSWORD", "")
-    database = _get_env("MYSQL_DB")
+    from models.storage import get_storage
 
-    try:
-        # Build connection parameters (only include auth_plugin if it's set)
-        conn_params = {
-            "host": host,
-            "port": port,
-            "user": user,
-            "password": password,
-            "database": database,
-        }
-
-        # Only add auth_plugin if it's explicitly set in env
-        auth_plugin = os.getenv("MYSQL_AUTH_PLUGIN")
-        if auth_plugin:
-            conn_params["auth_plugin"] = auth_plugin
-
-        connection = mysql.connector.connect(**conn_params)
-        return connection
-    except Error as e:
-        print("Error connecting to MySQL:", e)
-        return None
+    storage = get_storage()
+    attempt = 0
+    while db_breaker.allow():
+        conn = storage.connect(read_only)
+        if conn is not None:
+            db_breaker.record_success()
+            return conn
+        if attempt >= DB_CONNECT_RETRIES:
+            db_breaker.record_failure()
+            break
+        time.sleep(backoff_delay(attempt, DB_RETRY_BASE_SECONDS, DB_RETRY_CAP_SECONDS))
+        attempt += 1
+    return None
@@ -0,0 +1,131 @@
+"""Compressed on-disk archive for messages moved out of the hot tables.
+
+Each conversation (a room or a private room key) has a directory of segment
+files; a segment is a gzip-compressed NDJSON file holding a contiguous run of
+messages in id order, named after its first and last message id::
+
+    archive/rooms/<room_id>/<first_id>-<last_id>.ndjson.gz
+    archive/dms/<room_key>/<first_id>-<last_id>.ndjson.gz
+
+Segments are written to a temporary file, fsynced and renamed into place, so
+readers never see a partial segment. History reads fall through to the
+archive once the hot table runs out of older messages.
+"""
+
+import gzip
+import json
+import os
+import re
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+ARCHIVE_DIR = Path(
+    os.getenv("MESSAGE_ARCHIVE_DIR", Path(__file__).parent.parent.parent / "archive")
+)
+
+_SEGMENT_NAME = re.compile(r"^(\d+)-(\d+)\.ndjson\.gz$")
+_SAFE_KEY = re.compile(r"^[A-Za-z0-9_]+$")
+
+
+def _conversation_dir(kind: str, key) -> Path:
+    key = str(key)
+    if kind not in ("rooms", "dms") or not _SAFE_KEY.match(key):
+        raise ValueError(f"invalid archive conversation {kind}/{key}")
+    return ARCHIVE_DIR / kind / key
+
+
+def _encode(row: Dict) -> str:
+    record = {}
+    for field, value in row.items():
+        record[field] = value.isoformat() if isinstance(value, datetime) else value
+    return json.dumps(record, separators=(",", ":"))
+
+
+def _decode(line: str) -> Dict:
+    record = json.loads(line)
+    if record.get("timestamp"):
+        record["timestamp"] = datetime.fromisoformat(record["timestamp"])
+    return record
+
+
+def write_segment(kind: str, key, rows: List[Dict]) -> Optional[Path]:
+    """Durably write ``rows`` (ascending id) as one segment and return its path."""
+    if not rows:
+        return None
+    directory = _conversation_dir(kind, key)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    path = directory / f"{rows[0]['id']:012d}-{rows[-1]['id']:012d}.ndjson.gz"
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as gz:
+            for row in rows:
+                gz.write(_encode(row).encode("utf-8") + b"\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp_path, path)
+
+    # Make the rename itself durable
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+    return path
+
+
+def list_segments(kind: str, key) -> List[Tuple[int, int, Path]]:
+    """Return (first_id, last_id, path) for a conversation's segments, oldest first."""
+    directory = _conversation_dir(kind, key)
+    if not directory.is_dir():
+        return []
+    segments = []
+    for entry in directory.iterdir():
+        match = _SEGMENT_NAME.match(entry.name)
+        if match:
+            segments.append((int(match.group(1)), int(match.group(2)), entry))
+    segments.sort()
+    return segments
+
+
+def _read_segment(path: Path) -> List[Dict]:
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        return [_decode(line) for line in fh if line.strip()]
+
+
+def read_before(kind: str, key, before_id: Optional[int], limit: int) -> List[Dict]:
+    """Return up to ``limit`` archived messages with id < before_id, newest first."""
+    rows: List[Dict] = []
+    seen = set()
+    for first_id, _, path in reversed(list_segments(kind, key)):
+        if before_id is not None and first_id >= before_id:
+            continue
+        for row in reversed(_read_segment(path)):
+            if before_id is not None and row["id"] >= before_id:
+                continue
+            # A segment rewritten after an interrupted run may repeat ids
+            if row["id"] in seen:
+                continue
+            seen.add(row["id"])
+            rows.append(row)
+        if len(rows) >= limit:
+            break
+    rows.sort(key=lambda row: row["id"], reverse=True)
+    return rows[:limit]
+
+
+def iter_archive(kind: str, key) -> Iterator[Dict]:
+    """Yield every archived message of a conversation in id order."""
+    last_id = 0
+    for _, _, path in list_segments(kind, key):
+        for row in _read_segment(path):
+            if row["id"] > last_id:
+                last_id = row["id"]
+                yield row
+
+
+def delete_archive(kind: str, key) -> None:
+    """Remove every archived segment of a conversation."""
+    shutil.rmtree(_conversation_dir(kind, key), ignore_errors=True)
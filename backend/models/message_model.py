@@ -1,5 +1,10 @@
 import mysql.connector
 from config.database import get_connection
+from utils.metrics import db_timed
+from models import message_archive
+from models.user_model import get_users_by_ids
+
+PREVIEW_LENGTH = 200
 
 
 def init_messages_table():
@@ -18,12 +23,16 @@ def init_messages_table():
                 user_id INT NOT NULL,
                 content TEXT NOT NULL,
                 deleted BOOLEAN DEFAULT FALSE,
+                deleted_at TIMESTAMP NULL,
                 timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                idempotency_key CHAR(32) NULL,
                 FOREIGN KEY (room_id) REFERENCES rooms(id) ON DELETE CASCADE,
                 FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
                 INDEX idx_room_id (room_id),
                 INDEX idx_user_id (user_id),
-                INDEX idx_timestamp (timestamp)
+                INDEX idx_timestamp (timestamp),
+                UNIQUE INDEX uq_idempotency_key (idempotency_key),
+                FULLTEXT INDEX ft_content (content)
             )
         """
         )
@@ -42,6 +51,37 @@ def init_messages_table():
             # Column might already exist, ignore error
             pass
 
+        # When a message was deleted; tombstones are purged a grace period after it
+        try:
+            cursor.execute(
+                "ALTER TABLE messages ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP NULL"
+            )
+            conn.commit()
+        except mysql.connector.Error:
+            # Column might already exist, ignore error
+            pass
+
+        # Add the spool's idempotency key to existing tables
+        try:
+            cursor.execute(
+                "ALTER TABLE messages ADD COLUMN IF NOT EXISTS idempotency_key CHAR(32) NULL"
+            )
+            cursor.execute(
+                "ALTER TABLE messages ADD UNIQUE INDEX uq_idempotency_key (idempotency_key)"
+            )
+            conn.commit()
+        except mysql.connector.Error:
+            # Column or index might already exist, ignore error
+            pass
+
+        # Add the full-text index used by message search to existing tables
+        try:
+            cursor.execute("ALTER TABLE messages ADD FULLTEXT INDEX ft_content (content)")
+            conn.commit()
+        except mysql.connector.Error:
+            # Index might already exist, ignore error
+            pass
+
         cursor.close()
         conn.close()
         return True
@@ -52,33 +92,71 @@ def init_messages_table():
         return False
 
 
-def create_message(room_id: int, user_id: int, content: str):
-    """Create a new message in a room."""
-    conn = get_connection()
-    if not conn:
-        return None
-
+def _insert_message(conn, room_id, user_id, content, timestamp, idempotency_key):
+    """Insert a message and return its row (None if it is no longer in the hot
+    table). Raises mysql.connector.Error."""
+    cursor = conn.cursor(dictionary=True)
     try:
-        cursor = conn.cursor(dictionary=True)
         cursor.execute(
-            "INSERT INTO messages (room_id, user_id, content) VALUES (%s, %s, %s)",
-            (room_id, user_id, content),
+            "INSERT INTO messages (room_id, user_id, content, timestamp, idempotency_key) "
+            "VALUES (%s, %s, %s, COALESCE(%s, CURRENT_TIMESTAMP), %s)",
+            (room_id, user_id, content, timestamp, idempotency_key),
         )
-        conn.commit()
         message_id = cursor.lastrowid
 
+        # Keep the room summary in step with the insert (same transaction)
         cursor.execute(
             """
-            SELECT m.id, m.room_id, m.user_id, m.content, m.timestamp,
-                   u.first_name, u.last_name, u.email, u.avatar_url
-            FROM messages m
-            JOIN users u ON m.user_id = u.id
-            WHERE m.id = %s
+            UPDATE rooms
+            SET last_message_id = %s, last_message_preview = %s,
+                message_count = message_count + 1, last_activity_at = CURRENT_TIMESTAMP
+            WHERE id = %s
             """,
-            (message_id,),
+            (message_id, content[:PREVIEW_LENGTH], room_id),
         )
-        message = cursor.fetchone()
-        cursor.close()
+        conn.commit()
+    except mysql.connector.Error as err:
+        if idempotency_key is None or getattr(err, "errno", None) != 1062:
+            raise
+        # Stored by an earlier attempt: return that message
+        conn.rollback()
+        cursor.execute(
+            "SELECT id FROM messages WHERE idempotency_key = %s", (idempotency_key,)
+        )
+        existing = cursor.fetchone()
+        message_id = existing["id"] if existing else None
+
+    cursor.execute(
+        """
+        SELECT m.id, m.room_id, m.user_id, m.content, m.timestamp,
+               u.first_name, u.last_name, u.email, u.avatar_url
+        FROM messages m
+        JOIN users u ON m.user_id = u.id
+        WHERE m.id = %s
+        """,
+        (message_id,),
+    )
+    message = cursor.fetchone()
+    cursor.close()
+    return message
+
+
+@db_timed
+def create_message(
+    room_id: int, user_id: int, content: str, timestamp=None, idempotency_key: str = None
+):
+    """Create a new message in a room.
+
+    ``timestamp`` overrides the database clock and ``idempotency_key`` makes
+    the insert safe to repeat: a key that is already stored returns the
+    existing message instead of adding a second one.
+    """
+    conn = get_connection()
+    if not conn:
+        return None
+
+    try:
+        message = _insert_message(conn, room_id, user_id, content, timestamp, idempotency_key)
         conn.close()
         return message
     except mysql.connector.Error as err:
@@ -88,40 +166,105 @@ def create_message(room_id: int, user_id: int, content: str):
         return None
 
 
-def get_room_messages(room_id: int, limit: int = 50):
-    """Get messages for a specific room."""
+# Lock wait timeout and deadlock: the next attempt can succeed
+RETRYABLE_ERRNOS = {1205, 1213}
+
+
+@db_timed
+def store_spooled_message(room_id: int, user_id: int, content: str, timestamp, idempotency_key: str):
+    """Store a message drained from the local spool (see utils.message_spool).
+
+    Returns (True, message) once it is stored (message is None if it has since
+    been archived) and (False, None) when the database is unreachable or the
+    failure is transient, so the drainer should retry. Raises
+    mysql.connector.Error when the message itself can never be stored, e.g.
+    its room or author no longer exists.
+    """
     conn = get_connection()
+    if not conn:
+        return False, None
+
+    try:
+        return True, _insert_message(conn, room_id, user_id, content, timestamp, idempotency_key)
+    except (mysql.connector.OperationalError, mysql.connector.InterfaceError) as err:
+        print(f"Error storing spooled message, will retry: {err}")
+        return False, None
+    except mysql.connector.Error as err:
+        if getattr(err, "errno", None) in RETRYABLE_ERRNOS:
+            print(f"Error storing spooled message, will retry: {err}")
+            return False, None
+        raise
+    finally:
+        conn.close()
+
+
+@db_timed
+def get_room_messages(room_id: int, limit: int = 50, before_id: int = None):
+    """Get messages for a specific room, oldest first.
+
+    Returns the newest ``limit`` messages, or those older than ``before_id``
+    when paging back. Once the hot table runs out, older history is read
+    from the message archive (see utils.retention).
+    """
+    conn = get_connection(read_only=True)
     if not conn:
         return []
 
     try:
         cursor = conn.cursor(dictionary=True)
-        cursor.execute(
-            """
+        query = """
             SELECT m.id, m.room_id, m.user_id, m.content, m.deleted, m.timestamp,
                    u.first_name, u.last_name, u.email, u.avatar_url
             FROM messages m
             JOIN users u ON m.user_id = u.id
             WHERE m.room_id = %s
-            ORDER BY m.timestamp DESC
-            LIMIT %s
-            """,
-            (room_id, limit),
-        )
+        """
+        params = [room_id]
+        if before_id is not None:
+            query += " AND m.id < %s"
+            params.append(before_id)
+        query += " ORDER BY m.id DESC LIMIT %s"
+        params.append(limit)
+        cursor.execute(query, tuple(params))
         messages = cursor.fetchall()
         cursor.close()
         conn.close()
-
-        return list(reversed(messages))
     except mysql.connector.Error as err:
         print(f"Error fetching messages: {err}")
         if conn:
             conn.close()
         return []
 
+    if len(messages) < limit:
+        oldest = messages[-1]["id"] if messages else before_id
+        messages += _archived_room_messages(room_id, oldest, limit - len(messages))
+
+    return list(reversed(messages))
+
 
+def _archived_room_messages(room_id: int, before_id, limit: int):
+    """Read older room messages from the archive, joined with current user fields."""
+    try:
+        archived = message_archive.read_before("rooms", int(room_id), before_id, limit)
+    except (OSError, ValueError) as err:
+        print(f"Error reading message archive: {err}")
+        return []
+    if not archived:
+        return []
+
+    users = get_users_by_ids(row["user_id"] for row in archived)
+    for row in archived:
+        user = users.get(row["user_id"], {})
+        row["first_name"] = user.get("first_name")
+        row["last_name"] = user.get("last_name")
+        row["email"] = user.get("email")
+        row["avatar_url"] = user.get("avatar_url")
+    return archived
+
+
+@db_timed
 def delete_message(message_id: int):
-    """Mark a message as deleted by ID."""
+    """Mark a message as deleted by ID and update its room's summary."""
     conn = get_connection()
     if not conn:
         return False
@@ -129,11 +272,52 @@ def delete_message(message_id: int):
     try:
         cursor = conn.cursor()
         cursor.execute(
-            "UPDATE messages SET deleted = TRUE, content = '' WHERE id = %s",
+            "SELECT room_id FROM messages WHERE id = %s AND deleted = FALSE FOR UPDATE",
+            (message_id,),
+        )
+        row = cursor.fetchone()
+        if not row:
+            conn.rollback()
+            cursor.close()
+            conn.close()
+            return False
+        room_id = row[0]
+
+        cursor.execute(
+            "UPDATE messages SET deleted = TRUE, content = '', deleted_at = CURRENT_TIMESTAMP "
+            "WHERE id = %s",
             (message_id,),
         )
-        conn.commit()
         affected = cursor.rowcount
+
+        cursor.execute(
+            "UPDATE rooms SET message_count = GREATEST(message_count - 1, 0) WHERE id = %s",
+            (room_id,),
+        )
+        # If the latest message went away, point the summary at the one before it
+        cursor.execute(
+            """
+            SELECT id, content FROM messages
+            WHERE room_id = %s AND deleted = FALSE
+            ORDER BY id DESC
+            LIMIT 1
+            """,
+            (room_id,),
+        )
+        previous = cursor.fetchone()
+        cursor.execute(
+            """
+            UPDATE rooms SET last_message_id = %s, last_message_preview = %s
+            WHERE id = %s AND last_message_id = %s
+            """,
+            (
+                previous[0] if previous else None,
+                previous[1][:PREVIEW_LENGTH] if previous else None,
+                room_id,
+                message_id,
+            ),
+        )
+        conn.commit()
         cursor.close()
         conn.close()
         return affected > 0
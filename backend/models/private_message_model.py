@@ -4,6 +4,12 @@ import mysql.connector
 from mysql.connector import Error
 
 from config.database import get_connection
+from utils.log import get_logger
+from utils.metrics import db_timed
+from models import message_archive
+from models.user_model import get_users_by_ids
+
+logger = get_logger("models")
 
 
 def init_private_messages_table() -> bool:
@@ -23,6 +29,7 @@ def init_private_messages_table() -> bool:
                 receiver_id INT NOT NULL,
                 content TEXT NOT NULL,
                 deleted BOOLEAN DEFAULT FALSE,
+                deleted_at TIMESTAMP NULL,
                 read_status BOOLEAN DEFAULT FALSE,
                 timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (sender_id) REFERENCES users(id) ON DELETE CASCADE,
@@ -30,7 +37,8 @@ def init_private_messages_table() -> bool:
                 INDEX idx_room_key (room_key),
                 INDEX idx_sender (sender_id),
                 INDEX idx_receiver (receiver_id),
-                INDEX idx_pm_timestamp (timestamp)
+                INDEX idx_pm_timestamp (timestamp),
+                FULLTEXT INDEX ft_pm_content (content)
             ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
             """
         )
@@ -48,6 +56,26 @@ def init_private_messages_table() -> bool:
         except Error:
             # Column might already exist, ignore error
             pass
+
+        # When a message was deleted; tombstones are purged a grace period after it
+        try:
+            cur.execute(
+                "ALTER TABLE private_messages ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP NULL"
+            )
+            conn.commit()
+        except Error:
+            # Column might already exist, ignore error
+            pass
+
+        # Add the full-text index used by message search to existing tables
+        try:
+            cur.execute(
+                "ALTER TABLE private_messages ADD FULLTEXT INDEX ft_pm_content (content)"
+            )
+            conn.commit()
+        except Error:
+            # Index might already exist, ignore error
+            pass
         conn.commit()
         cur.close()
         conn.close()
@@ -59,6 +87,7 @@ def init_private_messages_table() -> bool:
         return False
 
 
+@db_timed
 def create_private_message(
     room_key: str, sender_id: int, receiver_id: int, content: str
 ) -> Optional[Dict]:
@@ -100,37 +129,72 @@ def create_private_message(
         return None
 
 
-def get_private_messages(room_key: str, limit: int = 50) -> List[Dict]:
-    """Fetch private messages for the room_key ordered by time ascending (oldest first)."""
-    conn = get_connection()
+@db_timed
+def get_private_messages(
+    room_key: str, limit: int = 50, before_id: Optional[int] = None
+) -> List[Dict]:
+    """Fetch private messages for the room_key ordered by time ascending (oldest first).
+
+    Pass ``before_id`` to page back; older history is read through from the
+    message archive once the hot table runs out.
+    """
+    conn = get_connection(read_only=True)
     if not conn:
         return []
     try:
         cur = conn.cursor(dictionary=True)
-        cur.execute(
-            """
+        query = """
             SELECT pm.id, pm.room_key, pm.sender_id, pm.receiver_id, pm.content, pm.deleted, pm.read_status, pm.timestamp,
                    u.first_name, u.last_name, u.email, u.avatar_url
             FROM private_messages pm
             JOIN users u ON pm.sender_id = u.id
             WHERE pm.room_key = %s
-            ORDER BY pm.timestamp DESC
-            LIMIT %s
-            """,
-            (room_key, limit),
-        )
+        """
+        params = [room_key]
+        if before_id is not None:
+            query += " AND pm.id < %s"
+            params.append(before_id)
+        query += " ORDER BY pm.id DESC LIMIT %s"
+        params.append(limit)
+        cur.execute(query, tuple(params))
         rows = cur.fetchall()
         cur.close()
         conn.close()
-        # Return in chronological order (oldest first)
-        return list(reversed(rows))
     except Error as e:
         print("Error fetching private messages:", e)
         if conn:
             conn.close()
         return []
 
+    if len(rows) < limit:
+        oldest = rows[-1]["id"] if rows else before_id
+        rows += _archived_private_messages(room_key, oldest, limit - len(rows))
+
+    # Return in chronological order (oldest first)
+    return list(reversed(rows))
+
+
+def _archived_private_messages(room_key: str, before_id, limit: int) -> List[Dict]:
+    """Read older private messages from the archive, joined with current sender fields."""
+    try:
+        archived = message_archive.read_before("dms", room_key, before_id, limit)
+    except (OSError, ValueError) as e:
+        print("Error reading message archive:", e)
+        return []
+    if not archived:
+        return []
+
+    users = get_users_by_ids(row["sender_id"] for row in archived)
+    for row in archived:
+        user = users.get(row["sender_id"], {})
+        row["first_name"] = user.get("first_name")
+        row["last_name"] = user.get("last_name")
+        row["email"] = user.get("email")
+        row["avatar_url"] = user.get("avatar_url")
+    return archived
 
+
+@db_timed
 def mark_messages_as_read(room_key: str, user_id: int) -> bool:
     """Mark all messages in a room as read for a specific user (receiver).
 
@@ -158,7 +222,10 @@ def mark_messages_as_read(room_key: str, user_id: int) -> bool:
         affected = cur.rowcount
         cur.close()
         conn.close()
-        print(f"Marked {affected} messages as read in {room_key} for user {user_id}")
+        logger.debug(
+            "messages marked read",
+            extra={"room_id": room_key, "user_id": user_id, "count": affected},
+        )
         return True
     except Error as e:
         print("Error marking messages as read:", e)
@@ -167,6 +234,7 @@ def mark_messages_as_read(room_key: str, user_id: int) -> bool:
         return False
 
 
+@db_timed
 def get_unread_count(room_key: str, user_id: int) -> int:
     """Get the count of unread messages for a user in a specific room.
 
@@ -0,0 +1,142 @@
+"""Read-replica routing for the MySQL backend.
+
+MYSQL_REPLICAS lists read replicas as comma-separated ``host[:port]``
+entries. They use the primary's database and credentials unless
+MYSQL_REPLICA_USER / MYSQL_REPLICA_PASSWORD are set. Without it every
+connection goes to the primary, exactly as before.
+
+Model functions that only read, and can tolerate replication lag, ask for
+``get_connection(read_only=True)`` and are spread round-robin over the
+replicas. To keep read-your-writes, a commit on the primary pins its session
+(the user behind the Socket.IO event or JWT-authenticated request) to the
+primary for READ_YOUR_WRITES_SECONDS, so a sender who reloads history right
+after posting always sees their own message. A replica that fails to connect
+is skipped for REPLICA_RETRY_SECONDS; reads fall back to the primary.
+"""
+
+import contextvars
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from utils.metrics import db_read_routing
+
+
+def parse_replicas(value: str) -> List[Tuple[str, int]]:
+    """'db-r1:3306, db-r2' -> [('db-r1', 3306), ('db-r2', 3306)]"""
+    replicas = []
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        host, _, port = entry.partition(":")
+        replicas.append((host, int(port or 3306)))
+    return replicas
+
+
+REPLICAS = parse_replicas(os.getenv("MYSQL_REPLICAS", ""))
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+ENABLED = bool(REPLICAS)
+
+# Expired pins are swept once the table grows past this many sessions
+_PIN_SWEEP_SIZE = 10000
+
+_session = contextvars.ContextVar("db_session", default=None)
+_pins_lock = threading.Lock()
+_pinned_until: Dict[str, float] = {}
+_down_until: Dict[int, float] = {}
+_round_robin = itertools.count()
+
+
+@contextmanager
+def bind_session(key):
+    """Attribute the database work inside the block to ``key`` (a user id)."""
+    token = _session.set(None if key is None else str(key))
+    try:
+        yield
+    finally:
+        _session.reset(token)
+
+
+def current_session() -> Optional[str]:
+    """The bound session, else the JWT identity of the current Flask request."""
+    key = _session.get()
+    if key is not None:
+        return key
+    try:
+        from flask import has_request_context
+
+        if has_request_context():
+            from flask_jwt_extended import get_jwt_identity
+
+            identity = get_jwt_identity()
+            return None if identity is None else str(identity)
+    except (ImportError, RuntimeError):
+        # No verified JWT in this request
+        pass
+    return None
+
+
+def note_write() -> None:
+    """Pin the current session to the primary for READ_YOUR_WRITES_SECONDS."""
+    key = current_session()
+    if key is None:
+        return
+    now = time.monotonic()
+    with _pins_lock:
+        _pinned_until[key] = now + READ_YOUR_WRITES_SECONDS
+        if len(_pinned_until) > _PIN_SWEEP_SIZE:
+            for stale in [k for k, until in _pinned_until.items() if until <= now]:
+                del _pinned_until[stale]
+
+
+def is_pinned(key: Optional[str] = None) -> bool:
+    """True when the session wrote recently and must read from the primary."""
+    key = current_session() if key is None else str(key)
+    if key is None:
+        return False
+    with _pins_lock:
+        return _pinned_until.get(key, 0.0) > time.monotonic()
+
+
+def candidates() -> List[Tuple[int, Tuple[str, int]]]:
+    """Replicas to try for the next read, rotated round-robin, skipping ones marked down."""
+    now = time.monotonic()
+    start = next(_round_robin)
+    order = [(start + i) % len(REPLICAS) for i in range(len(REPLICAS))]
+    return [(i, REPLICAS[i]) for i in order if _down_until.get(i, 0.0) <= now]
+
+
+def mark_down(index: int) -> None:
+    _down_until[index] = time.monotonic() + REPLICA_RETRY_SECONDS
+
+
+def record(target: str) -> None:
+    """Count where a read-only connection was served: replica, pinned or fallback."""
+    db_read_routing.inc(target=target)
+
+
+def status() -> List[Dict]:
+    now = time.monotonic()
+    return [
+        {"host": host, "port": port, "up": _down_until.get(i, 0.0) <= now}
+        for i, (host, port) in enumerate(REPLICAS)
+    ]
+
+
+class PrimaryConnection:
+    """A primary connection that pins its session after each commit."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def commit(self):
+        self._conn.commit()
+        note_write()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
@@ -0,0 +1,217 @@
+"""Revoked JWTs (logout, used refresh tokens) with an in-memory denylist.
+
+Revocations are written to the ``revoked_tokens`` table and kept in a
+per-process dict of jti -> expiry, so REST and socket auth check revocation
+without touching the database. Other processes pick up new rows through
+sync_revoked_tokens(), run every REVOCATION_SYNC_SECONDS by
+start_revocation_sync(). Each sync reads the rows revoked since the previous
+sync started, less REVOCATION_SYNC_OVERLAP seconds (default 300): revoked_at
+is set at insert, not at commit, so a slow transaction's row can become
+visible after later ones were already synced.
+Entries are dropped once the token would have expired anyway.
+"""
+
+import os
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, Optional
+
+import mysql.connector
+from config.database import get_connection
+from models.storage import for_backend
+
+SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "30"))
+SYNC_OVERLAP_SECONDS = float(os.getenv("REVOCATION_SYNC_OVERLAP", "300"))
+
+_lock = threading.Lock()
+_denylist: Dict[str, int] = {}
+# Database time at the start of the last successful sync
+_synced_at = None
+
+
+def init_revoked_tokens_table():
+    """Create the revoked_tokens table if it doesn't exist."""
+    conn = get_connection()
+    if not conn:
+        return False
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS revoked_tokens (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                jti VARCHAR(64) NOT NULL UNIQUE,
+                user_id INT NULL,
+                token_type VARCHAR(16) NOT NULL,
+                expires_at BIGINT NOT NULL,
+                revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                INDEX idx_revoked_expires (expires_at),
+                INDEX idx_revoked_at (revoked_at)
+            )
+        """
+        )
+        conn.commit()
+
+        # Index the sync window on existing tables
+        try:
+            cursor.execute("ALTER TABLE revoked_tokens ADD INDEX idx_revoked_at (revoked_at)")
+            conn.commit()
+        except mysql.connector.Error:
+            # Index might already exist, ignore error
+            pass
+        cursor.close()
+        conn.close()
+        return True
+    except mysql.connector.Error as err:
+        print(f"Error creating revoked_tokens table: {err}")
+        if conn:
+            conn.close()
+        return False
+
+
+def revoke_token(jti: str, user_id, token_type: str, expires_at: int) -> Optional[bool]:
+    """Revoke a token by its jti.
+
+    The token joins this process's denylist only once the revocation is
+    committed, so every process agrees on whether it is revoked.
+
+    Returns: True if newly revoked, False if it already was, None on a database
+    error (the token stays valid and the caller should report the failure)
+    """
+    conn = get_connection()
+    if not conn:
+        return None
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            INSERT IGNORE INTO revoked_tokens (jti, user_id, token_type, expires_at)
+            VALUES (%s, %s, %s, %s)
+            """,
+            (jti, user_id, token_type, int(expires_at)),
+        )
+        newly_revoked = cursor.rowcount == 1
+        conn.commit()
+        cursor.close()
+        conn.close()
+    except mysql.connector.Error as err:
+        print(f"Error revoking token: {err}")
+        if conn:
+            conn.close()
+        return None
+
+    with _lock:
+        _denylist[jti] = int(expires_at)
+    return newly_revoked
+
+
+def is_token_revoked(jti) -> bool:
+    """Return True if the token has been revoked (no database access)."""
+    return bool(jti) and jti in _denylist
+
+
+def sync_revoked_tokens():
+    """Pull revocations made by other processes and drop expired entries."""
+    global _synced_at
+    now = int(time.time())
+    conn = get_connection()
+    if not conn:
+        return False
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            for_backend(
+                mysql="SELECT CURRENT_TIMESTAMP",
+                # Column-name type hint so sqlite3 returns a datetime, not a string
+                sqlite='SELECT CURRENT_TIMESTAMP AS "now [TIMESTAMP]"',
+            )
+        )
+        started_at = cursor.fetchone()[0]
+        if _synced_at is None:
+            # First sync: every revocation that still matters
+            cursor.execute(
+                "SELECT jti, expires_at FROM revoked_tokens WHERE expires_at > %s", (now,)
+            )
+        else:
+            cursor.execute(
+                """
+                SELECT jti, expires_at FROM revoked_tokens
+                WHERE revoked_at >= %s AND expires_at > %s
+                """,
+                (_synced_at - timedelta(seconds=SYNC_OVERLAP_SECONDS), now),
+            )
+        rows = cursor.fetchall()
+        cursor.close()
+        conn.close()
+    except mysql.connector.Error as err:
+        print(f"Error syncing revoked tokens: {err}")
+        if conn:
+            conn.close()
+        return False
+
+    with _lock:
+        for jti, expires_at in rows:
+            _denylist[jti] = expires_at
+        _synced_at = started_at
+        for jti in [jti for jti, exp in _denylist.items() if exp <= now]:
+            del _denylist[jti]
+    return True
+
+
+def purge_expired_tokens():
+    """Delete revocation rows for tokens that have expired anyway."""
+    conn = get_connection()
+    if not conn:
+        return 0
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            for_backend(
+                mysql="DELETE FROM revoked_tokens WHERE expires_at <= %s LIMIT 10000",
+                # SQLite builds usually lack DELETE ... LIMIT
+                sqlite="DELETE FROM revoked_tokens WHERE id IN "
+                "(SELECT id FROM revoked_tokens WHERE expires_at <= %s LIMIT 10000)",
+            ),
+            (int(time.time()),),
+        )
+        purged = cursor.rowcount
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return purged
+    except mysql.connector.Error as err:
+        print(f"Error purging revoked tokens: {err}")
+        if conn:
+            conn.close()
+        return 0
+
+
+def start_revocation_sync():
+    """Run sync_revoked_tokens() every REVOCATION_SYNC_SECONDS in a daemon thread."""
+    if SYNC_SECONDS <= 0:
+        return None
+
+    def loop():
+        runs = 0
+        while True:
+            time.sleep(SYNC_SECONDS)
+            sync_revoked_tokens()
+            runs += 1
+            if runs % 120 == 0:
+                purge_expired_tokens()
+
+    thread = threading.Thread(target=loop, name="token-revocation-sync", daemon=True)
+    thread.start()
+    return thread
+
+
+try:
+    init_revoked_tokens_table()
+    sync_revoked_tokens()
+except Exception as e:
+    print(f"Warning: Could not initialize revoked_tokens table: {e}")
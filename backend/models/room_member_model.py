@@ -0,0 +1,216 @@
+"""Persistent room membership with an in-memory index.
+
+Membership rows live in the ``room_members`` table. Every process keeps a
+copy of the table in memory (loaded at import, updated on join and leave), so
+access checks on the socket hot path are set lookups rather than queries.
+"""
+
+import threading
+from typing import Dict, List, Set
+
+import mysql.connector
+from config.database import get_connection
+from utils.metrics import db_timed
+
+_lock = threading.Lock()
+_room_index: Dict[int, Set[int]] = {}
+_user_index: Dict[int, Set[int]] = {}
+
+
+def init_room_members_table():
+    """Create the room_members table if it doesn't exist."""
+    conn = get_connection()
+    if not conn:
+        return False
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS room_members (
+                room_id INT NOT NULL,
+                user_id INT NOT NULL,
+                joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (room_id, user_id),
+                FOREIGN KEY (room_id) REFERENCES rooms(id) ON DELETE CASCADE,
+                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+                INDEX idx_member_user (user_id, room_id)
+            )
+        """
+        )
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return True
+    except mysql.connector.Error as err:
+        print(f"Error creating room_members table: {err}")
+        if conn:
+            conn.close()
+        return False
+
+
+def _index_add(room_id: int, user_id: int):
+    with _lock:
+        _room_index.setdefault(room_id, set()).add(user_id)
+        _user_index.setdefault(user_id, set()).add(room_id)
+
+
+def _index_remove(room_id: int, user_id: int):
+    with _lock:
+        _room_index.get(room_id, set()).discard(user_id)
+        _user_index.get(user_id, set()).discard(room_id)
+
+
+def load_room_members():
+    """(Re)load the in-memory membership index from the database."""
+    conn = get_connection()
+    if not conn:
+        return False
+
+    try:
+        cursor = conn.cursor(buffered=False)
+        cursor.execute(
+            """
+            SELECT rm.room_id, rm.user_id
+            FROM room_members rm
+            JOIN rooms r ON r.id = rm.room_id
+            WHERE r.deleted_at IS NULL
+            """
+        )
+        room_index: Dict[int, Set[int]] = {}
+        user_index: Dict[int, Set[int]] = {}
+        while True:
+            rows = cursor.fetchmany(5000)
+            if not rows:
+                break
+            for room_id, user_id in rows:
+                room_index.setdefault(room_id, set()).add(user_id)
+                user_index.setdefault(user_id, set()).add(room_id)
+        cursor.close()
+        conn.close()
+    except mysql.connector.Error as err:
+        print(f"Error loading room members: {err}")
+        if conn:
+            conn.close()
+        return False
+
+    with _lock:
+        _room_index.clear()
+        _room_index.update(room_index)
+        _user_index.clear()
+        _user_index.update(user_index)
+    return True
+
+
+@db_timed
+def add_room_member(room_id: int, user_id: int):
+    """Make a user a member of a room. Returns True on success."""
+    room_id, user_id = int(room_id), int(user_id)
+    if is_room_member(room_id, user_id):
+        return True
+
+    conn = get_connection()
+    if not conn:
+        return False
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT IGNORE INTO room_members (room_id, user_id) VALUES (%s, %s)",
+            (room_id, user_id),
+        )
+        conn.commit()
+        cursor.close()
+        conn.close()
+        _index_add(room_id, user_id)
+        return True
+    except mysql.connector.Error as err:
+        print(f"Error adding room member: {err}")
+        if conn:
+            conn.close()
+        return False
+
+
+@db_timed
+def remove_room_member(room_id: int, user_id: int):
+    """Remove a user's membership of a room. Returns True on success."""
+    room_id, user_id = int(room_id), int(user_id)
+    conn = get_connection()
+    if not conn:
+        return False
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "DELETE FROM room_members WHERE room_id = %s AND user_id = %s",
+            (room_id, user_id),
+        )
+        conn.commit()
+        cursor.close()
+        conn.close()
+        _index_remove(room_id, user_id)
+        return True
+    except mysql.connector.Error as err:
+        print(f"Error removing room member: {err}")
+        if conn:
+            conn.close()
+        return False
+
+
+def forget_room(room_id: int):
+    """Drop a deleted room from the in-memory index (rows go with the room's cascade)."""
+    room_id = int(room_id)
+    with _lock:
+        for user_id in _room_index.pop(room_id, set()):
+            _user_index.get(user_id, set()).discard(room_id)
+
+
+def is_room_member(room_id, user_id) -> bool:
+    """Return True if the user is a member of the room (no database access)."""
+    try:
+        return int(user_id) in _room_index.get(int(room_id), ())
+    except (TypeError, ValueError):
+        return False
+
+
+def get_room_member_count(room_id: int) -> int:
+    """Return the number of members of a room (no database access)."""
+    return len(_room_index.get(int(room_id), ()))
+
+
+@db_timed
+def get_user_rooms(user_id: int) -> List[Dict]:
+    """Get the rooms a user is a member of, most recently active first."""
+    conn = get_connection()
+    if not conn:
+        return []
+
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            """
+            SELECT r.id, r.name, r.created_at, r.last_message_id, r.last_message_preview,
+                   r.message_count, r.last_activity_at, rm.joined_at
+            FROM room_members rm
+            JOIN rooms r ON r.id = rm.room_id
+            WHERE rm.user_id = %s AND r.deleted_at IS NULL
+            ORDER BY r.last_activity_at DESC, r.id DESC
+            """,
+            (user_id,),
+        )
+        rooms = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        return rooms
+    except mysql.connector.Error as err:
+        print(f"Error fetching user rooms: {err}")
+        if conn:
+            conn.close()
+        return []
+
+
+try:
+    init_room_members_table()
+    load_room_members()
+except Exception as e:
+    print(f"Warning: Could not initialize room_members table: {e}")
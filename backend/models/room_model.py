@@ -1,5 +1,27 @@
+import bisect
+import os
+import threading
+import time
+import uuid
+
 import mysql.connector
 from config.database import get_connection
+from models import replicas
+from models.storage import for_backend
+from utils.metrics import db_timed
+
+# In-memory room directory, see get_room_directory().
+ROOM_DIRECTORY_TTL_SECONDS = float(os.getenv("ROOM_DIRECTORY_TTL_SECONDS", "60"))
+_BOOT_ID = uuid.uuid4().hex[:8]
+_directory_lock = threading.Lock()
+_directory = {
+    "rooms": None,
+    "keys": None,
+    "by_id": None,
+    "version": 0,
+    "loaded_at": 0.0,
+    "invalidated_at": float("-inf"),
+}
 
 
 def init_rooms_table():
@@ -17,12 +39,37 @@ def init_rooms_table():
                 name VARCHAR(100) NOT NULL,
                 created_by INT NOT NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_message_id INT NULL,
+                last_message_preview VARCHAR(200) NULL,
+                message_count INT NOT NULL DEFAULT 0,
+                last_activity_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                deleted_at TIMESTAMP NULL DEFAULT NULL,
+                retention_days INT NULL,
                 FOREIGN KEY (created_by) REFERENCES users(id) ON DELETE CASCADE,
-                INDEX idx_created_by (created_by)
+                INDEX idx_created_by (created_by),
+                INDEX idx_last_activity (last_activity_at)
             )
         """
         )
         conn.commit()
+
+        # Add room summary columns to existing tables
+        for statement in (
+            "ALTER TABLE rooms ADD COLUMN last_message_id INT NULL",
+            "ALTER TABLE rooms ADD COLUMN last_message_preview VARCHAR(200) NULL",
+            "ALTER TABLE rooms ADD COLUMN message_count INT NOT NULL DEFAULT 0",
+            "ALTER TABLE rooms ADD COLUMN last_activity_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP",
+            "ALTER TABLE rooms ADD INDEX idx_last_activity (last_activity_at)",
+            "ALTER TABLE rooms ADD COLUMN deleted_at TIMESTAMP NULL DEFAULT NULL",
+            "ALTER TABLE rooms ADD COLUMN retention_days INT NULL",
+        ):
+            try:
+                cursor.execute(statement)
+                conn.commit()
+            except mysql.connector.Error:
+                # Column or index might already exist, ignore error
+                pass
+
         cursor.close()
         conn.close()
         return True
@@ -33,6 +80,7 @@ def init_rooms_table():
         return False
 
 
+@db_timed
 def create_room(name: str, created_by: int):
     """Create a new chat room."""
     conn = get_connection()
@@ -48,6 +96,7 @@ def create_room(name: str, created_by: int):
         room_id = cursor.lastrowid
         cursor.close()
         conn.close()
+        invalidate_room_directory()
         return room_id
     except mysql.connector.Error as err:
         print(f"Error creating room: {err}")
@@ -56,6 +105,7 @@ def create_room(name: str, created_by: int):
         return None
 
 
+@db_timed
 def get_room_by_id(room_id: int):
     """Get a room by ID."""
     conn = get_connection()
@@ -66,11 +116,11 @@ def get_room_by_id(room_id: int):
         cursor = conn.cursor(dictionary=True)
         cursor.execute(
             """
-            SELECT r.id, r.name, r.created_at, 
+            SELECT r.id, r.name, r.created_at, r.created_by,
                    u.first_name, u.last_name, u.email as creator_email
             FROM rooms r
             JOIN users u ON r.created_by = u.id
-            WHERE r.id = %s
+            WHERE r.id = %s AND r.deleted_at IS NULL
             """,
             (room_id,),
         )
@@ -85,21 +135,23 @@ def get_room_by_id(room_id: int):
         return None
 
 
-def get_all_rooms():
-    """Get all chat rooms."""
-    conn = get_connection()
+@db_timed
+def _fetch_all_rooms(read_only: bool = True):
+    """Return every room with its creator, or None if the query failed."""
+    conn = get_connection(read_only=read_only)
     if not conn:
-        return []
+        return None
 
     try:
         cursor = conn.cursor(dictionary=True)
         cursor.execute(
             """
-            SELECT r.id, r.name, r.created_at, 
+            SELECT r.id, r.name, r.created_at, r.created_by,
                    u.first_name, u.last_name, u.email as creator_email
             FROM rooms r
             JOIN users u ON r.created_by = u.id
-            ORDER BY r.created_at DESC
+            WHERE r.deleted_at IS NULL
+            ORDER BY r.created_at DESC, r.id DESC
             """
         )
         rooms = cursor.fetchall()
@@ -110,11 +162,22 @@ def get_all_rooms():
         print(f"Error fetching rooms: {err}")
         if conn:
             conn.close()
-        return []
+        return None
+
+
+def get_all_rooms():
+    """Get all chat rooms."""
+    return _fetch_all_rooms() or []
 
 
 def delete_room(room_id: int):
-    """Delete a room by ID."""
+    """Delete a room by ID.
+
+    This removes the room and, through ON DELETE CASCADE, all of its messages
+    in one transaction. For rooms with a long history prefer
+    soft_delete_rooms() followed by purge_room(), which do the same work in
+    small chunks (see utils.room_deletion).
+    """
     conn = get_connection()
     if not conn:
         return False
@@ -126,6 +189,7 @@ def delete_room(room_id: int):
         affected = cursor.rowcount
         cursor.close()
         conn.close()
+        invalidate_room_directory()
         return affected > 0
     except mysql.connector.Error as err:
         print(f"Error deleting room: {err}")
@@ -134,6 +198,424 @@ def delete_room(room_id: int):
         return False
 
 
+def soft_delete_rooms(room_ids):
+    """Hide rooms immediately by setting deleted_at.
+
+    Returns the list of room IDs that were live and are now marked deleted.
+    """
+    room_ids = [int(room_id) for room_id in room_ids]
+    if not room_ids:
+        return []
+
+    conn = get_connection()
+    if not conn:
+        return []
+
+    try:
+        cursor = conn.cursor()
+        placeholders = ", ".join(["%s"] * len(room_ids))
+        cursor.execute(
+            f"""
+            SELECT id FROM rooms
+            WHERE id IN ({placeholders}) AND deleted_at IS NULL
+            FOR UPDATE
+            """,
+            tuple(room_ids),
+        )
+        live = [row[0] for row in cursor.fetchall()]
+        if live:
+            placeholders = ", ".join(["%s"] * len(live))
+            cursor.execute(
+                f"UPDATE rooms SET deleted_at = CURRENT_TIMESTAMP WHERE id IN ({placeholders})",
+                tuple(live),
+            )
+        conn.commit()
+        cursor.close()
+        conn.close()
+        invalidate_room_directory()
+        return live
+    except mysql.connector.Error as err:
+        print(f"Error soft-deleting rooms: {err}")
+        if conn:
+            conn.close()
+        return []
+
+
+def get_soft_deleted_room_ids():
+    """Get IDs of rooms that are marked deleted but not yet purged."""
+    conn = get_connection()
+    if not conn:
+        return []
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM rooms WHERE deleted_at IS NOT NULL ORDER BY id")
+        room_ids = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+        conn.close()
+        return room_ids
+    except mysql.connector.Error as err:
+        print(f"Error fetching deleted rooms: {err}")
+        if conn:
+            conn.close()
+        return []
+
+
+def _delete_in_chunks(cursor, conn, table, key_column, room_id, chunk_size):
+    """Delete a room's rows from ``table`` one primary-key chunk per transaction.
+
+    Yields the number of rows removed by each chunk.
+    """
+    while True:
+        cursor.execute(
+            f"""
+            SELECT {key_column} FROM {table}
+            WHERE room_id = %s
+            ORDER BY {key_column}
+            LIMIT %s
+            """,
+            (room_id, chunk_size),
+        )
+        keys = [row[0] for row in cursor.fetchall()]
+        if not keys:
+            return
+        placeholders = ", ".join(["%s"] * len(keys))
+        cursor.execute(
+            f"DELETE FROM {table} WHERE room_id = %s AND {key_column} IN ({placeholders})",
+            (room_id, *keys),
+        )
+        conn.commit()
+        yield cursor.rowcount
+
+
+def purge_room(room_id: int, chunk_size: int = 1000, pause: float = 0.0, progress=None):
+    """Permanently remove a soft-deleted room, its messages and memberships.
+
+    Messages are deleted in chunks of ``chunk_size`` rows, each in its own
+    short transaction, sleeping ``pause`` seconds between chunks so other
+    rooms' traffic keeps flowing. ``progress(purged_so_far)`` is called after
+    every chunk. Returns the number of messages purged, or None on failure.
+    """
+    conn = get_connection()
+    if not conn:
+        return None
+
+    purged = 0
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT id FROM rooms WHERE id = %s AND deleted_at IS NOT NULL", (room_id,)
+        )
+        if not cursor.fetchone():
+            # Not soft-deleted (or already gone): never purge a live room
+            cursor.close()
+            conn.close()
+            return 0
+
+        chunks = _delete_in_chunks(cursor, conn, "messages", "id", room_id, chunk_size)
+        for removed in chunks:
+            purged += removed
+            if progress:
+                progress(purged)
+            if pause:
+                time.sleep(pause)
+
+        for _ in _delete_in_chunks(
+            cursor, conn, "room_members", "user_id", room_id, chunk_size
+        ):
+            pass
+
+        # Nothing is left to cascade, so this is a single-row delete
+        cursor.execute("DELETE FROM rooms WHERE id = %s", (room_id,))
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return purged
+    except mysql.connector.Error as err:
+        print(f"Error purging room {room_id}: {err}")
+        if conn:
+            conn.close()
+        return None
+
+
+@db_timed
+def get_rooms_by_activity(limit: int = 50):
+    """Get room summaries ordered by most recent activity.
+
+    Reads the summary columns maintained by create_message/delete_message,
+    so this is a single indexed scan of the rooms table.
+    """
+    conn = get_connection(read_only=True)
+    if not conn:
+        return []
+
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            """
+            SELECT id, name, last_message_id, last_message_preview,
+                   message_count, last_activity_at
+            FROM rooms
+            WHERE deleted_at IS NULL
+            ORDER BY last_activity_at DESC, id DESC
+            LIMIT %s
+            """,
+            (limit,),
+        )
+        rooms = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        return rooms
+    except mysql.connector.Error as err:
+        print(f"Error fetching room summaries: {err}")
+        if conn:
+            conn.close()
+        return []
+
+
+def set_room_retention(room_id: int, retention_days):
+    """Set a room's retention policy in days (None uses the server default)."""
+    conn = get_connection()
+    if not conn:
+        return False
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE rooms SET retention_days = %s WHERE id = %s AND deleted_at IS NULL",
+            (retention_days, room_id),
+        )
+        conn.commit()
+        affected = cursor.rowcount
+        cursor.close()
+        conn.close()
+        return affected > 0
+    except mysql.connector.Error as err:
+        print(f"Error setting room retention: {err}")
+        if conn:
+            conn.close()
+        return False
+
+
+def get_room_retention_policies():
+    """Get (room_id, retention_days) for every live room."""
+    conn = get_connection()
+    if not conn:
+        return []
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT id, retention_days FROM rooms WHERE deleted_at IS NULL ORDER BY id"
+        )
+        policies = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        return policies
+    except mysql.connector.Error as err:
+        print(f"Error fetching room retention policies: {err}")
+        if conn:
+            conn.close()
+        return []
+
+
+_REBUILD_SUMMARIES_MYSQL = """
+    UPDATE rooms r
+    LEFT JOIN (
+        SELECT room_id, COUNT(*) AS message_count, MAX(id) AS last_message_id,
+               MAX(timestamp) AS last_activity_at
+        FROM messages
+        WHERE deleted = FALSE{messages_filter}
+        GROUP BY room_id
+    ) s ON s.room_id = r.id
+    LEFT JOIN messages m ON m.id = s.last_message_id
+    SET r.message_count = COALESCE(s.message_count, 0),
+        r.last_message_id = s.last_message_id,
+        r.last_message_preview = LEFT(m.content, 200),
+        r.last_activity_at = COALESCE(s.last_activity_at, r.created_at)
+    WHERE TRUE{rooms_filter}
+"""
+
+# SQLite has no multi-table UPDATE; UPDATE ... FROM the same aggregate instead
+_REBUILD_SUMMARIES_SQLITE = """
+    UPDATE rooms
+    SET message_count = COALESCE(s.message_count, 0),
+        last_message_id = s.last_message_id,
+        last_message_preview = SUBSTR(m.content, 1, 200),
+        last_activity_at = COALESCE(s.last_activity_at, rooms.created_at)
+    FROM rooms r
+    LEFT JOIN (
+        SELECT room_id, COUNT(*) AS message_count, MAX(id) AS last_message_id,
+               MAX(timestamp) AS last_activity_at
+        FROM messages
+        WHERE deleted = FALSE{messages_filter}
+        GROUP BY room_id
+    ) s ON s.room_id = r.id
+    LEFT JOIN messages m ON m.id = s.last_message_id
+    WHERE r.id = rooms.id{rooms_filter}
+"""
+
+
+# Rooms per rebuild statement when only some rooms are rebuilt
+_REBUILD_CHUNK = 500
+
+
+def rebuild_room_summaries(room_ids=None):
+    """Recompute room summary columns from the messages table.
+
+    Only needed once for rooms created before the summary columns existed,
+    and for rooms whose messages were bulk-loaded (pass their ids as
+    ``room_ids``); otherwise create_message/delete_message keep them up to
+    date. Without ``room_ids`` every room is rebuilt.
+    """
+    conn = get_connection()
+    if not conn:
+        return False
+
+    template = for_backend(mysql=_REBUILD_SUMMARIES_MYSQL, sqlite=_REBUILD_SUMMARIES_SQLITE)
+    if room_ids is None:
+        statements = [(template.format(messages_filter="", rooms_filter=""), ())]
+    else:
+        room_ids = sorted({int(room_id) for room_id in room_ids})
+        statements = []
+        for start in range(0, len(room_ids), _REBUILD_CHUNK):
+            chunk = tuple(room_ids[start:start + _REBUILD_CHUNK])
+            placeholders = ", ".join(["%s"] * len(chunk))
+            query = template.format(
+                messages_filter=f" AND room_id IN ({placeholders})",
+                rooms_filter=f" AND r.id IN ({placeholders})",
+            )
+            statements.append((query, chunk + chunk))
+
+    try:
+        cursor = conn.cursor()
+        for query, params in statements:
+            cursor.execute(query, params)
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return True
+    except mysql.connector.Error as err:
+        print(f"Error rebuilding room summaries: {err}")
+        if conn:
+            conn.close()
+        return False
+
+
+def _directory_key(room):
+    """Sort key that orders the directory newest first when ascending."""
+    created = room["created_at"].timestamp() if room["created_at"] else 0.0
+    return (-created, -room["id"])
+
+
+def invalidate_room_directory():
+    """Drop the cached room directory; the next read reloads it with a new version."""
+    with _directory_lock:
+        _directory["rooms"] = None
+        _directory["keys"] = None
+        _directory["by_id"] = None
+        _directory["version"] += 1
+        _directory["invalidated_at"] = time.monotonic()
+
+
+def get_room_directory():
+    """Return (rooms, version) for the cached room directory.
+
+    The directory is the result of get_all_rooms() held in memory until
+    create_room/delete_room invalidates it or ROOM_DIRECTORY_TTL_SECONDS pass
+    (which bounds staleness when several processes share one database).
+    ``version`` changes whenever the contents may have changed and is unique
+    per process start, so it can be used as an ETag. It is None when the
+    database could not be read and nothing is cached.
+    """
+    with _directory_lock:
+        fresh = time.monotonic() - _directory["loaded_at"] < ROOM_DIRECTORY_TTL_SECONDS
+        if _directory["rooms"] is not None and fresh:
+            return _directory["rooms"], f"{_BOOT_ID}-{_directory['version']}"
+        previous = _directory["rooms"]
+        version = _directory["version"]
+        # Right after a create/delete a replica may not have the change yet,
+        # and whatever is loaded now is cached for everyone until the TTL
+        settled = time.monotonic() - _directory["invalidated_at"] >= replicas.READ_YOUR_WRITES_SECONDS
+
+    # Query without the lock so readers of a fresh copy never wait on the database
+    rooms = _fetch_all_rooms(read_only=settled)
+
+    with _directory_lock:
+        if rooms is None:
+            # Keep serving the last good copy rather than an empty directory;
+            # without one there is nothing worth tagging with a version.
+            if previous is None:
+                return [], None
+            return previous, f"{_BOOT_ID}-{version}"
+        if _directory["version"] != version:
+            # Invalidated while we queried: this result may predate the change,
+            # so hand it out under the old version without caching it
+            return rooms, f"{_BOOT_ID}-{version}"
+        current = _directory["rooms"]
+        if current is not None and rooms != current:
+            _directory["version"] += 1
+        _directory["rooms"] = rooms
+        _directory["keys"] = [_directory_key(room) for room in rooms]
+        _directory["by_id"] = {room["id"]: room for room in rooms}
+        _directory["loaded_at"] = time.monotonic()
+        return rooms, f"{_BOOT_ID}-{_directory['version']}"
+
+
+def get_cached_room(room_id):
+    """Get a room from the cached directory, falling back to the database."""
+    rooms, _ = get_room_directory()
+    with _directory_lock:
+        by_id = _directory["by_id"] if _directory["rooms"] is rooms else None
+    try:
+        room = by_id.get(int(room_id)) if by_id is not None else None
+    except (TypeError, ValueError):
+        return None
+    return room or get_room_by_id(room_id)
+
+
+def encode_room_cursor(room) -> str:
+    """Return an opaque keyset cursor pointing just past ``room``."""
+    created = room["created_at"].timestamp() if room["created_at"] else 0.0
+    return f"{created:.6f}_{room['id']}"
+
+
+def list_rooms_page(cursor: str = None, limit: int = None, name: str = None):
+    """Page through the cached room directory, newest first.
+
+    Args:
+        cursor: Value of ``next_cursor`` from the previous page (optional)
+        limit: Page size; None returns every remaining room
+        name: Case-insensitive substring filter on the room name (optional)
+
+    Returns:
+        (rooms, next_cursor, version); next_cursor is None on the last page
+        and version is as described in get_room_directory().
+        Raises ValueError for a malformed cursor.
+    """
+    rooms, version = get_room_directory()
+    with _directory_lock:
+        keys = _directory["keys"] if _directory["rooms"] is rooms else None
+    if keys is None or len(keys) != len(rooms):
+        keys = [_directory_key(room) for room in rooms]
+
+    start = 0
+    if cursor:
+        created, _, room_id = cursor.partition("_")
+        start = bisect.bisect_right(keys, (-float(created), -int(room_id)))
+
+    needle = name.casefold() if name else None
+    page = []
+    for index in range(start, len(rooms)):
+        room = rooms[index]
+        if needle and needle not in room["name"].casefold():
+            continue
+        if limit is not None and len(page) == limit:
+            return page, encode_room_cursor(page[-1]), version
+        page.append(room)
+
+    return page, None, version
+
 
 try:
     init_rooms_table()
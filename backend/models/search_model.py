@@ -0,0 +1,276 @@
+"""Full-text search over room messages and private messages.
+
+Both ``messages.content`` and ``private_messages.content`` carry a MySQL
+FULLTEXT index (created by the respective ``init_*`` functions), or an FTS5
+table on the SQLite backend, so lookups go through the inverted index
+instead of scanning history with ``LIKE``.
+Results are ordered newest first and paged with keyset cursors (the smallest
+message id already returned from each source).
+"""
+
+import html
+import re
+from typing import Dict, List, Optional
+
+from mysql.connector import Error
+
+from config.database import get_connection
+from models.storage import for_backend
+from utils.metrics import db_timed
+
+SNIPPET_RADIUS = 60
+MAX_SEARCH_LIMIT = 50
+
+# Characters that carry meaning in MySQL's boolean full-text syntax.
+_BOOLEAN_OPERATORS = re.compile(r'[+\-<>()~*"@]+')
+
+
+def parse_search_terms(query: str) -> List[str]:
+    """Split a raw user query into plain search terms."""
+    cleaned = _BOOLEAN_OPERATORS.sub(" ", query or "")
+    return [term for term in cleaned.split() if term]
+
+
+def _boolean_query(terms: List[str]) -> str:
+    """Build a full-text query requiring every term (prefix match)."""
+    return for_backend(
+        mysql=" ".join(f"+{term}*" for term in terms),
+        sqlite=" ".join(f'"{term}"*' for term in terms),
+    )
+
+
+def _match(table: str, alias: str) -> str:
+    """WHERE clause for a full-text match on ``alias.content``."""
+    return for_backend(
+        mysql=f"MATCH({alias}.content) AGAINST (%s IN BOOLEAN MODE)",
+        sqlite=f"{alias}.id IN (SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH %s)",
+    )
+
+
+def private_room_key(user_a: int, user_b: int) -> str:
+    """Return the private room key used by the frontend for two users."""
+    low, high = sorted((int(user_a), int(user_b)))
+    return f"private_{low}_{high}"
+
+
+def build_snippet(content: str, terms: List[str]) -> str:
+    """Return an HTML-escaped excerpt of ``content`` with matches wrapped in <mark>."""
+    if not content:
+        return ""
+
+    pattern = re.compile(
+        "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True)),
+        re.IGNORECASE,
+    )
+    first = pattern.search(content) if terms else None
+    if first:
+        start = max(0, first.start() - SNIPPET_RADIUS)
+        end = min(len(content), first.end() + SNIPPET_RADIUS)
+    else:
+        start, end = 0, min(len(content), SNIPPET_RADIUS * 2)
+
+    excerpt = content[start:end]
+    parts = []
+    last = 0
+    if terms:
+        for match in pattern.finditer(excerpt):
+            parts.append(html.escape(excerpt[last : match.start()]))
+            parts.append(f"<mark>{html.escape(match.group(0))}</mark>")
+            last = match.end()
+    parts.append(html.escape(excerpt[last:]))
+
+    snippet = "".join(parts)
+    if start > 0:
+        snippet = "…" + snippet
+    if end < len(content):
+        snippet += "…"
+    return snippet
+
+
+def _search_room_messages(
+    cur,
+    boolean_query: str,
+    user_id: int,
+    room_id: Optional[int],
+    before_id: Optional[int],
+    limit: int,
+) -> List[Dict]:
+    # Access check: only rooms the caller is a member of are searched.
+    query = f"""
+        SELECT m.id, m.room_id, m.user_id, m.content, m.timestamp,
+               u.first_name, u.last_name, u.email, u.avatar_url
+        FROM messages m
+        JOIN room_members rm ON rm.room_id = m.room_id AND rm.user_id = %s
+        JOIN rooms r ON r.id = m.room_id AND r.deleted_at IS NULL
+        JOIN users u ON m.user_id = u.id
+        WHERE {_match("messages", "m")}
+          AND m.deleted = FALSE
+    """
+    params = [user_id, boolean_query]
+    if room_id is not None:
+        query += " AND m.room_id = %s"
+        params.append(room_id)
+    if before_id is not None:
+        query += " AND m.id < %s"
+        params.append(before_id)
+    query += " ORDER BY m.id DESC LIMIT %s"
+    params.append(limit)
+
+    cur.execute(query, tuple(params))
+    return cur.fetchall()
+
+
+def _search_private_messages(
+    cur,
+    boolean_query: str,
+    user_id: int,
+    with_user_id: Optional[int],
+    before_id: Optional[int],
+    limit: int,
+) -> List[Dict]:
+    # Access check: only conversations the caller takes part in are searched.
+    query = f"""
+        SELECT pm.id, pm.room_key, pm.sender_id, pm.receiver_id, pm.content, pm.timestamp,
+               u.first_name, u.last_name, u.email, u.avatar_url
+        FROM private_messages pm
+        JOIN users u ON pm.sender_id = u.id
+        WHERE {_match("private_messages", "pm")}
+          AND pm.deleted = FALSE
+          AND (pm.sender_id = %s OR pm.receiver_id = %s)
+    """
+    params = [boolean_query, user_id, user_id]
+    if with_user_id is not None:
+        query += " AND pm.room_key = %s"
+        params.append(private_room_key(user_id, with_user_id))
+    if before_id is not None:
+        query += " AND pm.id < %s"
+        params.append(before_id)
+    query += " ORDER BY pm.id DESC LIMIT %s"
+    params.append(limit)
+
+    cur.execute(query, tuple(params))
+    return cur.fetchall()
+
+
+@db_timed
+def search_messages(
+    user_id: int,
+    query: str,
+    scope: str = "all",
+    room_id: Optional[int] = None,
+    with_user_id: Optional[int] = None,
+    room_before: Optional[int] = None,
+    dm_before: Optional[int] = None,
+    limit: int = 20,
+) -> Dict:
+    """Search room and private message history visible to ``user_id``.
+
+    Args:
+        user_id: The searching user; results are limited to rooms they are a
+            member of and DMs they take part in
+        query: Free-text query; every term must match (prefix match)
+        scope: 'all', 'rooms' or 'dms'
+        room_id: Only search this room (implies scope 'rooms')
+        with_user_id: Only search the DM with this user (implies scope 'dms')
+        room_before: Keyset cursor, only room messages with a smaller id
+        dm_before: Keyset cursor, only private messages with a smaller id
+        limit: Page size (capped at MAX_SEARCH_LIMIT)
+
+    Returns:
+        {"results": [...], "next": {"room_before": id|None, "dm_before": id|None}}
+        Each result has "kind" ('room' or 'dm'), the message fields and a
+        highlighted "snippet". ``next`` is None when there are no more pages.
+    """
+    terms = parse_search_terms(query)
+    empty = {"results": [], "next": None}
+    if not terms:
+        return empty
+
+    limit = max(1, min(int(limit), MAX_SEARCH_LIMIT))
+    if room_id is not None:
+        scope = "rooms"
+    elif with_user_id is not None:
+        scope = "dms"
+    # A source whose cursor was not returned by the previous page is exhausted.
+    paging = room_before is not None or dm_before is not None
+    search_rooms = scope in ("all", "rooms") and (not paging or room_before is not None)
+    search_dms = scope in ("all", "dms") and (not paging or dm_before is not None)
+
+    conn = get_connection(read_only=True)
+    if not conn:
+        return empty
+
+    boolean_query = _boolean_query(terms)
+    try:
+        with conn.cursor(dictionary=True) as cur:
+            # Fetch one extra row per source to know whether it has more pages.
+            room_rows = (
+                _search_room_messages(
+                    cur, boolean_query, int(user_id), room_id, room_before, limit + 1
+                )
+                if search_rooms
+                else []
+            )
+            dm_rows = (
+                _search_private_messages(
+                    cur, boolean_query, int(user_id), with_user_id, dm_before, limit + 1
+                )
+                if search_dms
+                else []
+            )
+    except Error as e:
+        print("Error searching messages:", e)
+        return empty
+    finally:
+        conn.close()
+
+    candidates = [("room", row) for row in room_rows] + [("dm", row) for row in dm_rows]
+    candidates.sort(key=lambda item: (item[1]["timestamp"], item[1]["id"]), reverse=True)
+    page = candidates[:limit]
+
+    results = []
+    for kind, row in page:
+        result = {
+            "kind": kind,
+            "id": row["id"],
+            "content": row["content"],
+            "snippet": build_snippet(row["content"], terms),
+            "timestamp": row["timestamp"].isoformat() if row["timestamp"] else None,
+            "user": {
+                "first_name": row["first_name"],
+                "last_name": row["last_name"],
+                "email": row["email"],
+                "avatar_url": row.get("avatar_url"),
+            },
+        }
+        if kind == "room":
+            result["room_id"] = row["room_id"]
+            result["user_id"] = row["user_id"]
+        else:
+            result["room_id"] = row["room_key"]
+            result["user_id"] = row["sender_id"]
+            result["receiver_id"] = row["receiver_id"]
+        results.append(result)
+
+    # Cursor per source: the smallest id consumed on this page, or the old
+    # cursor if nothing was consumed but rows remain.
+    next_cursor = None
+    room_remaining = len(room_rows) > sum(1 for kind, _ in page if kind == "room")
+    dm_remaining = len(dm_rows) > sum(1 for kind, _ in page if kind == "dm")
+    if room_remaining or dm_remaining:
+        room_ids = [row["id"] for kind, row in page if kind == "room"]
+        dm_ids = [row["id"] for kind, row in page if kind == "dm"]
+        next_cursor = {
+            "room_before": (
+                (min(room_ids) if room_ids else (room_before or room_rows[0]["id"] + 1))
+                if room_remaining
+                else None
+            ),
+            "dm_before": (
+                (min(dm_ids) if dm_ids else (dm_before or dm_rows[0]["id"] + 1))
+                if dm_remaining
+                else None
+            ),
+        }
+
+    return {"results": results, "next": next_cursor}
@@ -0,0 +1,439 @@
+"""Storage backends behind ``config.database.get_connection``.
+
+DB_BACKEND selects the engine:
+
+- ``mysql`` (default): a MySQL server configured by MYSQL_* / DATABASE_*.
+- ``sqlite``: an embedded SQLite database in WAL mode at SQLITE_PATH
+  (default ``data/chat.db``), for single-node deployments, CI and benchmarks
+  without an external database server.
+
+Both hand the models a connection with the mysql.connector interface they
+already use (``cursor(dictionary=True)``, ``%s`` placeholders, ``lastrowid``,
+``rowcount``, mysql.connector error classes). The SQLite backend owns its
+schema (SQLITE_SCHEMA, including FTS5 indexes for message search), so the
+models' MySQL DDL is skipped there, and translates the few MySQL spellings
+the models use (INSERT IGNORE, GREATEST, FOR UPDATE). Queries that need a
+different shape per engine pick it with for_backend().
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import mysql.connector
+from mysql.connector import errors as mysql_errors
+
+from models import replicas
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql").strip().lower()
+# Relative paths are taken from the project root, like the .env.example default
+SQLITE_PATH = PROJECT_ROOT / os.getenv("SQLITE_PATH", "data/chat.db")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+
+class MySQLStorage:
+    """A new mysql.connector connection per call.
+
+    With MYSQL_REPLICAS set, read-only connections go to a replica unless the
+    session recently wrote (see models.replicas).
+    """
+
+    name = "mysql"
+
+    def _params(self):
+        from config.database import _get_env
+
+        # Build connection parameters (only include auth_plugin if it's set)
+        conn_params = {
+            "host": _get_env("MYSQL_HOST", "127.0.0.1"),
+            "port": int(_get_env("MYSQL_PORT", "3306") or 3306),
+            "user": _get_env("MYSQL_USER", "root"),
+            "password": _get_env("MYSQL_PASSWORD", ""),
+            "database": _get_env("MYSQL_DB"),
+            # Fail a connect to an unreachable server quickly; the retry and
+            # circuit breaker in config.database decide what happens next
+            "connection_timeout": int(os.getenv("MYSQL_CONNECT_TIMEOUT", "3")),
+        }
+
+        # Only add auth_plugin if it's explicitly set in env
+        auth_plugin = os.getenv("MYSQL_AUTH_PLUGIN")
+        if auth_plugin:
+            conn_params["auth_plugin"] = auth_plugin
+        return conn_params
+
+    def _connect_replica(self):
+        for index, (host, port) in replicas.candidates():
+            params = dict(self._params(), host=host, port=port)
+            params["user"] = os.getenv("MYSQL_REPLICA_USER", params["user"])
+            params["password"] = os.getenv("MYSQL_REPLICA_PASSWORD", params["password"])
+            try:
+                return mysql.connector.connect(**params)
+            except mysql.connector.Error as e:
+                print(f"Error connecting to MySQL replica {host}:{port}:", e)
+                replicas.mark_down(index)
+        return None
+
+    def connect(self, read_only=False):
+        if replicas.ENABLED and read_only:
+            if replicas.is_pinned():
+                replicas.record("pinned")
+            else:
+                conn = self._connect_replica()
+                replicas.record("replica" if conn else "fallback")
+                if conn:
+                    return conn
+
+        try:
+            conn = mysql.connector.connect(**self._params())
+        except mysql.connector.Error as e:
+            print("Error connecting to MySQL:", e)
+            return None
+        return replicas.PrimaryConnection(conn) if replicas.ENABLED else conn
+
+
+# --- SQLite --------------------------------------------------------------------
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email VARCHAR(255) NOT NULL UNIQUE,
+    password_hash VARCHAR(255) NOT NULL,
+    first_name VARCHAR(100) NOT NULL,
+    last_name VARCHAR(100) NOT NULL,
+    avatar_url TEXT NULL,
+    status VARCHAR(32) DEFAULT 'offline',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TRIGGER IF NOT EXISTS users_updated_at AFTER UPDATE ON users
+WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+    UPDATE users SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+END;
+
+CREATE TABLE IF NOT EXISTS rooms (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(100) NOT NULL,
+    created_by INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_message_id INTEGER NULL,
+    last_message_preview VARCHAR(200) NULL,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    last_activity_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    deleted_at TIMESTAMP NULL DEFAULT NULL,
+    retention_days INTEGER NULL
+);
+CREATE INDEX IF NOT EXISTS idx_created_by ON rooms (created_by);
+CREATE INDEX IF NOT EXISTS idx_last_activity ON rooms (last_activity_at);
+
+CREATE TABLE IF NOT EXISTS room_members (
+    room_id INTEGER NOT NULL REFERENCES rooms(id) ON DELETE CASCADE,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (room_id, user_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_member_user ON room_members (user_id, room_id);
+
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    room_id INTEGER NOT NULL REFERENCES rooms(id) ON DELETE CASCADE,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    content TEXT NOT NULL,
+    deleted BOOLEAN DEFAULT FALSE,
+    deleted_at TIMESTAMP NULL,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    idempotency_key CHAR(32)
+);
+CREATE INDEX IF NOT EXISTS idx_room_id ON messages (room_id);
+CREATE INDEX IF NOT EXISTS idx_user_id ON messages (user_id);
+CREATE INDEX IF NOT EXISTS idx_timestamp ON messages (timestamp);
+
+CREATE TABLE IF NOT EXISTS private_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    room_key VARCHAR(64) NOT NULL,
+    sender_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    receiver_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    content TEXT NOT NULL,
+    deleted BOOLEAN DEFAULT FALSE,
+    deleted_at TIMESTAMP NULL,
+    read_status BOOLEAN DEFAULT FALSE,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_room_key ON private_messages (room_key);
+CREATE INDEX IF NOT EXISTS idx_sender ON private_messages (sender_id);
+CREATE INDEX IF NOT EXISTS idx_receiver ON private_messages (receiver_id);
+CREATE INDEX IF NOT EXISTS idx_pm_timestamp ON private_messages (timestamp);
+
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    jti VARCHAR(64) NOT NULL UNIQUE,
+    user_id INTEGER NULL,
+    token_type VARCHAR(16) NOT NULL,
+    expires_at BIGINT NOT NULL,
+    revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_revoked_expires ON revoked_tokens (expires_at);
+CREATE INDEX IF NOT EXISTS idx_revoked_at ON revoked_tokens (revoked_at);
+"""
+
+# External-content FTS5 indexes kept in sync by triggers (message search)
+SQLITE_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5(
+    content, content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+    INSERT INTO {table}_fts (rowid, content) VALUES (NEW.id, NEW.content);
+END;
+CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+    INSERT INTO {table}_fts ({table}_fts, rowid, content) VALUES ('delete', OLD.id, OLD.content);
+END;
+CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF content ON {table} BEGIN
+    INSERT INTO {table}_fts ({table}_fts, rowid, content) VALUES ('delete', OLD.id, OLD.content);
+    INSERT INTO {table}_fts (rowid, content) VALUES (NEW.id, NEW.content);
+END;
+"""
+
+# Columns added after SQLITE_SCHEMA first shipped: (table, column, definition),
+# added to existing databases before SQLITE_LATE_INDEXES runs
+SQLITE_ADDED_COLUMNS = (
+    ("messages", "idempotency_key", "CHAR(32)"),
+    ("messages", "deleted_at", "TIMESTAMP NULL"),
+    ("private_messages", "deleted_at", "TIMESTAMP NULL"),
+)
+SQLITE_LATE_INDEXES = """
+CREATE UNIQUE INDEX IF NOT EXISTS uq_idempotency_key ON messages (idempotency_key);
+"""
+
+_DDL = re.compile(r"^\s*(CREATE|ALTER|DROP)\s", re.IGNORECASE)
+_FOR_UPDATE = re.compile(r"\s+FOR\s+UPDATE\b", re.IGNORECASE)
+_INSERT_IGNORE = re.compile(r"\bINSERT\s+IGNORE\b", re.IGNORECASE)
+_GREATEST = re.compile(r"\bGREATEST\s*\(", re.IGNORECASE)
+
+
+@lru_cache(maxsize=512)
+def _translate(statement: str) -> Optional[str]:
+    """MySQL statement -> SQLite statement, or None for DDL (the schema is ours)."""
+    if _DDL.match(statement):
+        return None
+    statement = statement.replace("%s", "?")
+    statement = _INSERT_IGNORE.sub("INSERT OR IGNORE", statement)
+    statement = _FOR_UPDATE.sub("", statement)
+    return _GREATEST.sub("MAX(", statement)
+
+
+def _mysql_error(error: sqlite3.Error) -> mysql.connector.Error:
+    """Re-raise SQLite errors as the mysql.connector errors the models catch."""
+    message = str(error)
+    if isinstance(error, sqlite3.IntegrityError):
+        if "UNIQUE" in message or "PRIMARY KEY" in message:
+            return mysql_errors.IntegrityError(msg=message, errno=1062)  # ER_DUP_ENTRY
+        if "FOREIGN KEY" in message:
+            return mysql_errors.IntegrityError(msg=message, errno=1452)  # ER_NO_REFERENCED_ROW
+        return mysql_errors.IntegrityError(msg=message)
+    if isinstance(error, sqlite3.OperationalError):
+        return mysql_errors.OperationalError(msg=message)
+    return mysql_errors.DatabaseError(msg=message)
+
+
+class _SQLiteCursor:
+    def __init__(self, cursor: sqlite3.Cursor, dictionary: bool):
+        self._cursor = cursor
+        self._dictionary = dictionary
+        self._skipped = False
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {column[0]: value for column, value in zip(self._cursor.description, row)}
+
+    def execute(self, statement, params=None):
+        translated = _translate(statement)
+        self._skipped = translated is None
+        if self._skipped:
+            return
+        try:
+            self._cursor.execute(translated, tuple(params) if params is not None else ())
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+
+    def executemany(self, statement, seq_params):
+        translated = _translate(statement)
+        self._skipped = translated is None
+        if self._skipped:
+            return
+        try:
+            self._cursor.executemany(translated, [tuple(params) for params in seq_params])
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+
+    def fetchone(self):
+        return None if self._skipped else self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [] if self._skipped else [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [] if self._skipped else [self._row(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return 0 if self._skipped else self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class _SQLiteConnection:
+    """mysql.connector-style wrapper; close() parks the connection for reuse."""
+
+    def __init__(self, storage: "SQLiteStorage", conn: sqlite3.Connection):
+        self._storage = storage
+        self._conn = conn
+
+    def cursor(self, dictionary=False, buffered=None, **kwargs):
+        return _SQLiteCursor(self._conn.cursor(), dictionary)
+
+    def commit(self):
+        try:
+            self._conn.commit()
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def is_connected(self):
+        return self._conn is not None
+
+    def close(self):
+        if self._conn is not None:
+            self._storage.release(self._conn)
+            self._conn = None
+
+
+def _parse_timestamp(value: bytes) -> datetime:
+    return datetime.fromisoformat(value.decode())
+
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("TIMESTAMP", _parse_timestamp)
+
+
+class SQLiteStorage:
+    """Embedded SQLite in WAL mode, one reusable connection per thread."""
+
+    name = "sqlite"
+
+    def __init__(self, path: Path = SQLITE_PATH):
+        self.path = Path(path)
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            str(self.path),
+            timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+            detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA foreign_keys = ON")
+        # WAL already makes commits durable against crashes; NORMAL skips the
+        # per-commit fsync of the main database file
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def _ensure_schema(self, conn: sqlite3.Connection):
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(SQLITE_SCHEMA)
+            for table, column, definition in SQLITE_ADDED_COLUMNS:
+                columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            conn.executescript(SQLITE_LATE_INDEXES)
+            for table in ("messages", "private_messages"):
+                try:
+                    conn.executescript(SQLITE_FTS_SCHEMA.format(table=table))
+                except sqlite3.OperationalError as e:
+                    print(f"Warning: SQLite full-text index for {table} unavailable:", e)
+            conn.commit()
+            self._schema_ready = True
+
+    def connect(self, read_only=False):
+        # One file, one writer: there are no replicas to route reads to
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        try:
+            if conn is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                conn = self._open()
+            if not self._schema_ready:
+                self._ensure_schema(conn)
+            return _SQLiteConnection(self, conn)
+        except (sqlite3.Error, OSError) as e:
+            print("Error opening SQLite database:", e)
+            return None
+
+    def release(self, conn: sqlite3.Connection):
+        """Drop any uncommitted work and keep the connection for this thread's next call."""
+        try:
+            conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            return
+        if getattr(self._local, "conn", None) is None:
+            self._local.conn = conn
+        else:
+            conn.close()
+
+
+_BACKENDS = {"mysql": MySQLStorage, "sqlite": SQLiteStorage}
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """The storage backend selected by DB_BACKEND."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                if DB_BACKEND not in _BACKENDS:
+                    raise ValueError(
+                        f"Unknown DB_BACKEND {DB_BACKEND!r}; expected one of {', '.join(_BACKENDS)}"
+                    )
+                _storage = _BACKENDS[DB_BACKEND]()
+    return _storage
+
+
+def for_backend(**variants):
+    """Pick the variant for the active backend, e.g. for_backend(mysql=sql, sqlite=other_sql)."""
+    return variants[get_storage().name]
@@ -1,8 +1,10 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Set, Tuple
 
 from mysql.connector import Error
 
 from config.database import get_connection
+from utils.metrics import db_timed
+from models.user_search_index import user_search_index
 
 
 def init_user_table() -> None:
@@ -34,6 +36,7 @@ def init_user_table() -> None:
         conn.close()
 
 
+@db_timed
 def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
     conn = get_connection()
     if not conn:
@@ -49,6 +52,7 @@ def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
         conn.close()
 
 
+@db_timed
 def get_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
     """Get user by ID.
 
@@ -68,16 +72,48 @@ def get_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
         conn.close()
 
 
-def create_user(
+@db_timed
+def get_users_by_ids(user_ids) -> Dict[int, Dict[str, Any]]:
+    """Get public fields for many users at once.
+
+    Returns: dict of user_id -> {id, first_name, last_name, email, avatar_url}
+    """
+    user_ids = sorted({int(user_id) for user_id in user_ids})
+    if not user_ids:
+        return {}
+    conn = get_connection()
+    if not conn:
+        return {}
+    try:
+        with conn.cursor(dictionary=True) as cur:
+            placeholders = ", ".join(["%s"] * len(user_ids))
+            cur.execute(
+                f"SELECT id, first_name, last_name, email, avatar_url FROM users WHERE id IN ({placeholders})",
+                tuple(user_ids),
+            )
+            return {row["id"]: row for row in cur.fetchall()}
+    except Error as e:
+        print("Error fetching users by ID:", e)
+        return {}
+    finally:
+        conn.close()
+
+
+@db_timed
+def register_user(
     email: str, password_hash: str, first_name: str, last_name: str
-) -> Optional[int]:
-    """Create a new user with email, password, first name, and last name.
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Insert a new user in a single statement.
 
-    Returns: user_id on success, None on failure
+    The unique index on ``email`` is the duplicate check, so there is no
+    lookup beforehand and no window for two signups with the same email.
+
+    Returns: (profile, None) on success, (None, "duplicate") if the email is
+    taken, (None, "error") on any other failure
     """
     conn = get_connection()
     if not conn:
-        return None
+        return None, "error"
     try:
         with conn.cursor() as cur:
             cur.execute(
@@ -85,18 +121,41 @@ def create_user(
                 (email, password_hash, first_name, last_name),
             )
             conn.commit()
-            return cur.lastrowid
+            user_id = cur.lastrowid
     except Error as e:
-
         if getattr(e, "errno", None) == 1062:
-            print("Duplicate email attempted:", email)
-            return None
+            return None, "duplicate"
         print("Error creating user:", e)
-        return None
+        return None, "error"
     finally:
         conn.close()
 
+    user_search_index.upsert(
+        user_id, email=email, first_name=first_name, last_name=last_name
+    )
+    profile = {
+        "id": user_id,
+        "email": email,
+        "first_name": first_name,
+        "last_name": last_name,
+    }
+    return profile, None
+
+
+def create_user(
+    email: str, password_hash: str, first_name: str, last_name: str
+) -> Optional[int]:
+    """Create a new user with email, password, first name, and last name.
+
+    Returns: user_id on success, None on failure
+    """
+    profile, error = register_user(email, password_hash, first_name, last_name)
+    if error == "duplicate":
+        print("Duplicate email attempted:", email)
+    return profile["id"] if profile else None
 
+
+@db_timed
 def update_user_status(user_id: int, status: str) -> bool:
     """Update user online/offline status.
 
@@ -121,6 +180,7 @@ def update_user_status(user_id: int, status: str) -> bool:
         conn.close()
 
 
+@db_timed
 def update_user_avatar(user_id: int, avatar_url: str) -> bool:
     """Update user avatar URL.
 
@@ -139,6 +199,7 @@ def update_user_avatar(user_id: int, avatar_url: str) -> bool:
                 "UPDATE users SET avatar_url=%s WHERE id=%s", (avatar_url, user_id)
             )
             conn.commit()
+            user_search_index.upsert(user_id, avatar_url=avatar_url)
             return True
     except Error as e:
         print(f"Error updating user avatar: {e}")
@@ -147,6 +208,42 @@ def update_user_avatar(user_id: int, avatar_url: str) -> bool:
         conn.close()
 
 
+def is_avatar_in_use(avatar_url: str) -> bool:
+    """Return True if any user's avatar_url is ``avatar_url`` (True on DB errors, to be safe)."""
+    conn = get_connection()
+    if not conn:
+        return True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1 FROM users WHERE avatar_url=%s LIMIT 1", (avatar_url,))
+            return cur.fetchone() is not None
+    except Error as e:
+        print(f"Error checking avatar usage: {e}")
+        return True
+    finally:
+        conn.close()
+
+
+def get_avatar_urls() -> Optional[Set[str]]:
+    """Get every distinct avatar_url in use.
+
+    Returns: set of URLs, or None on failure
+    """
+    conn = get_connection()
+    if not conn:
+        return None
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT DISTINCT avatar_url FROM users WHERE avatar_url IS NOT NULL")
+            return {row[0] for row in cur.fetchall()}
+    except Error as e:
+        print(f"Error fetching avatar URLs: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+@db_timed
 def update_user_profile(
     user_id: int, first_name: str = None, last_name: str = None, avatar_url: str = None
 ) -> bool:
@@ -189,7 +286,19 @@ def update_user_profile(
         with conn.cursor() as cur:
             cur.execute(query, tuple(params))
             conn.commit()
-            return True
+        user_search_index.upsert(
+            user_id,
+            **{
+                key: value
+                for key, value in (
+                    ("first_name", first_name),
+                    ("last_name", last_name),
+                    ("avatar_url", avatar_url),
+                )
+                if value is not None
+            },
+        )
+        return True
     except Error as e:
         print(f"Error updating user profile: {e}")
         return False
@@ -197,25 +306,17 @@ def update_user_profile(
         conn.close()
 
 
-def search_users_by_name(name: str, exclude_user_id: Optional[int] = None) -> list:
-    """Search users by first or last name (case-insensitive, partial match). Optionally exclude a user by ID."""
-    conn = get_connection()
-    if not conn:
-        return []
-    try:
-        with conn.cursor(dictionary=True) as cur:
-            query = "SELECT id, first_name, last_name, email, avatar_url FROM users WHERE (first_name LIKE %s OR last_name LIKE %s)"
-            params = [f"%{name}%", f"%{name}%"]
-            if exclude_user_id:
-                query += " AND id != %s"
-                params.append(exclude_user_id)
-            cur.execute(query, tuple(params))
-            return cur.fetchall()
-    except Error as e:
-        print("Error searching users by name:", e)
-        return []
-    finally:
-        conn.close()
+def search_users_by_name(
+    name: str, exclude_user_id: Optional[int] = None, limit: int = 20, offset: int = 0
+) -> list:
+    """Search users by first or last name (case-insensitive, partial match). Optionally exclude a user by ID.
+
+    Served from the in-memory n-gram index (see models.user_search_index);
+    results are ranked (exact, prefix, word prefix, substring) and paged.
+    """
+    return user_search_index.search(
+        name, exclude_user_id=exclude_user_id, limit=limit, offset=offset
+    )
 
 
 def update_user_password(user_id: int, new_password_hash: str) -> bool:
@@ -0,0 +1,247 @@
+"""In-memory n-gram index backing people search.
+
+The index maps trigrams of each user's normalized first and last name to user
+ids, plus the leading bigram of every name word so two-character queries can
+be answered as word-prefix matches. It is loaded lazily from the users table
+on the first search and kept in sync by the user model on registration and
+profile updates, so searches never scan the table.
+
+The index lives in process memory; every server process keeps its own copy.
+"""
+
+import heapq
+import threading
+import unicodedata
+from collections import OrderedDict, defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+from mysql.connector import Error
+
+from config.database import get_connection
+
+LOAD_BATCH_SIZE = 5000
+MAX_RESULTS = 100
+PREFIX_CACHE_SIZE = 512
+
+_PUBLIC_FIELDS = ("id", "first_name", "last_name", "email", "avatar_url")
+
+
+def normalize(text: Optional[str]) -> str:
+    """Lowercase and strip accents so 'José' matches 'jose'."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.casefold().split())
+
+
+def _grams(value: str) -> Set[str]:
+    grams = {value[i : i + 3] for i in range(len(value) - 2)}
+    for word in value.replace("-", " ").split():
+        grams.add(word[:2])
+    return grams
+
+
+def _rank(entry: Dict, query: str) -> tuple:
+    """Lower is better: exact name, name prefix, word prefix, then substring."""
+    best = 3
+    for field in ("_first", "_last"):
+        value = entry[field]
+        if value == query:
+            best = 0
+            break
+        if value.startswith(query):
+            best = min(best, 1)
+        elif any(word.startswith(query) for word in value.replace("-", " ").split()):
+            best = min(best, 2)
+    length = len(entry["_first"]) + len(entry["_last"])
+    return (best, length, entry["_last"], entry["_first"], entry["id"])
+
+
+class UserSearchIndex:
+    """Thread-safe n-gram index over user names."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._users: Dict[int, Dict] = {}
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+        self._loaded = False
+        # Bumped on every change so callers can invalidate derived caches.
+        self.version = 0
+
+    def _add(self, entry: Dict) -> None:
+        entry["_first"] = normalize(entry.get("first_name"))
+        entry["_last"] = normalize(entry.get("last_name"))
+        self._users[entry["id"]] = entry
+        for gram in _grams(entry["_first"]) | _grams(entry["_last"]):
+            self._postings[gram].add(entry["id"])
+
+    def _remove(self, user_id: int) -> Optional[Dict]:
+        entry = self._users.pop(user_id, None)
+        if entry:
+            for gram in _grams(entry["_first"]) | _grams(entry["_last"]):
+                ids = self._postings.get(gram)
+                if ids is not None:
+                    ids.discard(user_id)
+                    if not ids:
+                        del self._postings[gram]
+        return entry
+
+    def ensure_loaded(self) -> bool:
+        """Load every user from the database once. Returns False if the DB is unavailable."""
+        if self._loaded:
+            return True
+        with self._lock:
+            if self._loaded:
+                return True
+            # From the primary: upsert() is a no-op until now, so a user who
+            # registered just before must be in this read, not lagging on a replica
+            conn = get_connection()
+            if not conn:
+                return False
+            try:
+                with conn.cursor(dictionary=True, buffered=False) as cur:
+                    cur.execute(
+                        "SELECT id, first_name, last_name, email, avatar_url FROM users"
+                    )
+                    while True:
+                        rows = cur.fetchmany(LOAD_BATCH_SIZE)
+                        if not rows:
+                            break
+                        for row in rows:
+                            self._add(dict(row))
+            except Error as e:
+                print("Error loading user search index:", e)
+                self._users.clear()
+                self._postings.clear()
+                return False
+            finally:
+                conn.close()
+            self._loaded = True
+            self.version += 1
+            return True
+
+    def upsert(self, user_id: int, **fields) -> None:
+        """Add a user or update some of their public fields.
+
+        A no-op until the index has been loaded: the initial load reads the
+        committed row anyway.
+        """
+        with self._lock:
+            if not self._loaded:
+                return
+            entry = self._remove(user_id) or {"id": user_id}
+            entry = {key: entry.get(key) for key in _PUBLIC_FIELDS}
+            entry.update(
+                {key: value for key, value in fields.items() if key in _PUBLIC_FIELDS}
+            )
+            entry["id"] = user_id
+            self._add(entry)
+            self.version += 1
+
+    def get(self, user_id: int) -> Optional[Dict]:
+        """Public fields of one user from the loaded index, or None."""
+        with self._lock:
+            entry = self._users.get(user_id)
+            return {key: entry.get(key) for key in _PUBLIC_FIELDS} if entry else None
+
+    def _candidates(self, query: str) -> Iterable[int]:
+        if len(query) >= 3:
+            grams = sorted(
+                {query[i : i + 3] for i in range(len(query) - 2)},
+                key=lambda gram: len(self._postings.get(gram, ())),
+            )
+            ids = set(self._postings.get(grams[0], ()))
+            for gram in grams[1:]:
+                ids &= self._postings.get(gram, set())
+                if not ids:
+                    break
+            return ids
+        return set(self._postings.get(query, ()))
+
+    def search(
+        self,
+        name: str,
+        exclude_user_id: Optional[int] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> List[Dict]:
+        """Return ranked users whose first or last name contains ``name``.
+
+        Queries shorter than three characters only match the start of a name
+        word. ``limit`` is capped at MAX_RESULTS.
+        """
+        query = normalize(name)
+        if len(query) < 2 or not self.ensure_loaded():
+            return []
+
+        limit = max(1, min(int(limit), MAX_RESULTS))
+        offset = max(0, int(offset))
+
+        with self._lock:
+            matches = []
+            for user_id in self._candidates(query):
+                if user_id == exclude_user_id:
+                    continue
+                entry = self._users[user_id]
+                if query in entry["_first"] or query in entry["_last"]:
+                    matches.append(entry)
+
+        ranked = heapq.nsmallest(
+            offset + limit, matches, key=lambda entry: _rank(entry, query)
+        )
+        return [
+            {key: entry.get(key) for key in _PUBLIC_FIELDS}
+            for entry in ranked[offset:]
+        ]
+
+    def refine(self, users: List[Dict], name: str, limit: int = 20) -> List[Dict]:
+        """Filter and re-rank a previous result set for a longer query.
+
+        Only valid when ``users`` is the complete result of a query of at
+        least three characters that ``name`` extends.
+        """
+        query = normalize(name)
+        matches = []
+        for user in users:
+            entry = dict(user)
+            entry["_first"] = normalize(user.get("first_name"))
+            entry["_last"] = normalize(user.get("last_name"))
+            if query in entry["_first"] or query in entry["_last"]:
+                matches.append(entry)
+        ranked = heapq.nsmallest(limit, matches, key=lambda entry: _rank(entry, query))
+        return [{key: entry.get(key) for key in _PUBLIC_FIELDS} for entry in ranked]
+
+
+class PrefixResultCache:
+    """Small LRU of full result sets per normalized query, shared by all users.
+
+    Entries are tagged with the index version and dropped once the index
+    changes, so a cached list never outlives a registration or profile edit.
+    """
+
+    def __init__(self, index: UserSearchIndex, size: int = PREFIX_CACHE_SIZE):
+        self._index = index
+        self._size = size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, name: str) -> List[Dict]:
+        """Return up to MAX_RESULTS ranked users for ``name`` (nobody excluded)."""
+        query = normalize(name)
+        version = self._index.version
+        with self._lock:
+            cached = self._entries.get(query)
+            if cached and cached[0] == version:
+                self._entries.move_to_end(query)
+                return cached[1]
+
+        users = self._index.search(query, limit=MAX_RESULTS)
+        with self._lock:
+            self._entries[query] = (version, users)
+            self._entries.move_to_end(query)
+            while len(self._entries) > self._size:
+                self._entries.popitem(last=False)
+        return users
+
+
+user_search_index = UserSearchIndex()
+prefix_result_cache = PrefixResultCache(user_search_index)
@@ -0,0 +1,152 @@
+"""Admin-only routes (history export and import, profiling).
+
+Admins are the user ids listed in the comma-separated ADMIN_USER_IDS
+environment variable.
+"""
+
+import os
+from functools import wraps
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from utils import profiling
+from utils.history_io import (
+    gzip_stream,
+    import_history,
+    iter_room_history,
+    iter_user_history,
+    read_ndjson,
+    to_ndjson,
+)
+
+admin_bp = Blueprint("admin", __name__)
+
+ADMIN_USER_IDS = {
+    user_id.strip()
+    for user_id in os.getenv("ADMIN_USER_IDS", "").split(",")
+    if user_id.strip()
+}
+
+
+def admin_required(f):
+    """Require a valid JWT whose user is listed in ADMIN_USER_IDS."""
+
+    @wraps(f)
+    @jwt_required()
+    def decorated(*args, **kwargs):
+        if str(get_jwt_identity()) not in ADMIN_USER_IDS:
+            return jsonify({"error": "Admin access required"}), 403
+        return f(*args, **kwargs)
+
+    return decorated
+
+
+def _ndjson_response(records, filename):
+    """Stream records as NDJSON, gzipped when ``gzip=1`` is passed."""
+    body = to_ndjson(records)
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.ndjson"'}
+    if request.args.get("gzip") in ("1", "true"):
+        body = gzip_stream(body)
+        headers["Content-Disposition"] = f'attachment; filename="{filename}.ndjson.gz"'
+        return Response(
+            stream_with_context(body), mimetype="application/gzip", headers=headers
+        )
+    return Response(
+        stream_with_context(body), mimetype="application/x-ndjson", headers=headers
+    )
+
+
+@admin_bp.route("/export/rooms/<int:room_id>", methods=["GET"])
+@admin_required
+def export_room(room_id):
+    """Stream a room's full history (archived and hot) as NDJSON."""
+    return _ndjson_response(iter_room_history(room_id), f"room-{room_id}")
+
+
+@admin_bp.route("/export/users/<int:user_id>", methods=["GET"])
+@admin_required
+def export_user(user_id):
+    """Stream a user's private messages and room messages as NDJSON."""
+    return _ndjson_response(iter_user_history(user_id), f"user-{user_id}")
+
+
+@admin_bp.route("/import", methods=["POST"])
+@admin_required
+def import_messages():
+    """Bulk-load an NDJSON export sent as the request body.
+
+    Send ``Content-Encoding: gzip`` for a compressed body. Query params:
+    ``room_id`` loads room messages into another room, ``keep_ids=1`` keeps the
+    exported message ids (rows whose id already exists are skipped).
+    """
+    # Exports can be far larger than MAX_CONTENT_LENGTH; the body is streamed
+    request.max_content_length = None
+
+    room_id = request.args.get("room_id", type=int)
+    keep_ids = request.args.get("keep_ids") in ("1", "true")
+    compressed = request.headers.get("Content-Encoding", "").lower() == "gzip"
+
+    counts = import_history(
+        read_ndjson(request.stream, compressed=compressed),
+        room_id=room_id,
+        keep_ids=keep_ids,
+    )
+    if counts is None:
+        return jsonify({"error": "Import failed"}), 400
+    error = counts.pop("error", None)
+    if error:
+        # Batches before the failure stay committed; say how much got in
+        return jsonify({"error": f"Import stopped: {error}", "imported": counts}), 400
+    return jsonify({"message": "Import completed", "imported": counts}), 200
+
+
+@admin_bp.route("/profiling", methods=["GET"])
+@admin_required
+def profiling_status():
+    """Per-event timing aggregates, the open capture window and written dumps."""
+    return (
+        jsonify(
+            {
+                "enabled": profiling.ENABLED,
+                "slow_event_ms": profiling.SLOW_EVENT_MS,
+                "events": profiling.summary(),
+                "capture": profiling.capture_status(),
+                "dumps": profiling.list_dumps(),
+            }
+        ),
+        200,
+    )
+
+
+@admin_bp.route("/profiling/capture", methods=["POST"])
+@admin_required
+def profiling_capture():
+    """Profile a sample of socket events with cProfile for a while.
+
+    JSON body: ``seconds`` (default 30), ``sample_rate`` (default 0.1) and an
+    optional ``events`` list. Stats are written to PROFILE_DIR when the window
+    closes, or immediately with ``{"stop": true}``.
+    """
+    if not profiling.ENABLED:
+        return jsonify({"error": "Profiling is disabled (set PROFILE_SOCKET_EVENTS=1)"}), 409
+
+    data = request.get_json(silent=True) or {}
+    if data.get("stop"):
+        return jsonify({"message": "Capture finished", "files": profiling.finish_capture()}), 200
+
+    try:
+        started = profiling.start_capture(
+            data.get("seconds", 30), data.get("sample_rate", 0.1), data.get("events")
+        )
+    except (TypeError, ValueError):
+        return jsonify({"error": "seconds and sample_rate must be numbers"}), 400
+    if not started:
+        return jsonify({"error": "A capture is already running"}), 409
+    return jsonify({"message": "Capture started", "capture": profiling.capture_status()}), 202
+
+
+@admin_bp.route("/profiling/stacks", methods=["POST"])
+@admin_required
+def profiling_stacks():
+    """Write the current stack of every thread in this process to PROFILE_DIR."""
+    return jsonify({"message": "Stacks written", "file": profiling.dump_stacks()}), 200
@@ -1,14 +1,18 @@
+import math
 import re
 from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import decode_token, get_jwt, get_jwt_identity, jwt_required
 
 from models.user_model import (
     init_user_table,
     get_user_by_email,
-    create_user,
+    register_user,
     update_user_password,
 )
+from models.revoked_token_model import revoke_token
+from utils.jwt_helper import generate_token_pair
+from utils.password_hashing import HashPoolBusy, hash_password, verify_password
+from utils.rate_limit import client_ip, login_email_limiter, login_ip_limiter
 
 
 auth_bp = Blueprint("auth", __name__)
@@ -42,6 +46,32 @@ def validate_password(password: str) -> tuple[bool, str]:
     return True, ""
 
 
+def throttle(email: str = ""):
+    """Record an auth attempt for the caller's IP (and ``email``).
+
+    Returns: a 429 response if either is over its limit, else None
+    """
+    retry_after = login_ip_limiter.hit(client_ip())
+    if retry_after is None and email:
+        retry_after = login_email_limiter.hit(email)
+    if retry_after is None:
+        return None
+    return (
+        jsonify({"message": "too many attempts, please try again later"}),
+        429,
+        {"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+def hashing_busy():
+    """503 response for when the password hashing pool is saturated."""
+    return (
+        jsonify({"message": "server busy, please try again shortly"}),
+        503,
+        {"Retry-After": "1"},
+    )
+
+
 @auth_bp.route("/forgot", methods=["POST"])
 def forgot_password():
     """Reset password after confirming basic user details.
@@ -63,6 +93,10 @@ def forgot_password():
     last_name = (data.get("last_name") or "").strip()
     new_password = data.get("new_password") or ""
 
+    limited = throttle(email)
+    if limited:
+        return limited
+
     if not email or not first_name or not last_name or not new_password:
         return (
             jsonify(
@@ -92,14 +126,15 @@ def forgot_password():
     ):
         return jsonify({"message": "details do not match our records"}), 400
 
-    from werkzeug.security import generate_password_hash
-
-    pw_hash = generate_password_hash(new_password)
+    try:
+        pw_hash = hash_password(new_password)
+    except HashPoolBusy:
+        return hashing_busy()
     if not update_user_password(int(user["id"]), pw_hash):
         return jsonify({"message": "could not reset password"}), 500
 
     # Optional: sign them in immediately
-    token = create_access_token(identity=str(user["id"]))
+    tokens = generate_token_pair(user["id"])
     profile = {
         "id": user["id"],
         "email": user["email"],
@@ -111,7 +146,7 @@ def forgot_password():
             {
                 "message": "password reset successful",
                 "user": profile,
-                "access_token": token,
+                **tokens,
             }
         ),
         200,
@@ -126,6 +161,10 @@ def register():
     first_name = (data.get("first_name") or "").strip()
     last_name = (data.get("last_name") or "").strip()
 
+    limited = throttle()
+    if limited:
+        return limited
+
     if not email or not password:
         return jsonify({"message": "email and password are required"}), 400
 
@@ -145,26 +184,24 @@ def register():
     if len(last_name) > 100:
         return jsonify({"message": "last name too long (max 100 characters)"}), 400
 
-    if get_user_by_email(email):
-        return jsonify({"message": "email already registered"}), 409
+    try:
+        password_hash = hash_password(password)
+    except HashPoolBusy:
+        return hashing_busy()
 
-    password_hash = generate_password_hash(password)
-    user_id = create_user(email, password_hash, first_name, last_name)
-    if not user_id:
+    # The unique index on email does the duplicate check in the same statement
+    profile, error = register_user(email, password_hash, first_name, last_name)
+    if error == "duplicate":
+        return jsonify({"message": "email already registered"}), 409
+    if error:
         return jsonify({"message": "could not create user"}), 500
 
-    token = create_access_token(identity=str(user_id))
     return (
         jsonify(
             {
                 "message": "registered successfully",
-                "user": {
-                    "id": user_id,
-                    "email": email,
-                    "first_name": first_name,
-                    "last_name": last_name,
-                },
-                "access_token": token,
+                "user": profile,
+                **generate_token_pair(profile["id"]),
             }
         ),
         201,
@@ -177,14 +214,22 @@ def login():
     email = (data.get("email") or "").strip().lower()
     password = data.get("password") or ""
 
+    limited = throttle(email)
+    if limited:
+        return limited
+
     if not email or not password:
         return jsonify({"message": "email and password are required"}), 400
 
     user = get_user_by_email(email)
-    if not user or not check_password_hash(user["password_hash"], password):
-        return jsonify({"message": "invalid email or password"}), 401
-
-    token = create_access_token(identity=str(user["id"]))
+    try:
+        if not user or not verify_password(user["password_hash"], password):
+            return jsonify({"message": "invalid email or password"}), 401
+    except HashPoolBusy:
+        return hashing_busy()
+    login_email_limiter.reset(email)
+
+    tokens = generate_token_pair(user["id"])
     profile = {
         "id": user["id"],
         "email": user["email"],
@@ -192,11 +237,62 @@ def login():
         "last_name": user.get("last_name"),
     }
     return (
-        jsonify({"message": "logged_in", "user": profile, "access_token": token}),
+        jsonify({"message": "logged_in", "user": profile, **tokens}),
         200,
     )
 
 
+@auth_bp.route("/refresh", methods=["POST"])
+@jwt_required(refresh=True)
+def refresh():
+    """Rotate a refresh token: revoke it and issue a new access/refresh pair.
+
+    A refresh token works once; presenting it again is rejected.
+    """
+    claims = get_jwt()
+    user_id = get_jwt_identity()
+    revoked = revoke_token(claims["jti"], int(user_id), "refresh", claims["exp"])
+    if revoked is None:
+        return jsonify({"message": "could not refresh token"}), 500
+    if not revoked:
+        return jsonify({"message": "refresh token already used"}), 401
+
+    return jsonify(generate_token_pair(user_id)), 200
+
+
+@auth_bp.route("/logout", methods=["POST"])
+@jwt_required()
+def logout():
+    """Revoke the access token and, if given, the refresh token.
+
+    Expected JSON payload (optional): {"refresh_token": "..."}
+    """
+    claims = get_jwt()
+    user_id = get_jwt_identity()
+    if revoke_token(claims["jti"], int(user_id), "access", claims["exp"]) is None:
+        return jsonify({"message": "could not log out"}), 500
+
+    data = request.get_json(silent=True) or {}
+    refresh_token = data.get("refresh_token")
+    if refresh_token:
+        try:
+            refresh_claims = decode_token(refresh_token)
+        except Exception:
+            refresh_claims = None
+        if (
+            refresh_claims
+            and refresh_claims.get("type") == "refresh"
+            and str(refresh_claims.get("sub")) == str(user_id)
+        ):
+            revoked = revoke_token(
+                refresh_claims["jti"], int(user_id), "refresh", refresh_claims["exp"]
+            )
+            if revoked is None:
+                return jsonify({"message": "could not revoke refresh token"}), 500
+
+    return jsonify({"message": "logged out"}), 200
+
+
 @auth_bp.route("/me", methods=["GET"])
 @jwt_required()
 def me():
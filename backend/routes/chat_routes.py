@@ -1,16 +1,69 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, make_response, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models.room_model import create_room, get_all_rooms, get_room_by_id, delete_room
+from models.room_model import (
+    create_room,
+    get_cached_room,
+    list_rooms_page,
+    get_room_by_id,
+    get_rooms_by_activity,
+    set_room_retention,
+)
 from models.message_model import get_room_messages
+from models.room_member_model import (
+    add_room_member,
+    get_user_rooms,
+    is_room_member,
+)
+from models.search_model import search_messages
+from routes.admin_routes import ADMIN_USER_IDS
+from sockets import presence
+from utils.room_deletion import (
+    get_job as get_room_deletion_job,
+    resume_pending_room_deletions,
+    start_room_deletion,
+)
 
 chat_bp = Blueprint("chat", __name__)
 
 
+def can_manage_room(room, user_id) -> bool:
+    """Only a room's creator (or an admin) may change its settings or delete it."""
+    return str(room.get("created_by")) == str(user_id) or str(user_id) in ADMIN_USER_IDS
+
+
+try:
+    resume_pending_room_deletions()
+except Exception as e:
+    print(f"Warning: Could not resume pending room deletions: {e}")
+
+
 @chat_bp.route("/rooms", methods=["GET"])
 @jwt_required()
 def list_rooms():
-    """Get all chat rooms."""
-    rooms = get_all_rooms()
+    """Get chat rooms, newest first.
+
+    Served from the in-memory room directory. Supports keyset pagination
+    (``limit`` + ``cursor``), a ``q`` name filter, and answers ``304`` when
+    ``If-None-Match`` carries the current directory ETag.
+    """
+    limit = request.args.get("limit", type=int)
+    cursor = request.args.get("cursor") or None
+    name = request.args.get("q", "").strip() or None
+
+    if limit is not None and (limit < 1 or limit > 200):
+        return jsonify({"error": "Limit must be between 1 and 200"}), 400
+
+    try:
+        rooms, next_cursor, version = list_rooms_page(cursor, limit, name)
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    etag = f"rooms-{version}" if version else None
+    if etag and request.if_none_match.contains(etag):
+        response = make_response("", 304)
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response
 
     formatted_rooms = []
     for room in rooms:
@@ -29,6 +82,75 @@ def list_rooms():
             }
         )
 
+    response = make_response(
+        jsonify({"rooms": formatted_rooms, "next_cursor": next_cursor}), 200
+    )
+    if etag:
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+@chat_bp.route("/rooms/activity", methods=["GET"])
+@jwt_required()
+def list_rooms_by_activity():
+    """Get room summaries ordered by most recent activity."""
+    limit = request.args.get("limit", 50, type=int)
+
+    if limit < 1 or limit > 200:
+        return jsonify({"error": "Limit must be between 1 and 200"}), 400
+
+    rooms = get_rooms_by_activity(limit)
+
+    formatted_rooms = []
+    for room in rooms:
+        formatted_rooms.append(
+            {
+                "id": room["id"],
+                "name": room["name"],
+                "last_message_id": room["last_message_id"],
+                "last_message_preview": room["last_message_preview"],
+                "message_count": room["message_count"],
+                "last_activity_at": (
+                    room["last_activity_at"].isoformat()
+                    if room["last_activity_at"]
+                    else None
+                ),
+                "online_count": presence.member_count(room["id"]),
+            }
+        )
+
+    return jsonify({"rooms": formatted_rooms}), 200
+
+
+@chat_bp.route("/rooms/mine", methods=["GET"])
+@jwt_required()
+def list_my_rooms():
+    """Get the rooms the current user is a member of, most recently active first."""
+    user_id = get_jwt_identity()
+    rooms = get_user_rooms(int(user_id))
+
+    formatted_rooms = []
+    for room in rooms:
+        formatted_rooms.append(
+            {
+                "id": room["id"],
+                "name": room["name"],
+                "created_at": (
+                    room["created_at"].isoformat() if room["created_at"] else None
+                ),
+                "last_message_id": room["last_message_id"],
+                "last_message_preview": room["last_message_preview"],
+                "message_count": room["message_count"],
+                "last_activity_at": (
+                    room["last_activity_at"].isoformat()
+                    if room["last_activity_at"]
+                    else None
+                ),
+                "joined_at": room["joined_at"].isoformat() if room["joined_at"] else None,
+            }
+        )
+
     return jsonify({"rooms": formatted_rooms}), 200
 
 
@@ -56,6 +178,8 @@ def create_new_room():
     if not room_id:
         return jsonify({"error": "Failed to create room"}), 500
 
+    add_room_member(room_id, int(user_id))
+
     room = get_room_by_id(room_id)
 
     return (
@@ -119,13 +243,17 @@ def get_messages(room_id):
     if not room:
         return jsonify({"error": "Room not found"}), 404
 
+    if not is_room_member(room_id, get_jwt_identity()):
+        return jsonify({"error": "You are not a member of this room"}), 403
+
     limit = request.args.get("limit", 50, type=int)
+    before_id = request.args.get("before_id", type=int)
 
     if limit < 1 or limit > 200:
         return jsonify({"error": "Limit must be between 1 and 200"}), 400
 
     
-    messages = get_room_messages(room_id, limit)
+    messages = get_room_messages(room_id, limit, before_id)
 
     
     formatted_messages = []
@@ -154,17 +282,123 @@ def delete_room_endpoint(room_id):
     """Delete a room (only creator can delete)."""
     user_id = get_jwt_identity()
 
-    
     room = get_room_by_id(room_id)
     if not room:
         return jsonify({"error": "Room not found"}), 404
 
-    
-    
+    if not can_manage_room(room, user_id):
+        return jsonify({"error": "You can only delete rooms you created"}), 403
 
-    success = delete_room(room_id)
+    # The room disappears now; its messages are purged in the background
+    job = start_room_deletion([room_id], requested_by=user_id)
 
-    if not success:
+    if not job:
         return jsonify({"error": "Failed to delete room"}), 500
 
-    return jsonify({"message": "Room deleted successfully"}), 200
+    return jsonify({"message": "Room deleted successfully", "job": job}), 202
+
+
+@chat_bp.route("/rooms/<int:room_id>/retention", methods=["PUT"])
+@jwt_required()
+def update_room_retention(room_id):
+    """Set how many days a room's messages stay in the hot table before archiving."""
+    data = request.get_json(silent=True) or {}
+    days = data.get("retention_days")
+
+    if days is not None and (not isinstance(days, int) or days < 0 or days > 36500):
+        return (
+            jsonify({"error": "retention_days must be null or an integer from 0 to 36500"}),
+            400,
+        )
+
+    room = get_room_by_id(room_id)
+    if not room:
+        return jsonify({"error": "Room not found"}), 404
+    if not can_manage_room(room, get_jwt_identity()):
+        return jsonify({"error": "Only the room creator can change its retention"}), 403
+
+    if not set_room_retention(room_id, days):
+        return jsonify({"error": "Room not found"}), 404
+
+    return jsonify({"room_id": room_id, "retention_days": days}), 200
+
+
+@chat_bp.route("/rooms/bulk_delete", methods=["POST"])
+@jwt_required()
+def bulk_delete_rooms():
+    """Delete many rooms with one background purge job."""
+    data = request.get_json(silent=True) or {}
+    room_ids = data.get("room_ids")
+
+    if not isinstance(room_ids, list) or not room_ids:
+        return jsonify({"error": "room_ids must be a non-empty list"}), 400
+
+    if len(room_ids) > 500:
+        return jsonify({"error": "At most 500 rooms can be deleted at once"}), 400
+
+    try:
+        room_ids = sorted({int(room_id) for room_id in room_ids})
+    except (TypeError, ValueError):
+        return jsonify({"error": "room_ids must be integers"}), 400
+
+    user_id = get_jwt_identity()
+    rooms = [get_cached_room(room_id) for room_id in room_ids]
+    not_owned = [room["id"] for room in rooms if room and not can_manage_room(room, user_id)]
+    if not_owned:
+        return (
+            jsonify({"error": "You can only delete rooms you created", "room_ids": not_owned}),
+            403,
+        )
+
+    job = start_room_deletion(room_ids, requested_by=user_id)
+
+    if not job:
+        return jsonify({"error": "No matching rooms to delete"}), 404
+
+    return jsonify({"message": "Rooms deleted", "job": job}), 202
+
+
+@chat_bp.route("/rooms/deletions/<int:job_id>", methods=["GET"])
+@jwt_required()
+def get_room_deletion(job_id):
+    """Get progress of a background room deletion (its requester or an admin)."""
+    user_id = str(get_jwt_identity())
+    job = get_room_deletion_job(job_id)
+
+    # Someone else's job is reported as missing, like one that never existed
+    if not job or (job["requested_by"] != user_id and user_id not in ADMIN_USER_IDS):
+        return jsonify({"error": "Deletion job not found"}), 404
+
+    return jsonify({"job": job}), 200
+
+
+@chat_bp.route("/search", methods=["GET"])
+@jwt_required()
+def search():
+    """Search message history in rooms and the caller's private chats."""
+    user_id = get_jwt_identity()
+    query = request.args.get("q", "").strip()
+    scope = request.args.get("scope", "all")
+    limit = request.args.get("limit", 20, type=int)
+
+    if not query:
+        return jsonify({"error": "q is required"}), 400
+
+    if scope not in ("all", "rooms", "dms"):
+        return jsonify({"error": "scope must be one of all, rooms, dms"}), 400
+
+    if limit < 1 or limit > 50:
+        return jsonify({"error": "Limit must be between 1 and 50"}), 400
+
+    result = search_messages(
+        int(user_id),
+        query,
+        scope=scope,
+        room_id=request.args.get("room_id", type=int),
+        with_user_id=request.args.get("with_user_id", type=int),
+        room_before=request.args.get("room_before", type=int),
+        dm_before=request.args.get("dm_before", type=int),
+        limit=limit,
+    )
+
+    return jsonify({"query": query, **result}), 200
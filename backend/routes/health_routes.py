@@ -1,6 +1,13 @@
-from flask import Blueprint, jsonify
+import hmac
+import os
 
-from config.database import get_connection
+from flask import Blueprint, Response, jsonify, request
+
+from config.database import db_breaker, get_connection
+from utils import metrics
+
+# Optional bearer token required to scrape /metrics
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
 
 health_bp = Blueprint("health", __name__)
 
@@ -16,7 +23,11 @@ def health_db():
     """Check database connectivity by opening a connection and running a trivial query.
 
     Returns 200 when DB is reachable and can execute a simple query, otherwise 500 with error details.
+    While the circuit breaker is open this answers 503 without touching the database.
     """
+    if not db_breaker.allow():
+        return jsonify({"status": "error", "db": "circuit_open", "circuit": db_breaker.status()}), 503
+
     conn = get_connection()
     if not conn:
         return jsonify({"status": "error", "db": "unavailable"}), 500
@@ -33,3 +44,13 @@ def health_db():
             conn.close()
         except Exception:
             pass
+
+
+@health_bp.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    """Expose process metrics in the Prometheus text format."""
+    if METRICS_TOKEN:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(supplied, METRICS_TOKEN):
+            return jsonify({"status": "error", "message": "unauthorized"}), 401
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
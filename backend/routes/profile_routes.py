@@ -2,31 +2,26 @@
 
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from werkzeug.utils import secure_filename
-import os
-from pathlib import Path
+from werkzeug.exceptions import RequestEntityTooLarge
 
 from models.user_model import (
     get_user_by_id,
     update_user_profile,
     update_user_avatar,
     search_users_by_name,
+    is_avatar_in_use,
 )
+from utils.avatar_pipeline import AVATAR_DIR, InvalidImage, remove_avatar, store_avatar
+from utils.uploads import receive_files, sniff_image_type
 
 profile_bp = Blueprint("profile", __name__)
 
 # Configuration for file uploads
-UPLOAD_FOLDER = Path(__file__).parent.parent.parent / "uploads" / "avatars"
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "webp"}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 
 # Create upload folder if it doesn't exist
-UPLOAD_FOLDER.mkdir(parents=True, exist_ok=True)
-
-
-def allowed_file(filename):
-    """Check if file extension is allowed."""
-    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
+AVATAR_DIR.mkdir(parents=True, exist_ok=True)
 
 
 @profile_bp.route("/me", methods=["GET"])
@@ -115,61 +110,62 @@ def upload_avatar():
     """Upload avatar image."""
     user_id = get_jwt_identity()
 
-    # Check if file is in request
-    if "avatar" not in request.files:
-        return jsonify({"message": "no file provided"}), 400
-
-    file = request.files["avatar"]
-
-    # Check if file was selected
-    if file.filename == "":
-        return jsonify({"message": "no file selected"}), 400
-
-    # Check file size (this is a basic check, might not work in all cases)
-    file.seek(0, os.SEEK_END)
-    file_size = file.tell()
-    file.seek(0)
+    # Stream the upload to a temp file, rejecting it as soon as it's too big
+    try:
+        files = receive_files(MAX_FILE_SIZE)
+    except RequestEntityTooLarge:
+        return jsonify({"message": "file size exceeds 5MB limit"}), 413
 
-    if file_size > MAX_FILE_SIZE:
-        return jsonify({"message": "file size exceeds 5MB limit"}), 400
+    upload = files.pop("avatar", None)
+    for other in files.values():
+        other.discard()
 
-    # Check if file type is allowed
-    if not allowed_file(file.filename):
-        return (
-            jsonify(
-                {
-                    "message": f"file type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
-                }
-            ),
-            400,
-        )
-
-    # Create secure filename
-    filename = secure_filename(file.filename)
-    # Add user ID to filename to avoid conflicts
-    name, ext = os.path.splitext(filename)
-    filename = f"user_{user_id}_{name}{ext}"
+    # Check if file is in request
+    if upload is None:
+        return jsonify({"message": "no file provided"}), 400
 
-    # Save file
-    filepath = UPLOAD_FOLDER / filename
     try:
-        file.save(str(filepath))
+        # Check if file was selected
+        if upload.size == 0:
+            return jsonify({"message": "no file selected"}), 400
+
+        # Check the real file type from its first bytes
+        ext = sniff_image_type(upload.head)
+        if not ext:
+            return (
+                jsonify(
+                    {
+                        "message": f"file type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
+                    }
+                ),
+                400,
+            )
+
+        # Decode, strip metadata and store thumbnails under their content hash
+        upload.close()
+        avatar_url = store_avatar(upload.path, ext, upload.hexdigest())
+    except InvalidImage:
+        return jsonify({"message": "file is not a valid image"}), 400
     except Exception as e:
         print(f"Error saving file: {e}")
         return jsonify({"message": "failed to save file"}), 500
+    finally:
+        upload.discard()
+
+    user = get_user_by_id(int(user_id))
+    previous_url = user.get("avatar_url") if user else None
 
     # Update user avatar URL
-    avatar_url = f"/uploads/avatars/{filename}"
     success = update_user_avatar(int(user_id), avatar_url)
 
     if not success:
-        # Delete uploaded file if database update fails
-        try:
-            filepath.unlink()
-        except:
-            pass
+        # Uploaded files that never got referenced are swept by cleanup_avatars.py
         return jsonify({"message": "failed to update avatar"}), 500
 
+    # Remove the superseded avatar unless someone else uses the same image
+    if previous_url and previous_url != avatar_url and not is_avatar_in_use(previous_url):
+        remove_avatar(previous_url)
+
     return (
         jsonify({"message": "avatar uploaded successfully", "avatar_url": avatar_url}),
         200,
@@ -206,8 +202,20 @@ def search_users():
     """Search users by name (for private chat)."""
     user_id = get_jwt_identity()
     name = request.args.get("name", "").strip()
+    limit = request.args.get("limit", 20, type=int)
+    offset = request.args.get("offset", 0, type=int)
     if not name or len(name) < 2:
-        return jsonify({"users": []})
+        return jsonify({"users": [], "next_offset": None})
+
+    if limit < 1 or limit > 50:
+        return jsonify({"message": "limit must be between 1 and 50"}), 400
 
-    users = search_users_by_name(name, exclude_user_id=int(user_id))
-    return jsonify({"users": users})
+    if offset < 0:
+        return jsonify({"message": "offset must not be negative"}), 400
+
+    # Ask for one extra row to know whether another page exists.
+    users = search_users_by_name(
+        name, exclude_user_id=int(user_id), limit=limit + 1, offset=offset
+    )
+    next_offset = offset + limit if len(users) > limit else None
+    return jsonify({"users": users[:limit], "next_offset": next_offset})
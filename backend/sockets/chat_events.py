@@ -1,10 +1,23 @@
 from flask_socketio import emit, join_room, leave_room, disconnect
 from flask import request
+from datetime import datetime
 from functools import wraps
+import itertools
 import jwt
+import mysql.connector
 import os
+import uuid
+from config.database import db_breaker
 from models.message_model import create_message, get_room_messages, delete_message
-from models.room_model import get_room_by_id
+from models.message_model import store_spooled_message as store_spooled_message_row
+from models.replicas import bind_session
+from models.revoked_token_model import is_token_revoked
+from models.room_model import get_cached_room
+from models.room_member_model import (
+    add_room_member,
+    is_room_member,
+    remove_room_member,
+)
 from models.user_model import update_user_status, get_user_by_id
 from models.private_message_model import (
     create_private_message,
@@ -12,6 +25,36 @@ from models.private_message_model import (
     mark_messages_as_read,
     get_unread_count,
 )
+from models.search_model import MAX_SEARCH_LIMIT, search_messages
+from sockets import presence
+from utils import message_spool, profiling
+from utils.log import get_logger
+from utils.metrics import instrument_socketio, record_fanout
+from sockets.presence import connected_users
+from models.user_search_index import (
+    MAX_RESULTS,
+    normalize,
+    prefix_result_cache,
+    user_search_index,
+)
+
+logger = get_logger("sockets")
+
+# Emits are charged to the calling handler when profiling is enabled
+if profiling.ENABLED:
+    emit = profiling.profiled_emit(emit)
+
+# Quiet period before a people-search query runs; newer input inside the
+# window supersedes it.
+USER_SEARCH_DEBOUNCE_SECONDS = float(os.getenv("USER_SEARCH_DEBOUNCE_MS", "150")) / 1000
+
+# MESSAGE_SPOOL_MODE=always acknowledges and broadcasts every room message
+# once it is fsynced to the local spool and leaves the insert to the spool
+# drainer; the default (degraded) only spools while the database is down.
+WRITE_BEHIND = os.getenv("MESSAGE_SPOOL_MODE", "degraded").lower() == "always"
+
+# Largest history page a client may ask for (same cap as the REST endpoint)
+MAX_HISTORY_LIMIT = 200
 
 
 def token_required(f):
@@ -35,12 +78,19 @@ def token_required(f):
             payload = jwt.decode(token, secret_key, algorithms=["HS256"])
             user_id = payload.get("sub")
 
-            if not user_id:
+            if not user_id or payload.get("type", "access") != "access":
                 emit("error", {"message": "Invalid token payload"})
                 disconnect()
                 return None
 
-            return f(user_id, *args, **kwargs)
+            if is_token_revoked(payload.get("jti")):
+                emit("error", {"message": "Token has been revoked"})
+                disconnect()
+                return None
+
+            # Reads right after this user's own writes go to the primary
+            with bind_session(user_id):
+                return f(user_id, *args, **kwargs)
         except jwt.ExpiredSignatureError:
             emit("error", {"message": "Token has expired"})
             disconnect()
@@ -53,19 +103,130 @@ def token_required(f):
     return decorated
 
 
+def is_private_participant(room_key, user_id) -> bool:
+    """Return True if ``room_key`` ('private_<a>_<b>') names a DM the user takes part in."""
+    parts = str(room_key).split("_")
+    if len(parts) != 3 or parts[0] != "private":
+        return False
+    return str(user_id) in parts[1:]
+
+
+def history_page(data) -> tuple:
+    """(limit, before_id) of a history request, limit clamped to 1..MAX_HISTORY_LIMIT.
+
+    Raises ValueError or TypeError when either is not an integer.
+    """
+    limit = data.get("limit")
+    limit = 50 if limit is None else max(1, min(int(limit), MAX_HISTORY_LIMIT))
+    before_id = data.get("before_id")
+    return limit, None if before_id is None else int(before_id)
+
+
+def message_payload(message) -> dict:
+    """The new_message payload for a row from create_message (or spool_message)."""
+    payload = {
+        "id": message["id"],
+        "room_id": message["room_id"],
+        "user_id": message["user_id"],
+        "content": message["content"],
+        "timestamp": (
+            message["timestamp"].isoformat() if message["timestamp"] else None
+        ),
+        "user": {
+            "first_name": message["first_name"],
+            "last_name": message["last_name"],
+            "email": message["email"],
+            "avatar_url": message.get("avatar_url"),
+        },
+    }
+    if message.get("spool_id"):
+        # Not stored yet: id stays None until message_saved reports it
+        payload["spool_id"] = message["spool_id"]
+        payload["pending"] = True
+    return payload
+
+
+def spool_message(room_id, user_id: int, content: str):
+    """Durably spool a message for the drainer to store (see utils.message_spool).
+
+    Returns a create_message-shaped dict with ``id`` None and a ``spool_id``,
+    or None when the spool could not be written either.
+    """
+    entry = {
+        "spool_id": uuid.uuid4().hex,
+        "room_id": int(room_id),
+        "user_id": user_id,
+        "content": content,
+        "timestamp": datetime.now().isoformat(),
+    }
+    try:
+        message_spool.append(entry)
+    except OSError:
+        logger.exception("could not spool message", extra={"room_id": room_id})
+        return None
+
+    # The index loads once; in degraded mode that fails fast and the name stays empty
+    author = (user_search_index.ensure_loaded() and user_search_index.get(user_id)) or {}
+    return {
+        **entry,
+        "id": None,
+        "timestamp": datetime.fromisoformat(entry["timestamp"]),
+        "first_name": author.get("first_name"),
+        "last_name": author.get("last_name"),
+        "email": author.get("email"),
+        "avatar_url": author.get("avatar_url"),
+    }
+
+
 def register_socket_events(socketio):
     """Register all Socket.IO event handlers."""
 
-    # Store user sessions (sid -> user_id mapping)
-    connected_users = {}
+    # Every handler registered below is counted and timed (see utils.metrics)
+    socketio = instrument_socketio(socketio)
 
-    # Store room members (room_id -> set of user_ids)
-    room_members = {}
+    def store_spooled_message(entry):
+        """Spool drainer callback: store one message and tell its room the real id."""
+        try:
+            stored, message = store_spooled_message_row(
+                int(entry["room_id"]),
+                int(entry["user_id"]),
+                str(entry["content"]),
+                datetime.fromisoformat(entry["timestamp"]),
+                str(entry["spool_id"]),
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            message_spool.dead_letter(entry, f"malformed entry: {e!r}")
+            return True
+        except mysql.connector.Error as e:
+            # e.g. the room or the author was deleted while the message waited
+            message_spool.dead_letter(entry, str(e))
+            return True
+
+        if not stored:
+            return False
+        if message:
+            socketio.emit(
+                "message_saved",
+                {
+                    "room_id": entry["room_id"],
+                    "spool_id": entry["spool_id"],
+                    "message": message_payload(message),
+                },
+                to=str(entry["room_id"]),
+            )
+        return True
+
+    message_spool.start_drainer(store_spooled_message)
+    db_breaker.on_recover(message_spool.wake)
+
+    # Store people-search state per session (sid -> latest query and results)
+    user_searches = {}
+    user_search_seq = itertools.count(1)
 
     @socketio.on("connect")
     def handle_connect():
         """Handle client connection."""
-        print(f"Client connected: {request.sid}")
+        logger.info("client connected")
         emit(
             "connected",
             {"message": "Successfully connected to chat server", "sid": request.sid},
@@ -74,7 +235,17 @@ def register_socket_events(socketio):
     @socketio.on("disconnect")
     def handle_disconnect():
         """Handle client disconnection."""
-        print(f"Client disconnected: {request.sid}")
+        logger.info("client disconnected")
+        user_searches.pop(request.sid, None)
+
+        # Drop the session from every live room and refresh member counts
+        for room, member_count in presence.drop_session(request.sid):
+            if isinstance(room, int):
+                emit(
+                    "room_member_count",
+                    {"room_id": room, "member_count": member_count},
+                    to=str(room),
+                )
 
         # Update user status to offline if they were logged in
         if request.sid in connected_users:
@@ -134,7 +305,7 @@ def register_socket_events(socketio):
             broadcast=True,
         )
 
-        print(f"User {user_id} is now online")
+        logger.info("user online", extra={"user_id": int(user_id)})
 
     @socketio.on("join_room")
     @token_required
@@ -146,22 +317,20 @@ def register_socket_events(socketio):
             emit("error", {"message": "room_id is required"})
             return
 
-        room = get_room_by_id(room_id)
+        room = get_cached_room(room_id)
         if not room:
             emit("error", {"message": "Room not found"})
             return
 
-        print(f"=== User {user_id} joining room {room_id} (SID: {request.sid}) ===")
+        # Joining a room makes the user a persistent member of it
+        if not add_room_member(room["id"], int(user_id)):
+            emit("error", {"message": "Failed to join room"})
+            return
+
         join_room(str(room_id))
-        print(f"Socket {request.sid} added to room {room_id}")
 
         # Track member in room
-        if room_id not in room_members:
-            room_members[room_id] = set()
-        room_members[room_id].add(int(user_id))
-
-        # Get member count
-        member_count = len(room_members[room_id])
+        member_count = presence.join(int(room_id), request.sid, int(user_id))
 
         emit(
             "joined_room",
@@ -185,28 +354,37 @@ def register_socket_events(socketio):
             to=str(room_id),
             skip_sid=request.sid,
         )
+        record_fanout("user_joined", presence.session_count(int(room_id)) - 1)
 
-        print(f"User {user_id} joined room {room_id} (Total members: {member_count})")
+        logger.debug(
+            "joined room",
+            extra={"user_id": user_id, "room_id": room_id, "member_count": member_count},
+        )
 
     @socketio.on("leave_room")
     @token_required
     def handle_leave_room(user_id, data):
-        """Handle user leaving a room."""
+        """Handle user leaving a room.
+
+        By default this only stops live updates for the session; pass
+        ``forget: true`` to also give up membership of the room.
+        """
         room_id = data.get("room_id")
 
         if not room_id:
             emit("error", {"message": "room_id is required"})
             return
 
-        print(f"=== User {user_id} leaving room {room_id} (SID: {request.sid}) ===")
+        if data.get("forget") and not remove_room_member(room_id, int(user_id)):
+            emit("error", {"message": "Failed to leave room"})
+            return
+
         leave_room(str(room_id))
-        print(f"Socket {request.sid} removed from room {room_id}")
 
         # Remove member from room
-        if room_id in room_members and int(user_id) in room_members[room_id]:
-            room_members[room_id].discard(int(user_id))
-            member_count = len(room_members[room_id])
-        else:
+        try:
+            member_count = presence.leave(int(room_id), request.sid)
+        except (TypeError, ValueError):
             member_count = 0
 
         emit("left_room", {"room_id": room_id, "message": f"You left room {room_id}"})
@@ -223,7 +401,10 @@ def register_socket_events(socketio):
             to=str(room_id),
         )
 
-        print(f"User {user_id} left room {room_id} (Remaining members: {member_count})")
+        logger.debug(
+            "left room",
+            extra={"user_id": user_id, "room_id": room_id, "member_count": member_count},
+        )
 
     @socketio.on("send_message")
     @token_required
@@ -236,6 +417,10 @@ def register_socket_events(socketio):
             emit("error", {"message": "room_id and content are required"})
             return
 
+        if not is_room_member(room_id, user_id):
+            emit("error", {"message": "You are not a member of this room"})
+            return
+
         content = content.strip()
         if not content or len(content) > 5000:
             emit(
@@ -244,34 +429,35 @@ def register_socket_events(socketio):
             )
             return
 
-        print(f"=== User {user_id} sending message to room {room_id} ===")
-        message = create_message(room_id, int(user_id), content)
+        if WRITE_BEHIND:
+            message = spool_message(room_id, int(user_id), content)
+        else:
+            message = create_message(room_id, int(user_id), content)
+            if not message and not db_breaker.allow():
+                # Degraded mode: deliver live now, store once the database is back
+                message = spool_message(room_id, int(user_id), content)
 
         if not message:
             emit("error", {"message": "Failed to save message"})
             return
 
-        message_data = {
-            "id": message["id"],
-            "room_id": message["room_id"],
-            "user_id": message["user_id"],
-            "content": message["content"],
-            "timestamp": (
-                message["timestamp"].isoformat() if message["timestamp"] else None
-            ),
-            "user": {
-                "first_name": message["first_name"],
-                "last_name": message["last_name"],
-                "email": message["email"],
-                "avatar_url": message.get("avatar_url"),
-            },
-        }
+        message_data = message_payload(message)
 
         # Broadcast to all users in the room (including sender)
-        print(f"Broadcasting message {message['id']} to room {room_id}")
         emit("new_message", message_data, to=str(room_id), include_self=True)
+        record_fanout("new_message", presence.session_count(int(room_id)))
 
-        print(f"User {user_id} sent message to room {room_id}")
+        logger.debug(
+            "message sent",
+            extra={
+                "user_id": user_id,
+                "room_id": room_id,
+                "message_id": message["id"],
+                "spool_id": message.get("spool_id"),
+            },
+        )
+        # Socket.IO acknowledgement for clients that pass a callback
+        return {"status": "ok", "id": message["id"], "spool_id": message.get("spool_id")}
 
     @socketio.on("typing")
     @token_required
@@ -284,25 +470,43 @@ def register_socket_events(socketio):
             emit("error", {"message": "room_id is required"})
             return
 
+        if not is_room_member(room_id, user_id):
+            emit("error", {"message": "You are not a member of this room"})
+            return
+
         emit(
             "user_typing",
             {"user_id": user_id, "room_id": room_id, "is_typing": is_typing},
             to=str(room_id),
             skip_sid=request.sid,
         )
+        record_fanout("user_typing", presence.session_count(int(room_id)) - 1)
+        logger.debug(
+            "typing",
+            extra={"user_id": user_id, "room_id": room_id, "sample": "typing"},
+        )
 
     @socketio.on("get_messages")
     @token_required
     def handle_get_messages(user_id, data):
         """Handle request for message history."""
         room_id = data.get("room_id")
-        limit = data.get("limit", 50)
 
         if not room_id:
             emit("error", {"message": "room_id is required"})
             return
 
-        messages = get_room_messages(room_id, limit)
+        try:
+            limit, before_id = history_page(data)
+        except (TypeError, ValueError):
+            emit("error", {"message": "limit and before_id must be integers"})
+            return
+
+        if not is_room_member(room_id, user_id):
+            emit("error", {"message": "You are not a member of this room"})
+            return
+
+        messages = get_room_messages(room_id, limit, before_id)
 
         formatted_messages = []
         for msg in messages:
@@ -338,6 +542,10 @@ def register_socket_events(socketio):
             emit("error", {"message": "message_id and room_id are required"})
             return
 
+        if not is_room_member(room_id, user_id):
+            emit("error", {"message": "You are not a member of this room"})
+            return
+
         # Delete the message (marks as deleted in database)
         success = delete_message(message_id)
 
@@ -348,7 +556,11 @@ def register_socket_events(socketio):
                 {"message_id": message_id, "room_id": room_id},
                 to=str(room_id),
             )
-            print(f"Message {message_id} deleted by user {user_id}")
+            record_fanout("message_deleted", presence.session_count(int(room_id)))
+            logger.info(
+                "message deleted",
+                extra={"user_id": user_id, "room_id": room_id, "message_id": message_id},
+            )
         else:
             emit("error", {"message": "Failed to delete message"})
 
@@ -364,24 +576,22 @@ def register_socket_events(socketio):
             emit("error", {"message": "room_id is required"})
             return
 
-        print(
-            f"=== User {user_id} joining private chat {room_id} (SID: {request.sid}) ==="
-        )
+        if not is_private_participant(room_id, user_id):
+            emit("error", {"message": "You are not part of this conversation"})
+            return
 
         # Join the Socket.IO room
         join_room(room_id)
 
         # Track this user in the private room
-        if room_id not in room_members:
-            room_members[room_id] = set()
-        room_members[room_id].add(user_id)
+        presence.join(room_id, request.sid, int(user_id))
 
         # Confirm to the user
         emit(
             "joined_private_chat", {"room_id": room_id, "other_user_id": other_user_id}
         )
 
-        print(f"User {user_id} joined private chat {room_id}")
+        logger.debug("joined private chat", extra={"user_id": user_id, "room_id": room_id})
 
     @socketio.on("leave_private_chat")
     @token_required
@@ -392,14 +602,13 @@ def register_socket_events(socketio):
         if not room_id:
             return
 
-        print(f"User {user_id} leaving private chat {room_id}")
+        logger.debug("left private chat", extra={"user_id": user_id, "room_id": room_id})
 
         # Leave the Socket.IO room
         leave_room(room_id)
 
         # Remove from room members
-        if room_id in room_members and user_id in room_members[room_id]:
-            room_members[room_id].remove(user_id)
+        presence.leave(room_id, request.sid)
 
     @socketio.on("send_private_message")
     @token_required
@@ -413,7 +622,11 @@ def register_socket_events(socketio):
             emit("error", {"message": "room_id and content are required"})
             return
 
-        print(f"Private message from user {user_id} in room {room_id}")
+        if not is_private_participant(room_id, user_id) or not is_private_participant(
+            room_id, other_user_id
+        ):
+            emit("error", {"message": "You are not part of this conversation"})
+            return
 
         # Persist the message
         saved = create_private_message(
@@ -444,8 +657,12 @@ def register_socket_events(socketio):
 
         # Broadcast to both users in the private room (including sender)
         emit("private_message", message_data, to=room_id, include_self=True)
+        record_fanout("private_message", presence.session_count(room_id))
 
-        print(f"Private message saved and sent in room {room_id}")
+        logger.debug(
+            "private message sent",
+            extra={"user_id": user_id, "room_id": room_id, "message_id": saved["id"]},
+        )
 
     @socketio.on("get_private_messages")
     @token_required
@@ -457,7 +674,17 @@ def register_socket_events(socketio):
             emit("error", {"message": "room_id is required"})
             return
 
-        msgs = get_private_messages(room_id, data.get("limit", 50))
+        if not is_private_participant(room_id, user_id):
+            emit("error", {"message": "You are not part of this conversation"})
+            return
+
+        try:
+            limit, before_id = history_page(data)
+        except (TypeError, ValueError):
+            emit("error", {"message": "limit and before_id must be integers"})
+            return
+
+        msgs = get_private_messages(room_id, limit, before_id)
 
         formatted = []
         for m in msgs:
@@ -505,7 +732,8 @@ def register_socket_events(socketio):
         if not room_id:
             return
 
-        print(f"Private typing from user {user_id} in room {room_id}: {is_typing}")
+        if not is_private_participant(room_id, user_id):
+            return
 
         # Broadcast typing status to the other user only
         emit(
@@ -514,6 +742,10 @@ def register_socket_events(socketio):
             to=room_id,
             skip_sid=request.sid,
         )
+        logger.debug(
+            "private typing",
+            extra={"user_id": user_id, "room_id": room_id, "sample": "private_typing"},
+        )
 
     @socketio.on("check_user_status")
     @token_required
@@ -526,7 +758,7 @@ def register_socket_events(socketio):
             return
 
         # Check if user is in connected_users
-        is_online = any(uid == target_user_id for uid in connected_users.values())
+        is_online = presence.is_online(target_user_id)
 
         # Get user from database to check stored status
         target_user = get_user_by_id(target_user_id)
@@ -538,4 +770,113 @@ def register_socket_events(socketio):
 
         emit("user_status_response", {"user_id": target_user_id, "status": status})
 
-        print(f"User {user_id} checked status of user {target_user_id}: {status}")
+        logger.debug(
+            "status checked",
+            extra={"user_id": user_id, "target_user_id": target_user_id, "status": status},
+        )
+
+    @socketio.on("search_messages")
+    @token_required
+    def handle_search_messages(user_id, data):
+        """Search message history in rooms and the user's private chats."""
+        query = (data.get("query") or "").strip()
+        scope = data.get("scope", "all")
+
+        if not query:
+            emit("search_error", {"message": "query is required"})
+            return
+
+        if scope not in ("all", "rooms", "dms"):
+            emit("search_error", {"message": "scope must be one of all, rooms, dms"})
+            return
+
+        try:
+            limit = max(1, min(int(data.get("limit", 20)), MAX_SEARCH_LIMIT))
+            room_id, with_user_id, room_before, dm_before = (
+                None if data.get(key) is None else int(data[key])
+                for key in ("room_id", "with_user_id", "room_before", "dm_before")
+            )
+        except (TypeError, ValueError):
+            emit(
+                "search_error",
+                {"message": "limit, room_id, with_user_id and the cursors must be integers"},
+            )
+            return
+
+        result = search_messages(
+            int(user_id),
+            query,
+            scope=scope,
+            room_id=room_id,
+            with_user_id=with_user_id,
+            room_before=room_before,
+            dm_before=dm_before,
+            limit=limit,
+        )
+
+        emit("search_results", {"query": query, **result})
+
+    @socketio.on("search_users")
+    @token_required
+    def handle_search_users(user_id, data):
+        """Stream people-search results as the user types.
+
+        Each session has at most one query in flight: input is debounced and
+        any newer input supersedes older queries, whose results are dropped.
+        A query that extends the previous one is refined from the previous
+        result set when that set was complete; otherwise results come from
+        the shared per-prefix cache.
+        """
+        sid = request.sid
+        name = (data.get("name") or "").strip()
+        request_id = data.get("request_id")
+        try:
+            limit = max(1, min(int(data.get("limit", 20)), MAX_RESULTS - 1))
+        except (TypeError, ValueError):
+            emit(
+                "search_users_error",
+                {"request_id": request_id, "message": "limit must be an integer"},
+            )
+            return
+
+        seq = next(user_search_seq)
+        state = user_searches.setdefault(sid, {"query": None, "users": None})
+        state["latest"] = seq
+
+        if len(name) < 2:
+            emit("user_search_results", {"request_id": request_id, "name": name, "users": []})
+            return
+
+        socketio.sleep(USER_SEARCH_DEBOUNCE_SECONDS)
+        if state.get("latest") != seq:
+            return
+
+        query = normalize(name)
+        previous = state.get("query")
+        version = user_search_index.version
+        if (
+            previous
+            and len(previous) >= 3
+            and query.startswith(previous)
+            and state.get("complete")
+            and state.get("version") == version
+        ):
+            users = user_search_index.refine(state["users"], query, limit=MAX_RESULTS)
+        else:
+            users = prefix_result_cache.get(query)
+
+        # A newer query arrived while this one ran; its results win.
+        if state.get("latest") != seq:
+            return
+
+        state.update(
+            query=query,
+            users=users,
+            complete=len(users) < MAX_RESULTS,
+            version=version,
+        )
+        visible = [user for user in users if user["id"] != int(user_id)][:limit]
+        emit(
+            "user_search_results",
+            {"request_id": request_id, "name": name, "users": visible},
+        )
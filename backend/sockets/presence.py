@@ -0,0 +1,85 @@
+"""In-process presence tracking shared by socket handlers and REST routes.
+
+Tracks which users are connected and which live rooms (chat rooms and private
+chats) each socket session is subscribed to. Member counts are distinct users,
+so several tabs of the same user count once, and a user stays counted until
+their last session leaves or disconnects.
+"""
+
+import threading
+from typing import Dict, List, Tuple
+
+_lock = threading.Lock()
+
+# Store user sessions (sid -> user_id mapping)
+connected_users: Dict[str, int] = {}
+
+# Store live room subscriptions (room key -> {sid: user_id})
+_room_sessions: Dict[object, Dict[str, int]] = {}
+
+# Reverse index (sid -> set of room keys) so disconnects are cheap
+_session_rooms: Dict[str, set] = {}
+
+
+def _count(room) -> int:
+    return len(set(_room_sessions.get(room, {}).values()))
+
+
+def join(room, sid: str, user_id) -> int:
+    """Subscribe a session to a room and return the room's member count."""
+    with _lock:
+        _room_sessions.setdefault(room, {})[sid] = user_id
+        _session_rooms.setdefault(sid, set()).add(room)
+        return _count(room)
+
+
+def leave(room, sid: str) -> int:
+    """Unsubscribe a session from a room and return the remaining member count."""
+    with _lock:
+        sessions = _room_sessions.get(room)
+        if sessions is not None:
+            sessions.pop(sid, None)
+            if not sessions:
+                del _room_sessions[room]
+        rooms = _session_rooms.get(sid)
+        if rooms is not None:
+            rooms.discard(room)
+        return _count(room)
+
+
+def drop_session(sid: str) -> List[Tuple[object, int]]:
+    """Forget a disconnected session; returns (room, member_count) for each room it was in."""
+    with _lock:
+        changed = []
+        for room in _session_rooms.pop(sid, set()):
+            sessions = _room_sessions.get(room)
+            if sessions is None:
+                continue
+            sessions.pop(sid, None)
+            if not sessions:
+                del _room_sessions[room]
+            changed.append((room, _count(room)))
+        return changed
+
+
+def member_count(room) -> int:
+    """Return the number of distinct users currently in a room."""
+    with _lock:
+        return _count(room)
+
+
+def session_count(room) -> int:
+    """Return the number of sessions subscribed to a room (the fan-out of a broadcast)."""
+    with _lock:
+        return len(_room_sessions.get(room, {}))
+
+
+def member_counts() -> Dict[object, int]:
+    """Return member counts for every room with at least one session."""
+    with _lock:
+        return {room: _count(room) for room in _room_sessions}
+
+
+def is_online(user_id) -> bool:
+    """Return True if the user has at least one connected session."""
+    return any(uid == user_id for uid in list(connected_users.values()))
@@ -0,0 +1,155 @@
+"""Avatar processing: decode, strip metadata, thumbnail, store by content hash.
+
+Every upload is decoded with Pillow, rotated per its EXIF orientation,
+center-cropped to a square and re-encoded as WebP at each of AVATAR_SIZES.
+Re-encoding drops EXIF/GPS and any other metadata the original carried.
+Variants are stored as ``avatars/<digest>-<size>.webp`` where ``digest`` is a
+hash of the largest variant, so identical avatars share files and a URL
+never changes content. ``avatar_url`` points at the DEFAULT_SIZE variant;
+other sizes are found by swapping the size suffix.
+
+Without Pillow the original upload is renamed into place under its content
+hash instead, unresized.
+"""
+
+import hashlib
+import io
+import os
+import re
+import time
+from pathlib import Path
+from typing import Iterable, Optional, Set
+
+try:
+    from PIL import Image, ImageOps, UnidentifiedImageError
+except ImportError:  # Pillow is optional
+    Image = None
+
+AVATAR_DIR = Path(__file__).parent.parent.parent / "uploads" / "avatars"
+AVATAR_URL_PREFIX = "/uploads/avatars/"
+AVATAR_SIZES = (32, 64, 256)
+DEFAULT_SIZE = 64
+WEBP_QUALITY = int(os.getenv("AVATAR_WEBP_QUALITY", "85"))
+MAX_SOURCE_PIXELS = 40_000_000
+GC_GRACE_SECONDS = 3600
+
+_VARIANT_NAME = re.compile(r"^([0-9a-f]{20})(?:-\d+)?\.\w+$")
+
+
+class InvalidImage(Exception):
+    """Raised when an upload can't be decoded as an image."""
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:20]
+
+
+def _write_atomic(path: Path, data: bytes):
+    if path.exists():
+        # Content-addressed: same name means same bytes
+        return
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp_path, path)
+
+
+def _render_variants(source) -> dict:
+    if Image.MAX_IMAGE_PIXELS != MAX_SOURCE_PIXELS:
+        Image.MAX_IMAGE_PIXELS = MAX_SOURCE_PIXELS
+    try:
+        with Image.open(source) as img:
+            img = ImageOps.exif_transpose(img)
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise InvalidImage(str(e))
+
+    variants = {}
+    for size in AVATAR_SIZES:
+        thumb = ImageOps.fit(img, (size, size), Image.LANCZOS)
+        out = io.BytesIO()
+        thumb.save(out, "WEBP", quality=WEBP_QUALITY, method=4)
+        variants[size] = out.getvalue()
+    return variants
+
+
+def store_avatar(path: Path, ext: str, sha256_hex: str) -> str:
+    """Process an uploaded image and return the avatar URL to store.
+
+    Args:
+        path: Temporary file holding the upload (left in place with Pillow,
+            renamed into the avatar directory without it)
+        ext: Extension of the sniffed image type, used for the fallback name
+        sha256_hex: SHA-256 of the upload, computed while it was received
+
+    Raises: InvalidImage if the upload can't be decoded
+    """
+    AVATAR_DIR.mkdir(parents=True, exist_ok=True)
+
+    if Image is None:
+        name = f"{sha256_hex[:20]}{ext}"
+        os.replace(path, AVATAR_DIR / name)
+        return AVATAR_URL_PREFIX + name
+
+    variants = _render_variants(path)
+    digest = _digest(variants[max(AVATAR_SIZES)])
+    for size, data in variants.items():
+        _write_atomic(AVATAR_DIR / f"{digest}-{size}.webp", data)
+    return f"{AVATAR_URL_PREFIX}{digest}-{DEFAULT_SIZE}.webp"
+
+
+def avatar_key(avatar_url: Optional[str]) -> Optional[str]:
+    """Return the content digest of a pipeline avatar URL (None for legacy files)."""
+    if not avatar_url or not avatar_url.startswith(AVATAR_URL_PREFIX):
+        return None
+    match = _VARIANT_NAME.match(avatar_url[len(AVATAR_URL_PREFIX):])
+    return match.group(1) if match else None
+
+
+def remove_avatar(avatar_url: Optional[str]):
+    """Delete every file belonging to an avatar URL (all variants or the legacy file)."""
+    if not avatar_url or not avatar_url.startswith(AVATAR_URL_PREFIX):
+        return
+    name = Path(avatar_url[len(AVATAR_URL_PREFIX):]).name
+    digest = avatar_key(avatar_url)
+    paths = AVATAR_DIR.glob(f"{digest}*") if digest else [AVATAR_DIR / name]
+    for path in paths:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def collect_garbage(referenced_urls: Iterable[str]) -> int:
+    """Delete avatar files no user references any more.
+
+    Files younger than GC_GRACE_SECONDS are kept so an upload that hasn't
+    been committed to the users table yet isn't swept away.
+
+    Returns: number of files removed
+    """
+    keep_names: Set[str] = set()
+    keep_digests: Set[str] = set()
+    for url in referenced_urls:
+        if not url or not url.startswith(AVATAR_URL_PREFIX):
+            continue
+        keep_names.add(Path(url).name)
+        digest = avatar_key(url)
+        if digest:
+            keep_digests.add(digest)
+
+    if not AVATAR_DIR.is_dir():
+        return 0
+    cutoff = time.time() - GC_GRACE_SECONDS
+    removed = 0
+    for path in AVATAR_DIR.iterdir():
+        if not path.is_file() or path.name in keep_names:
+            continue
+        match = _VARIANT_NAME.match(path.name)
+        if match and match.group(1) in keep_digests:
+            continue
+        if path.stat().st_mtime > cutoff:
+            continue
+        path.unlink()
+        removed += 1
+    return removed
@@ -0,0 +1,107 @@
+"""Circuit breaker with background health probing.
+
+A breaker starts closed. After ``failure_threshold`` consecutive failures it
+opens: callers check allow() and fail at once instead of each waiting out its
+own timeout against a dependency that is down. While open, a daemon thread
+runs ``probe`` every ``probe_interval`` seconds (jittered, so several
+processes do not hammer a recovering server in step); the first successful
+probe closes the breaker again and runs the on_recover() callbacks.
+"""
+
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from utils.log import get_logger
+
+logger = get_logger("circuit_breaker")
+
+CLOSED = "closed"
+OPEN = "open"
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter: uniform(0, min(cap, base * 2**attempt))."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """Fail fast after repeated failures; probe in the background until healthy."""
+
+    def __init__(
+        self,
+        name: str,
+        probe: Callable[[], bool],
+        failure_threshold: int = 3,
+        probe_interval: float = 2.0,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self._probe = probe
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._listeners: List[Callable[[], None]] = []
+        self.state = CLOSED
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+
+    def allow(self) -> bool:
+        """True when calls should go ahead (the breaker is closed)."""
+        return self.state == CLOSED
+
+    def record_success(self) -> None:
+        if self._failures:
+            with self._lock:
+                self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state != CLOSED or self._failures < self.failure_threshold:
+                return
+            self.state = OPEN
+            self.opened_at = time.time()
+            self.times_opened += 1
+        logger.warning(
+            "circuit opened", extra={"breaker": self.name, "failures": self._failures}
+        )
+        threading.Thread(
+            target=self._probe_until_healthy, name=f"{self.name}-probe", daemon=True
+        ).start()
+
+    def on_recover(self, callback: Callable[[], None]) -> None:
+        """Run ``callback`` (on the probe thread) each time the breaker closes again."""
+        self._listeners.append(callback)
+
+    def _probe_until_healthy(self) -> None:
+        while True:
+            time.sleep(self.probe_interval * random.uniform(0.8, 1.2))
+            try:
+                healthy = self._probe()
+            except Exception:
+                healthy = False
+            if healthy:
+                break
+
+        with self._lock:
+            self.state = CLOSED
+            self._failures = 0
+            down_for = time.time() - (self.opened_at or time.time())
+        logger.warning(
+            "circuit closed", extra={"breaker": self.name, "down_seconds": round(down_for, 1)}
+        )
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception:
+                logger.exception("recovery callback failed", extra={"breaker": self.name})
+
+    def status(self) -> Dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "opened_at": self.opened_at if self.state == OPEN else None,
+            "times_opened": self.times_opened,
+        }
@@ -0,0 +1,337 @@
+"""Streaming NDJSON export and import of conversation history.
+
+Exports read archived segments first and then the hot table through an
+unbuffered (server-side) cursor, yielding one JSON object per line, so memory
+use stays constant no matter how long the history is. Imports parse a line
+stream and write it back with batched multi-row INSERTs.
+
+History and room summaries are ordered by message id. An import that lets
+the database assign new ids (the default) would therefore put older
+messages after the newest ones, so it only loads into rooms and private
+chats that have no messages yet, oldest first. With ``keep_ids`` the
+original ids (and so the original order) are kept.
+
+Record types:
+    {"type": "room_message", "id", "room_id", "user_id", "content", "deleted", "timestamp"}
+    {"type": "private_message", "id", "room_key", "sender_id", "receiver_id",
+     "content", "deleted", "read_status", "timestamp"}
+"""
+
+import gzip
+import json
+import re
+import zlib
+from datetime import datetime
+from typing import Dict, IO, Iterable, Iterator, Optional
+
+from mysql.connector import Error
+
+from config.database import get_connection
+from models import message_archive
+from models.room_model import rebuild_room_summaries
+
+FETCH_SIZE = 1000
+IMPORT_BATCH_SIZE = 1000
+
+_ROOM_FIELDS = ("room_id", "user_id", "content", "deleted", "timestamp")
+_PRIVATE_FIELDS = (
+    "room_key",
+    "sender_id",
+    "receiver_id",
+    "content",
+    "deleted",
+    "read_status",
+    "timestamp",
+)
+
+
+# Column defaults for fields an export line leaves out
+_DEFAULTS = {"deleted": "FALSE", "read_status": "FALSE", "timestamp": "CURRENT_TIMESTAMP"}
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def to_ndjson(records: Iterable[Dict]) -> Iterator[bytes]:
+    """Encode records as NDJSON lines."""
+    for record in records:
+        yield json.dumps(record, default=_json_default, separators=(",", ":")).encode(
+            "utf-8"
+        ) + b"\n"
+
+
+def gzip_stream(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Gzip a byte stream incrementally."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _stream_query(query: str, params: tuple) -> Iterator[Dict]:
+    """Yield rows from an unbuffered cursor on a dedicated connection."""
+    conn = get_connection()
+    if not conn:
+        raise RuntimeError("database unavailable")
+    try:
+        cursor = conn.cursor(dictionary=True, buffered=False)
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            yield from rows
+        cursor.close()
+    finally:
+        try:
+            conn.close()
+        except Error:
+            # Abandoned mid-stream (e.g. client went away) with rows unread
+            pass
+
+
+def _room_record(row: Dict) -> Dict:
+    record = {"type": "room_message", "id": row["id"]}
+    record.update({field: row.get(field) for field in _ROOM_FIELDS})
+    return record
+
+
+def _private_record(row: Dict) -> Dict:
+    record = {"type": "private_message", "id": row["id"]}
+    record.update({field: row.get(field) for field in _PRIVATE_FIELDS})
+    return record
+
+
+def iter_room_history(room_id: int) -> Iterator[Dict]:
+    """Yield every message of a room (archived, then hot) in id order."""
+    last_id = 0
+    for row in message_archive.iter_archive("rooms", int(room_id)):
+        last_id = row["id"]
+        yield _room_record(row)
+
+    for row in _stream_query(
+        """
+        SELECT id, room_id, user_id, content, deleted, timestamp
+        FROM messages
+        WHERE room_id = %s AND id > %s
+        ORDER BY id
+        """,
+        (room_id, last_id),
+    ):
+        yield _room_record(row)
+
+
+def _user_private_room_keys(user_id: int) -> Iterator[str]:
+    """Archived private room keys the user takes part in."""
+    directory = message_archive.ARCHIVE_DIR / "dms"
+    if not directory.is_dir():
+        return
+    pattern = re.compile(r"^private_(\d+)_(\d+)$")
+    for entry in sorted(directory.iterdir()):
+        match = pattern.match(entry.name)
+        if match and str(user_id) in match.groups():
+            yield entry.name
+
+
+def iter_user_history(user_id: int) -> Iterator[Dict]:
+    """Yield a user's private conversations and the room messages they wrote."""
+    archived_ids = set()
+    for room_key in _user_private_room_keys(user_id):
+        for row in message_archive.iter_archive("dms", room_key):
+            archived_ids.add(row["id"])
+            yield _private_record(row)
+
+    for row in _stream_query(
+        """
+        SELECT id, room_key, sender_id, receiver_id, content, deleted, read_status, timestamp
+        FROM private_messages
+        WHERE sender_id = %s OR receiver_id = %s
+        ORDER BY id
+        """,
+        (user_id, user_id),
+    ):
+        if row["id"] not in archived_ids:
+            yield _private_record(row)
+
+    for room_id in _archived_room_ids():
+        for row in message_archive.iter_archive("rooms", room_id):
+            if row["user_id"] == user_id:
+                yield _room_record(row)
+
+    for row in _stream_query(
+        """
+        SELECT id, room_id, user_id, content, deleted, timestamp
+        FROM messages
+        WHERE user_id = %s
+        ORDER BY id
+        """,
+        (user_id,),
+    ):
+        yield _room_record(row)
+
+
+def _archived_room_ids() -> Iterator[int]:
+    directory = message_archive.ARCHIVE_DIR / "rooms"
+    if not directory.is_dir():
+        return
+    for entry in sorted(directory.iterdir()):
+        if entry.name.isdigit():
+            yield int(entry.name)
+
+
+def read_ndjson(stream: IO[bytes], compressed: Optional[bool] = None) -> Iterator[Dict]:
+    """Parse an NDJSON byte stream lazily.
+
+    ``compressed`` says whether the stream is gzipped; when None it is sniffed
+    from the magic bytes (the stream must support ``peek``).
+    """
+    if compressed is None:
+        compressed = hasattr(stream, "peek") and stream.peek(2)[:2] == b"\x1f\x8b"
+    if compressed:
+        stream = gzip.GzipFile(fileobj=stream, mode="rb")
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def _insert_batch(cursor, table: str, columns, rows, keep_ids: bool) -> int:
+    if keep_ids:
+        columns = ("id",) + tuple(columns)
+    placeholders = (
+        "("
+        + ", ".join(
+            f"COALESCE(%s, {_DEFAULTS[column]})" if column in _DEFAULTS else "%s"
+            for column in columns
+        )
+        + ")"
+    )
+    verb = "INSERT IGNORE" if keep_ids else "INSERT"
+    cursor.execute(
+        f"{verb} INTO {table} ({', '.join(columns)}) VALUES "
+        + ", ".join([placeholders] * len(rows)),
+        tuple(value for row in rows for value in row),
+    )
+    return cursor.rowcount
+
+
+def _has_history(cursor, kind: str, key) -> bool:
+    """True if a room ('rooms') or private chat ('dms') already has messages."""
+    if message_archive.list_segments(kind, key):
+        return True
+    table, column = ("messages", "room_id") if kind == "rooms" else ("private_messages", "room_key")
+    cursor.execute(f"SELECT 1 FROM {table} WHERE {column} = %s LIMIT 1", (key,))
+    return cursor.fetchone() is not None
+
+
+def _oldest_first(row):
+    # Timestamp is the last column; a missing one becomes "now", i.e. newest
+    return (row[-1] is None, row[-1] or datetime.min)
+
+
+def import_history(
+    records: Iterable[Dict],
+    room_id: Optional[int] = None,
+    keep_ids: bool = False,
+    batch_size: int = IMPORT_BATCH_SIZE,
+) -> Optional[Dict]:
+    """Bulk-load exported records with batched multi-row INSERTs.
+
+    Each batch is committed on its own, so an import that fails partway
+    (bad line, truncated upload, database error) keeps the batches before it.
+
+    Args:
+        records: Parsed export records (see read_ndjson)
+        room_id: Load room messages into this room instead of their original one
+        keep_ids: Keep the exported message ids; existing ids are skipped
+        batch_size: Rows per INSERT statement
+
+    Without ``keep_ids`` every room and private chat written to must be empty
+    (see the module docstring); the first one that is not stops the import.
+    Lines that are not JSON objects are counted as "invalid" and skipped.
+
+    Returns: counts of committed rows, plus an "error" message if the import
+    stopped partway, or None if the database is unavailable
+    """
+    conn = get_connection()
+    if not conn:
+        return None
+
+    counts = {"room_messages": 0, "private_messages": 0, "skipped": 0, "invalid": 0}
+    room_rows, private_rows = [], []
+    batch_rooms, touched_rooms = set(), set()
+    # Conversations checked to be empty (and now being filled) by this import
+    accepted = set()
+
+    def accept(cursor, kind, key):
+        if keep_ids or (kind, key) in accepted:
+            return
+        if _has_history(cursor, kind, key):
+            raise ValueError(
+                f"{'room' if kind == 'rooms' else 'private chat'} {key} already has messages;"
+                " import into an empty one or use keep_ids"
+            )
+        accepted.add((kind, key))
+
+    def flush(cursor):
+        room_count = private_count = 0
+        if not keep_ids:
+            room_rows.sort(key=_oldest_first)
+            private_rows.sort(key=_oldest_first)
+        if room_rows:
+            room_count = _insert_batch(cursor, "messages", _ROOM_FIELDS, room_rows, keep_ids)
+        if private_rows:
+            private_count = _insert_batch(
+                cursor, "private_messages", _PRIVATE_FIELDS, private_rows, keep_ids
+            )
+        conn.commit()
+        counts["room_messages"] += room_count
+        counts["private_messages"] += private_count
+        room_rows.clear()
+        private_rows.clear()
+        touched_rooms.update(batch_rooms)
+        batch_rooms.clear()
+
+    try:
+        cursor = conn.cursor()
+        for record in records:
+            if not isinstance(record, dict):
+                counts["invalid"] += 1
+                continue
+            if record.get("timestamp"):
+                record["timestamp"] = datetime.fromisoformat(record["timestamp"])
+            if record.get("type") == "room_message":
+                if room_id is not None:
+                    record["room_id"] = room_id
+                accept(cursor, "rooms", int(record["room_id"]))
+                target = room_rows
+                values = [record.get(field) for field in _ROOM_FIELDS]
+                batch_rooms.add(record["room_id"])
+            elif record.get("type") == "private_message":
+                accept(cursor, "dms", str(record["room_key"]))
+                target = private_rows
+                values = [record.get(field) for field in _PRIVATE_FIELDS]
+            else:
+                counts["skipped"] += 1
+                continue
+            target.append(([record["id"]] if keep_ids else []) + values)
+            if len(target) >= batch_size:
+                flush(cursor)
+        flush(cursor)
+        cursor.close()
+    except (Error, ValueError, KeyError, EOFError, gzip.BadGzipFile, zlib.error) as e:
+        # EOFError / BadGzipFile / zlib.error: a truncated or corrupt gzip upload
+        print("Error importing history:", e)
+        conn.rollback()
+        counts["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        conn.close()
+
+    if touched_rooms:
+        rebuild_room_summaries(touched_rooms)
+    return counts
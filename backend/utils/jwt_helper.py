@@ -1,6 +1,14 @@
-from flask_jwt_extended import create_access_token
+from flask_jwt_extended import create_access_token, create_refresh_token
 
 
 def generate_token(user_id: int) -> str:
     """Wrap create_access_token to keep import sites minimal."""
     return create_access_token(identity=str(user_id))
+
+
+def generate_token_pair(user_id: int) -> dict:
+    """Issue a short-lived access token and a refresh token for a user."""
+    return {
+        "access_token": create_access_token(identity=str(user_id)),
+        "refresh_token": create_refresh_token(identity=str(user_id)),
+    }
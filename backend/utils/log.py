@@ -0,0 +1,209 @@
+"""Structured, non-blocking logging.
+
+Handlers on the request/socket path only put records on an in-memory queue
+(QueueHandler); a single background QueueListener thread formats them and
+writes to stderr, so slow terminals or pipes never stall an event handler.
+
+Every record carries the current correlation id (the X-Request-ID of a REST
+request, or a fresh id per Socket.IO event) plus the socket sid and event
+name, set through bind_context(). High-frequency events can be sampled:
+pass ``extra={"sample": "typing"}`` and configure the rate with
+LOG_SAMPLE_RATES, e.g. ``typing=0.01,private_typing=0.01``.
+
+Environment:
+    LOG_LEVEL         DEBUG, INFO (default), WARNING, ...
+    LOG_FORMAT        json (default) or text
+    LOG_SAMPLE_RATES  comma-separated key=rate pairs (default typing=0.01)
+    LOG_QUEUE_SIZE    records buffered before new ones are dropped (default 10000)
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+_correlation_id = contextvars.ContextVar("correlation_id", default=None)
+_sid = contextvars.ContextVar("sid", default=None)
+_event = contextvars.ContextVar("event", default=None)
+
+_queue: "queue.Queue" = queue.Queue(maxsize=QUEUE_SIZE)
+_listener: Optional[logging.handlers.QueueListener] = None
+dropped_records = 0
+
+
+def _parse_rates(raw: str) -> Dict[str, float]:
+    rates = {}
+    for part in raw.split(","):
+        key, _, value = part.partition("=")
+        if key.strip() and value.strip():
+            try:
+                rates[key.strip()] = float(value)
+            except ValueError:
+                pass
+    return rates
+
+
+SAMPLE_RATES = _parse_rates(os.getenv("LOG_SAMPLE_RATES", "typing=0.01,private_typing=0.01"))
+
+
+def new_correlation_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+@contextmanager
+def bind_context(correlation_id: Optional[str] = None, sid=None, event=None):
+    """Attach a correlation id (and socket sid/event) to every record logged inside."""
+    tokens = [
+        (_correlation_id, _correlation_id.set(correlation_id or new_correlation_id())),
+        (_sid, _sid.set(sid)),
+        (_event, _event.set(event)),
+    ]
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def set_correlation_id(correlation_id: Optional[str] = None) -> str:
+    """Set the correlation id for the rest of the current context (e.g. a REST request)."""
+    correlation_id = correlation_id or new_correlation_id()
+    _correlation_id.set(correlation_id)
+    return correlation_id
+
+
+def get_correlation_id() -> Optional[str]:
+    return _correlation_id.get()
+
+
+class _ContextFilter(logging.Filter):
+    """Stamp context onto records and apply per-key sampling.
+
+    Runs in the calling thread, before the record is queued, so the
+    contextvars are still those of the handler that logged it.
+    """
+
+    def filter(self, record):
+        sample_key = getattr(record, "sample", None)
+        if sample_key is not None:
+            rate = SAMPLE_RATES.get(sample_key, 1.0)
+            if rate < 1.0 and random.random() >= rate:
+                return False
+        record.correlation_id = _correlation_id.get()
+        record.sid = _sid.get()
+        record.event = _event.get()
+        return True
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full."""
+
+    def enqueue(self, record):
+        global dropped_records
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            dropped_records += 1
+
+
+_STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {
+    "message",
+    "asctime",
+    "correlation_id",
+    "sid",
+    "event",
+    "sample",
+}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the record's context and extra fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in ("correlation_id", "sid", "event"):
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def setup_logging():
+    """Route the ``chat`` loggers through the queue. Safe to call more than once."""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    stream = logging.StreamHandler(sys.stderr)
+    if LOG_FORMAT == "text":
+        stream.setFormatter(
+            logging.Formatter(
+                "%(asctime)s %(levelname)s %(name)s [%(correlation_id)s] %(message)s"
+            )
+        )
+    else:
+        stream.setFormatter(JsonFormatter())
+
+    handler = _DroppingQueueHandler(_queue)
+    handler.addFilter(_ContextFilter())
+
+    logger = logging.getLogger("chat")
+    logger.setLevel(LOG_LEVEL)
+    logger.addHandler(handler)
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(_queue, stream, respect_handler_level=True)
+    _listener.start()
+    # Flush whatever is still queued on interpreter shutdown
+    atexit.register(_listener.stop)
+    return _listener
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Return a logger under the ``chat`` namespace (e.g. get_logger("sockets"))."""
+    return logging.getLogger(f"chat.{name}")
+
+
+def queue_depth() -> int:
+    """Records waiting to be written."""
+    return _queue.qsize()
+
+
+def install_flask_logging(app):
+    """Give every REST request a correlation id (X-Request-ID is honoured and echoed)."""
+    from flask import request
+
+    @app.before_request
+    def _bind_request_id():
+        set_correlation_id(request.headers.get("X-Request-ID"))
+
+    @app.after_request
+    def _echo_request_id(response):
+        correlation_id = get_correlation_id()
+        if correlation_id:
+            response.headers["X-Request-ID"] = correlation_id
+        return response
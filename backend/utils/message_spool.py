@@ -0,0 +1,382 @@
+"""Durable local write-ahead spool for outbound room messages.
+
+Messages are appended to segment files in SPOOL_DIR (``segment-<n>.log``,
+one JSON object per line); a segment is closed once it grows past
+SPOOL_SEGMENT_BYTES and every process start opens a fresh one. append()
+returns only after its line is fsynced, but fsyncs are batched: a flusher
+thread gathers whatever was written during SPOOL_FSYNC_INTERVAL_MS and syncs
+it with a single fsync, so concurrent senders share the cost of each.
+
+A single drainer thread stores spooled messages in the database, oldest
+first, through the callback given to start_drainer(), records its position
+in a checkpoint file and deletes finished segments. While the callback cannot
+store a message (database down) the drainer backs off and retries that same
+message; one that can never be stored is moved to dead-letter.jsonl
+instead, so it does not hold up the messages behind it. Delivery is
+at-least-once, so every message carries a ``spool_id`` that the callback
+stores as the row's idempotency key: a message drained again after a crash
+is recognised instead of stored twice.
+
+A spool directory belongs to one process at a time: the first append() or
+start_drainer() takes an exclusive lock on ``spool.lock`` in it (released by
+the OS when the process exits, even on a crash), and a second process that
+shares the directory gets OSError from append() and does not drain. So every
+segment other than the owner's active one is known to be closed, and the
+drainer can delete it once it is drained. Give each server process its own
+SPOOL_DIR.
+
+Environment:
+    SPOOL_DIR                directory for segments (default spool/ in the project root)
+    SPOOL_SEGMENT_BYTES      size at which a new segment is started (default 4 MiB)
+    SPOOL_FSYNC_INTERVAL_MS  how long the flusher gathers appends per fsync (default 2)
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+from utils.circuit_breaker import backoff_delay
+from utils.log import get_logger
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+SPOOL_DIR = PROJECT_ROOT / os.getenv("SPOOL_DIR", "spool")
+SEGMENT_BYTES = int(os.getenv("SPOOL_SEGMENT_BYTES", str(4 * 1024 * 1024)))
+FSYNC_INTERVAL_SECONDS = float(os.getenv("SPOOL_FSYNC_INTERVAL_MS", "2")) / 1000
+
+# Entries the drainer reads from a segment at a time
+DRAIN_BATCH = 500
+
+logger = get_logger("spool")
+
+_cond = threading.Condition()
+_file = None
+_segment: Optional[int] = None
+_segment_size = 0
+_written = 0
+_durable = 0
+_durable_size = 0
+# Bumped whenever unsynced lines are discarded after a failed write or fsync;
+# _failed_epochs maps each ended epoch to (lines durable at the end, error)
+_epoch = 0
+_failed_epochs: Dict[int, Tuple[int, OSError]] = {}
+_flusher: Optional[threading.Thread] = None
+_drainer: Optional[threading.Thread] = None
+_pending = 0
+_lock_file = None
+
+
+def _segment_path(number: int) -> Path:
+    return SPOOL_DIR / f"segment-{number:012d}.log"
+
+
+def _segments() -> List[int]:
+    if not SPOOL_DIR.exists():
+        return []
+    return sorted(int(path.stem.split("-", 1)[1]) for path in SPOOL_DIR.glob("segment-*.log"))
+
+
+def _load_checkpoint() -> Tuple[int, int]:
+    """(segment, byte offset) before which everything has been drained."""
+    try:
+        data = json.loads((SPOOL_DIR / "checkpoint.json").read_text(encoding="utf-8"))
+        return int(data["segment"]), int(data["offset"])
+    except (OSError, ValueError, KeyError):
+        return 0, 0
+
+
+def _save_checkpoint(segment: int, offset: int) -> None:
+    # Not fsynced: losing it only re-drains entries the idempotency keys absorb
+    tmp = SPOOL_DIR / "checkpoint.tmp"
+    tmp.write_text(json.dumps({"segment": segment, "offset": offset}), encoding="utf-8")
+    os.replace(tmp, SPOOL_DIR / "checkpoint.json")
+
+
+# --- Appending ------------------------------------------------------------------
+
+
+def _claim_locked() -> None:
+    """Lock SPOOL_DIR for this process; raises OSError if another one holds it."""
+    global _lock_file
+    if _lock_file is not None:
+        return
+    SPOOL_DIR.mkdir(parents=True, exist_ok=True)
+    f = open(SPOOL_DIR / "spool.lock", "a+b")
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        f.close()
+        raise OSError(f"spool directory {SPOOL_DIR} is in use by another process") from None
+    # Just for whoever looks at the directory
+    f.truncate(0)
+    f.write(str(os.getpid()).encode("ascii"))
+    f.flush()
+    _lock_file = f
+
+
+def _sync_locked() -> None:
+    """Flush and fsync everything written so far; the caller holds _cond."""
+    global _durable, _durable_size
+    _file.flush()
+    os.fsync(_file.fileno())
+    _durable = _written
+    _durable_size = _segment_size
+    _cond.notify_all()
+
+
+def _discard_unsynced_locked(error: OSError) -> None:
+    """Drop whatever was written after the last successful fsync.
+
+    The segment is cut back to its durable size and closed, so the lost lines
+    can neither be drained later nor mixed with new ones; the next append()
+    starts a new segment. Senders still waiting for those lines get ``error``.
+    """
+    global _file, _segment_size, _written, _pending, _epoch
+    try:
+        _file.close()
+    except OSError:
+        pass
+    _file = None
+    try:
+        os.truncate(_segment_path(_segment), _durable_size)
+    except OSError:
+        # The lines stay in the segment and may still be drained
+        logger.exception("could not truncate spool segment", extra={"segment": _segment})
+    _segment_size = _durable_size
+    _pending -= _written - _durable
+    _written = _durable
+    _failed_epochs[_epoch] = (_durable, error)
+    _epoch += 1
+    _cond.notify_all()
+
+
+def _roll_locked() -> None:
+    """Close the current segment (fully synced) and start the next one."""
+    global _file, _segment, _segment_size, _durable_size
+    _claim_locked()
+    if _file is not None:
+        try:
+            _sync_locked()
+            _file.close()
+            _file = None
+        except OSError as e:
+            logger.exception("spool fsync failed")
+            _discard_unsynced_locked(e)
+    SPOOL_DIR.mkdir(parents=True, exist_ok=True)
+    existing = _segments()
+    _segment = max(existing[-1] if existing else 0, _segment or 0) + 1
+    _file = open(_segment_path(_segment), "ab")
+    _segment_size = _durable_size = 0
+    _cond.notify_all()
+
+
+def _flush_loop() -> None:
+    while True:
+        with _cond:
+            while _durable == _written:
+                _cond.wait()
+        # Let concurrent senders join this fsync
+        time.sleep(FSYNC_INTERVAL_SECONDS)
+        with _cond:
+            if _durable == _written:
+                continue
+            try:
+                _sync_locked()
+            except OSError as e:
+                logger.exception("spool fsync failed")
+                _discard_unsynced_locked(e)
+
+
+def append(entry: Dict) -> None:
+    """Add one message and return once it is on disk.
+
+    Raises OSError if it could not be; the line is then removed from the
+    spool again, so a message reported as failed is never drained.
+    """
+    global _flusher, _written, _segment_size, _pending
+    line = (json.dumps(entry, default=str) + "\n").encode("utf-8")
+    with _cond:
+        if _file is None or _segment_size >= SEGMENT_BYTES:
+            _roll_locked()
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_loop, name="spool-flusher", daemon=True)
+            _flusher.start()
+        try:
+            _file.write(line)
+        except OSError as e:
+            _discard_unsynced_locked(e)
+            raise
+        _segment_size += len(line)
+        _written += 1
+        _pending += 1
+        seq, epoch = _written, _epoch
+        _cond.notify_all()
+        while True:
+            if epoch != _epoch:
+                # Unsynced lines were discarded since: was this one of them?
+                durable, error = _failed_epochs[epoch]
+                if seq > durable:
+                    raise error
+                return
+            if _durable >= seq:
+                return
+            _cond.wait()
+
+
+def pending() -> int:
+    """Messages spooled and not drained yet."""
+    return _pending
+
+
+# --- Draining -------------------------------------------------------------------
+
+
+def _read_entries(segment: int, offset: int) -> Tuple[List[Tuple[Dict, int]], bool]:
+    """Up to DRAIN_BATCH entries after ``offset`` as (entry, offset after it),
+    and whether the segment is finished (closed and read to the end)."""
+    with _cond:
+        # Only the fsynced part of the active segment may be drained; every
+        # other segment is closed, since no other process writes here
+        limit = _durable_size if segment == _segment else None
+    with open(_segment_path(segment), "rb") as f:
+        f.seek(offset)
+        data = f.read() if limit is None else f.read(max(limit - offset, 0))
+
+    entries = []
+    position = offset
+    for line in data.splitlines(keepends=True):
+        # An unterminated last line is a torn write from a crash
+        if len(entries) >= DRAIN_BATCH or not line.endswith(b"\n"):
+            break
+        position += len(line)
+        try:
+            entries.append((json.loads(line), position))
+        except ValueError:
+            logger.warning("skipping unreadable spool line", extra={"segment": segment})
+    finished = limit is None and len(entries) < DRAIN_BATCH
+    return entries, finished
+
+
+def dead_letter(entry: Dict, reason: str) -> None:
+    """Set aside an entry that can never be stored (SPOOL_DIR/dead-letter.jsonl)."""
+    logger.error(
+        "spooled message dead-lettered",
+        extra={"spool_id": entry.get("spool_id") if isinstance(entry, dict) else None, "reason": reason},
+    )
+    SPOOL_DIR.mkdir(parents=True, exist_ok=True)
+    with open(SPOOL_DIR / "dead-letter.jsonl", "a", encoding="utf-8") as f:
+        f.write(json.dumps({"entry": entry, "reason": reason, "time": time.time()}, default=str) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _store(store: Callable[[Dict], bool], entry: Dict) -> bool:
+    try:
+        return store(entry)
+    except Exception as e:
+        # A bug or a malformed entry must not wedge the drainer: park it
+        logger.exception("spool store callback failed")
+        dead_letter(entry, f"{type(e).__name__}: {e}")
+        return True
+
+
+def _drain_loop(store: Callable[[Dict], bool]) -> None:
+    global _pending
+    segment, offset = _load_checkpoint()
+    failures = 0
+    while True:
+        later = [number for number in _segments() if number >= segment]
+        if not later:
+            with _cond:
+                _cond.wait(timeout=1.0)
+            continue
+        if later[0] != segment:
+            segment, offset = later[0], 0
+
+        entries, finished = _read_entries(segment, offset)
+        stalled = False
+        for entry, next_offset in entries:
+            if not _store(store, entry):
+                stalled = True
+                break
+            failures = 0
+            offset = next_offset
+            with _cond:
+                _pending = max(_pending - 1, 0)
+
+        if stalled:
+            # Keep this message and retry it after a pause (wake() cuts it short)
+            _save_checkpoint(segment, offset)
+            with _cond:
+                _cond.wait(timeout=backoff_delay(failures, 0.5, 10.0))
+            failures += 1
+        elif finished:
+            _segment_path(segment).unlink()
+            segment, offset = segment + 1, 0
+            _save_checkpoint(segment, offset)
+        elif entries:
+            _save_checkpoint(segment, offset)
+        else:
+            # Caught up with the active segment: wait for the next fsync
+            with _cond:
+                _cond.wait(timeout=1.0)
+
+
+def start_drainer(store: Callable[[Dict], bool]) -> None:
+    """Start the background drainer (once per process).
+
+    ``store(entry)`` returns True once the entry is dealt with (stored, or
+    passed to dead_letter()) and False to have it retried later, which it
+    should only do for failures that can clear up (database unreachable).
+    An exception from it dead-letters the entry.
+    """
+    global _drainer
+    with _cond:
+        if _drainer is not None:
+            return
+        try:
+            _claim_locked()
+        except OSError as e:
+            logger.error("spool drainer not started", extra={"reason": str(e)})
+            return
+        _drainer = threading.Thread(
+            target=_drain_loop, args=(store,), name="spool-drainer", daemon=True
+        )
+        _drainer.start()
+
+
+def wake() -> None:
+    """Cut the drainer's current wait short, e.g. when the database is back."""
+    with _cond:
+        _cond.notify_all()
+
+
+def _count_pending() -> int:
+    segment, offset = _load_checkpoint()
+    count = 0
+    for number in _segments():
+        if number < segment:
+            continue
+        with open(_segment_path(number), "rb") as f:
+            if number == segment:
+                f.seek(offset)
+            count += f.read().count(b"\n")
+    return count
+
+
+# Messages left spooled by a previous run count as pending until drained
+if SPOOL_DIR.exists():
+    _pending = _count_pending()
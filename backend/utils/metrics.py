@@ -0,0 +1,391 @@
+"""In-process metrics exposed in the Prometheus text format at /metrics.
+
+Counters, gauges and histograms keyed by label values. Updates take a
+per-metric lock for a handful of dict/list operations only (bucket lookup
+happens outside it), so instrumentation is cheap enough to leave on.
+Callback gauges are evaluated at scrape time, so values like active
+connections or queue depths cost nothing between scrapes.
+
+Socket handlers are instrumented by wrapping the SocketIO object passed to
+register_socket_events (see instrument_socketio), REST endpoints by
+install_flask_metrics, and model functions with the @db_timed decorator.
+Metrics are per process; scrape every worker.
+"""
+
+import bisect
+import inspect
+import threading
+import time
+from functools import wraps
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils import profiling
+from utils.log import get_logger
+
+logger = get_logger("metrics")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_registry: List["_Metric"] = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.label_names)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    """Value that goes up and down; optionally computed by ``callback`` at scrape time.
+
+    A callback returns either a number (unlabelled gauge) or an iterable of
+    (label_values_tuple, value) pairs.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labels=(), callback: Optional[Callable] = None):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple, float] = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        if self._callback is not None:
+            try:
+                result = self._callback()
+            except Exception as e:
+                logger.warning("Error collecting metric %s: %s", self.name, e)
+                return
+            items = [((), result)] if isinstance(result, (int, float)) else list(result)
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets (plus sum and count)."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        index = bisect.bisect_left(self.buckets, value)
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, **labels):
+        """Context manager that observes the elapsed wall time in seconds."""
+        return _Timer(self, labels)
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._values.items()]
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                labels = _format_labels(self.label_names, key, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.label_names, key)
+            yield f"{self.name}_sum{labels} {_format_value(series[-1])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+def render() -> str:
+    """Render every registered metric in the Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = list(_registry)
+    return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+# --- Metrics shared across the app -------------------------------------------
+
+socket_events = Counter(
+    "chat_socket_events_total", "Socket.IO events received, by event", ["event"]
+)
+socket_errors = Counter(
+    "chat_socket_handler_errors_total", "Socket.IO handlers that raised, by event", ["event"]
+)
+socket_latency = Histogram(
+    "chat_socket_handler_seconds", "Socket.IO handler wall time, by event", ["event"]
+)
+emit_fanout = Histogram(
+    "chat_emit_fanout_sessions",
+    "Sessions a broadcast was delivered to, by emitted event",
+    ["event"],
+    buckets=SIZE_BUCKETS,
+)
+db_latency = Histogram(
+    "chat_db_call_seconds", "Wall time of model-layer database calls, by function", ["function"]
+)
+db_read_routing = Counter(
+    "chat_db_read_routing_total",
+    "Read-only connections with MYSQL_REPLICAS set, by where they were served (replica, pinned, fallback)",
+    ["target"],
+)
+http_requests = Counter(
+    "chat_http_requests_total", "HTTP requests, by endpoint, method and status", ["endpoint", "method", "status"]
+)
+http_latency = Histogram(
+    "chat_http_request_seconds", "HTTP request wall time, by endpoint", ["endpoint"]
+)
+
+
+# Scrape-time gauges; imports are deferred so this module stays import-cycle free
+ROOM_LABEL_LIMIT = 50
+
+
+def _active_connections():
+    from sockets.presence import connected_users
+
+    return len(connected_users)
+
+
+def _live_rooms():
+    from sockets import presence
+
+    return sum(1 for room in presence.member_counts() if isinstance(room, int))
+
+
+def _members_per_room():
+    from sockets import presence
+
+    counts = [(room, count) for room, count in presence.member_counts().items() if isinstance(room, int)]
+    counts.sort(key=lambda item: item[1], reverse=True)
+    return [((room,), count) for room, count in counts[:ROOM_LABEL_LIMIT]]
+
+
+def _known_rooms():
+    from models.room_model import get_room_directory
+
+    rooms, _ = get_room_directory()
+    return len(rooms)
+
+
+def _queue_depths():
+    from utils import log, message_spool, password_hashing, room_deletion
+
+    return [
+        (("password_hashing",), password_hashing.queue_depth()),
+        (("room_deletion",), room_deletion.pending_jobs()),
+        (("log_records",), log.queue_depth()),
+        (("message_spool",), message_spool.pending()),
+    ]
+
+
+def _db_circuit_open():
+    from config.database import db_breaker
+
+    return 0 if db_breaker.allow() else 1
+
+
+Gauge("chat_active_connections", "Connected Socket.IO sessions", callback=_active_connections)
+Gauge("chat_live_rooms", "Chat rooms with at least one connected member", callback=_live_rooms)
+Gauge("chat_rooms", "Rooms in the room directory", callback=_known_rooms)
+Gauge(
+    "chat_room_members",
+    f"Connected members per room (largest {ROOM_LABEL_LIMIT} rooms)",
+    ["room_id"],
+    callback=_members_per_room,
+)
+Gauge("chat_queue_depth", "Work waiting in background queues", ["queue"], callback=_queue_depths)
+Gauge("chat_db_circuit_open", "1 while the database circuit breaker is open", callback=_db_circuit_open)
+
+
+def db_timed(fn):
+    """Record the wall time of a model function in chat_db_call_seconds."""
+    name = f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        call = profiling.current_call()
+        if call is not None:
+            call.db_depth += 1
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            db_latency.observe(elapsed, function=name)
+            # Charge only the outermost model call to a profiled handler
+            if call is not None:
+                call.db_depth -= 1
+                if call.db_depth == 0:
+                    call.db_seconds += elapsed
+                    call.db_calls += 1
+
+    return wrapper
+
+
+def record_fanout(event: str, sessions: int):
+    """Record how many sessions a broadcast went to."""
+    emit_fanout.observe(sessions, event=event)
+
+
+class _InstrumentedSocketIO:
+    """SocketIO stand-in whose ``on`` wraps handlers with event metrics.
+
+    With PROFILE_SOCKET_EVENTS set, handlers are also wrapped by
+    utils.profiling for per-call DB/emit timing and slow-event logging.
+    """
+
+    def __init__(self, socketio):
+        self._socketio = socketio
+
+    def on(self, event, *args, **kwargs):
+        from flask import request
+
+        from utils.log import bind_context
+
+        register = self._socketio.on(event, *args, **kwargs)
+
+        def decorator(handler):
+            # Flask-SocketIO calls connect handlers with ``auth`` and retries
+            # without it on TypeError; reject a call the handler cannot take
+            # before it is counted, so the retry is the only call measured.
+            # (follow_wrapped=False: decorators like token_required take *args.)
+            signature = inspect.signature(handler, follow_wrapped=False)
+            if profiling.ENABLED:
+                handler = profiling.profile_handler(event, handler)
+
+            @wraps(handler)
+            def instrumented(*handler_args, **handler_kwargs):
+                signature.bind(*handler_args, **handler_kwargs)
+                socket_events.inc(event=event)
+                start = time.perf_counter()
+                # Fresh correlation id per event so its log lines can be grouped
+                with bind_context(sid=getattr(request, "sid", None), event=event):
+                    try:
+                        return handler(*handler_args, **handler_kwargs)
+                    except Exception:
+                        socket_errors.inc(event=event)
+                        raise
+                    finally:
+                        socket_latency.observe(time.perf_counter() - start, event=event)
+
+            instrumented.__signature__ = signature
+            return register(instrumented)
+
+        return decorator
+
+    def __getattr__(self, name):
+        return getattr(self._socketio, name)
+
+
+def instrument_socketio(socketio):
+    """Wrap a SocketIO object so every handler registered through it is measured."""
+    return _InstrumentedSocketIO(socketio)
+
+
+def install_flask_metrics(app):
+    """Count and time every HTTP request by its URL rule."""
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop("metrics_start", None)
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        if start is not None:
+            http_latency.observe(time.perf_counter() - start, endpoint=endpoint)
+        http_requests.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+        return response
@@ -0,0 +1,106 @@
+"""Password hashing on a bounded process pool.
+
+Hashing is deliberately CPU-expensive. Doing it inline holds the GIL on the
+request thread, which also stalls every websocket handler in the same
+process. Hashes are computed in a small pool of worker processes instead,
+and at most PASSWORD_HASH_MAX_QUEUE calls may wait for a worker; beyond that
+callers get HashPoolBusy straight away rather than piling up.
+
+Workers are started with forkserver (spawn where that is unavailable), never
+fork: forking this multi-threaded server could copy a lock held by another
+thread into a worker, which would then deadlock on it. The fork server
+preloads nothing, and each worker re-imports the main module as
+``__mp_main__``, so app.py keeps its bootstrap in create_app() and a worker
+never starts a second spool drainer or scheduler.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", str(WORKERS * 4)))
+TIMEOUT_SECONDS = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+
+# Where forkserver is unavailable (Windows) fall back to spawn
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+_slots = threading.BoundedSemaphore(WORKERS + MAX_QUEUE)
+_in_flight = 0
+_pool = None
+_pool_lock = threading.Lock()
+_count_lock = threading.Lock()
+
+
+class HashPoolBusy(Exception):
+    """Raised when the hashing queue is full (or a worker didn't answer in time)."""
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            context = multiprocessing.get_context(START_METHOD)
+            if START_METHOD == "forkserver":
+                # The default preload imports __main__ into the fork server
+                context.set_forkserver_preload([])
+            _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=context)
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _release(_future=None):
+    global _in_flight
+    with _count_lock:
+        _in_flight -= 1
+    _slots.release()
+
+
+def _run(fn, *args):
+    global _in_flight
+    if not _slots.acquire(blocking=False):
+        raise HashPoolBusy("password hashing queue is full")
+    with _count_lock:
+        _in_flight += 1
+
+    try:
+        future = _get_pool().submit(fn, *args)
+    except (BrokenProcessPool, RuntimeError):
+        _release()
+        _reset_pool()
+        raise HashPoolBusy("password hashing pool unavailable")
+    future.add_done_callback(_release)
+
+    try:
+        return future.result(timeout=TIMEOUT_SECONDS)
+    except TimeoutError:
+        raise HashPoolBusy("password hashing timed out")
+    except BrokenProcessPool:
+        _reset_pool()
+        raise HashPoolBusy("password hashing pool unavailable")
+
+
+def hash_password(password: str) -> str:
+    """Hash a password in the worker pool. Raises HashPoolBusy when saturated."""
+    return _run(generate_password_hash, password)
+
+
+def verify_password(password_hash: str, password: str) -> bool:
+    """Check a password against its hash in the worker pool. Raises HashPoolBusy when saturated."""
+    return _run(check_password_hash, password_hash, password)
+
+
+def queue_depth() -> int:
+    """Number of hashing calls running or waiting for a worker."""
+    return _in_flight
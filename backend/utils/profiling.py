@@ -0,0 +1,280 @@
+"""Opt-in per-handler profiling for Socket.IO events.
+
+Enable with PROFILE_SOCKET_EVENTS=1. Every handler registered through
+register_socket_events is then wrapped (see utils.metrics) so each call
+records its wall time, the time spent in @db_timed model functions and the
+time spent emitting. Calls slower than SLOW_EVENT_MS are logged with the
+shape of their payload (keys, types and sizes, never the values).
+
+On demand, an admin can open a capture window (start_capture) during which a
+fraction of calls run under cProfile; the aggregated stats are written to
+PROFILE_DIR when the window closes. dump_stacks() writes the current stack of
+every thread, which is the quickest way to see what a stuck worker is doing.
+
+All of this is per process.
+"""
+
+import contextvars
+import cProfile
+import io
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import traceback
+from functools import wraps
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from utils.log import get_logger
+
+ENABLED = os.getenv("PROFILE_SOCKET_EVENTS", "").lower() in ("1", "true", "yes")
+SLOW_EVENT_MS = float(os.getenv("SLOW_EVENT_MS", "250"))
+PROFILE_DIR = Path(
+    os.getenv("PROFILE_DIR", str(Path(__file__).parent.parent.parent / "profiles"))
+)
+MAX_CAPTURE_SECONDS = 600
+
+logger = get_logger("profiling")
+
+
+class _CallStats:
+    __slots__ = ("db_seconds", "db_calls", "db_depth", "emit_seconds", "emits")
+
+    def __init__(self):
+        self.db_seconds = 0.0
+        self.db_calls = 0
+        self.db_depth = 0
+        self.emit_seconds = 0.0
+        self.emits = 0
+
+
+_current_call = contextvars.ContextVar("profiled_call", default=None)
+
+
+def current_call() -> Optional[_CallStats]:
+    """Stats of the handler call running in this context, if it is being profiled."""
+    return _current_call.get()
+
+
+# Per-event aggregates: event -> [calls, wall, db, emit, max wall, slow calls]
+_totals: Dict[str, List[float]] = {}
+_totals_lock = threading.Lock()
+
+# Capture window state
+_capture_lock = threading.Lock()
+_capture: Optional[dict] = None
+# cProfile can only run one profiler at a time, so sampled calls take turns
+_profiler_lock = threading.Lock()
+
+
+def payload_shape(value, depth: int = 0):
+    """Describe the structure of a payload without its contents."""
+    if depth >= 3:
+        return type(value).__name__
+    if isinstance(value, dict):
+        return {str(key): payload_shape(item, depth + 1) for key, item in list(value.items())[:20]}
+    if isinstance(value, (list, tuple)):
+        shape = [f"len={len(value)}"]
+        if value:
+            shape.append(payload_shape(value[0], depth + 1))
+        return shape
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def _record(event: str, wall: float, stats: _CallStats, slow: bool):
+    with _totals_lock:
+        totals = _totals.setdefault(event, [0, 0.0, 0.0, 0.0, 0.0, 0])
+        totals[0] += 1
+        totals[1] += wall
+        totals[2] += stats.db_seconds
+        totals[3] += stats.emit_seconds
+        totals[4] = max(totals[4], wall)
+        totals[5] += slow
+
+
+def _sampled_profiler(event: str) -> Optional[cProfile.Profile]:
+    capture = _capture
+    if capture is None or time.monotonic() >= capture["until"]:
+        return None
+    if capture["events"] and event not in capture["events"]:
+        return None
+    if random.random() >= capture["sample_rate"]:
+        return None
+    if not _profiler_lock.acquire(blocking=False):
+        return None
+    return cProfile.Profile()
+
+
+def _merge_profile(event: str, profiler: cProfile.Profile):
+    with _capture_lock:
+        capture = _capture
+        if capture is None:
+            return
+        stats = capture["stats"].get(event)
+        if stats is None:
+            capture["stats"][event] = pstats.Stats(profiler)
+        else:
+            stats.add(profiler)
+        capture["samples"][event] = capture["samples"].get(event, 0) + 1
+
+
+def profile_handler(event: str, handler):
+    """Wrap a socket handler with per-call timing, slow-event logging and sampling."""
+
+    @wraps(handler)
+    def profiled(*args, **kwargs):
+        stats = _CallStats()
+        token = _current_call.set(stats)
+        profiler = _sampled_profiler(event)
+        start = time.perf_counter()
+        try:
+            if profiler is None:
+                return handler(*args, **kwargs)
+            try:
+                return profiler.runcall(handler, *args, **kwargs)
+            finally:
+                _profiler_lock.release()
+                _merge_profile(event, profiler)
+        finally:
+            wall = time.perf_counter() - start
+            _current_call.reset(token)
+            slow = wall * 1000 >= SLOW_EVENT_MS
+            _record(event, wall, stats, slow)
+            if slow:
+                logger.warning(
+                    "slow socket event",
+                    extra={
+                        "wall_ms": round(wall * 1000, 2),
+                        "db_ms": round(stats.db_seconds * 1000, 2),
+                        "db_calls": stats.db_calls,
+                        "emit_ms": round(stats.emit_seconds * 1000, 2),
+                        "emits": stats.emits,
+                        "payload": payload_shape(args[0]) if args else None,
+                    },
+                )
+
+    return profiled
+
+
+def profiled_emit(emit):
+    """Wrap flask_socketio.emit so its time is charged to the current call."""
+
+    @wraps(emit)
+    def timed(*args, **kwargs):
+        stats = _current_call.get()
+        if stats is None:
+            return emit(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return emit(*args, **kwargs)
+        finally:
+            stats.emit_seconds += time.perf_counter() - start
+            stats.emits += 1
+
+    return timed
+
+
+def summary() -> Dict[str, dict]:
+    """Per-event aggregates since startup (or the last reset)."""
+    with _totals_lock:
+        items = [(event, list(totals)) for event, totals in _totals.items()]
+    result = {}
+    for event, (calls, wall, db, emit, max_wall, slow) in items:
+        result[event] = {
+            "calls": int(calls),
+            "avg_ms": round(wall / calls * 1000, 3),
+            "avg_db_ms": round(db / calls * 1000, 3),
+            "avg_emit_ms": round(emit / calls * 1000, 3),
+            "max_ms": round(max_wall * 1000, 3),
+            "slow_calls": int(slow),
+        }
+    return result
+
+
+def reset_summary():
+    with _totals_lock:
+        _totals.clear()
+
+
+def start_capture(seconds: float, sample_rate: float, events=None) -> bool:
+    """Open a cProfile capture window; returns False if one is already open."""
+    global _capture
+    seconds = max(1.0, min(float(seconds), MAX_CAPTURE_SECONDS))
+    with _capture_lock:
+        if _capture is not None:
+            return False
+        _capture = {
+            "until": time.monotonic() + seconds,
+            "sample_rate": max(0.0, min(float(sample_rate), 1.0)),
+            "events": set(events or ()),
+            "stats": {},
+            "samples": {},
+        }
+    timer = threading.Timer(seconds, finish_capture)
+    timer.daemon = True
+    timer.start()
+    return True
+
+
+def capture_status() -> Optional[dict]:
+    capture = _capture
+    if capture is None:
+        return None
+    return {
+        "remaining_seconds": round(max(0.0, capture["until"] - time.monotonic()), 1),
+        "sample_rate": capture["sample_rate"],
+        "events": sorted(capture["events"]),
+        "samples": dict(capture["samples"]),
+    }
+
+
+def finish_capture() -> List[str]:
+    """Close the capture window and write one .prof (plus a .txt summary) per event."""
+    global _capture
+    with _capture_lock:
+        capture, _capture = _capture, None
+    if capture is None:
+        return []
+
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    written = []
+    for event, stats in capture["stats"].items():
+        base = PROFILE_DIR / f"{stamp}-{event}"
+        stats.dump_stats(str(base) + ".prof")
+        text = io.StringIO()
+        stats.stream = text
+        stats.sort_stats("cumulative").print_stats(40)
+        base.with_suffix(".txt").write_text(
+            f"{capture['samples'].get(event, 0)} sampled calls of {event}\n\n" + text.getvalue(),
+            encoding="utf-8",
+        )
+        written.append(base.name + ".prof")
+    logger.info("profile capture written", extra={"files": written})
+    return written
+
+
+def dump_stacks() -> str:
+    """Write the current stack of every thread to PROFILE_DIR and return the file name."""
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    lines = []
+    for ident, frame in sys._current_frames().items():
+        lines.append(f"--- Thread {names.get(ident, '?')} ({ident}) ---")
+        lines.extend(line.rstrip("\n") for line in traceback.format_stack(frame))
+        lines.append("")
+
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    name = f"stacks-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.txt"
+    (PROFILE_DIR / name).write_text("\n".join(lines), encoding="utf-8")
+    return name
+
+
+def list_dumps() -> List[str]:
+    if not PROFILE_DIR.is_dir():
+        return []
+    return sorted(path.name for path in PROFILE_DIR.iterdir() if path.is_file())
@@ -0,0 +1,80 @@
+"""In-memory sliding-window attempt throttling.
+
+Each limiter remembers the timestamps of recent attempts per key (an IP or an
+email) and refuses new ones once ``limit`` attempts fall inside the window.
+State is per process and is lost on restart, which is fine for slowing down
+credential stuffing.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from flask import request
+
+TRUST_PROXY_HEADERS = os.getenv("TRUST_PROXY_HEADERS", "").lower() in ("1", "true", "yes")
+SWEEP_EVERY = 1000
+
+
+class SlidingWindowLimiter:
+    """Allow at most ``limit`` attempts per key within ``window_seconds``."""
+
+    def __init__(self, limit: int, window_seconds: float):
+        self.limit = limit
+        self.window = window_seconds
+        self._hits: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+        self._calls = 0
+
+    def _trim(self, hits: Deque[float], now: float):
+        while hits and hits[0] <= now - self.window:
+            hits.popleft()
+
+    def _sweep(self, now: float):
+        # Drop keys whose attempts have all aged out so memory stays bounded
+        for key in [k for k, hits in self._hits.items() if not hits or hits[-1] <= now - self.window]:
+            del self._hits[key]
+
+    def hit(self, key: str) -> Optional[float]:
+        """Record an attempt for ``key``.
+
+        Returns: None if allowed, else the seconds until the next attempt is allowed
+        """
+        if self.limit <= 0 or not key:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            self._calls += 1
+            if self._calls % SWEEP_EVERY == 0:
+                self._sweep(now)
+
+            hits = self._hits.setdefault(key, deque())
+            self._trim(hits, now)
+            if len(hits) >= self.limit:
+                return max(hits[0] + self.window - now, 0.0)
+            hits.append(now)
+            return None
+
+    def reset(self, key: str):
+        """Forget a key's attempts (e.g. after a successful login)."""
+        with self._lock:
+            self._hits.pop(key, None)
+
+
+login_ip_limiter = SlidingWindowLimiter(
+    int(os.getenv("LOGIN_IP_LIMIT", "30")), float(os.getenv("LOGIN_IP_WINDOW_SECONDS", "60"))
+)
+login_email_limiter = SlidingWindowLimiter(
+    int(os.getenv("LOGIN_EMAIL_LIMIT", "5")), float(os.getenv("LOGIN_EMAIL_WINDOW_SECONDS", "300"))
+)
+
+
+def client_ip() -> str:
+    """The caller's IP, honouring X-Forwarded-For only when TRUST_PROXY_HEADERS is set."""
+    if TRUST_PROXY_HEADERS:
+        forwarded = request.headers.get("X-Forwarded-For", "")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.remote_addr or ""
@@ -0,0 +1,210 @@
+"""Message retention: move old messages to the archive and purge tombstones.
+
+Policies:
+    Room messages older than the room's ``retention_days`` (or
+    MESSAGE_RETENTION_DAYS when the room has no policy) and private messages
+    older than DM_RETENTION_DAYS are written to compressed archive segments
+    (see models.message_archive) and removed from the hot tables. A value of
+    0 keeps messages in the hot tables forever.
+
+    Deleted messages (empty tombstones) are removed outright
+    TOMBSTONE_GRACE_DAYS after they were deleted; they are never archived.
+
+Work is done in batches of RETENTION_BATCH_SIZE rows, each archived and
+deleted in its own short transaction. Run it from ``run_retention.py`` or let
+the backend schedule it every RETENTION_INTERVAL_HOURS.
+"""
+
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from mysql.connector import Error
+
+from config.database import get_connection
+from models import message_archive
+from models.room_model import get_room_retention_policies
+from models.storage import for_backend
+
+DEFAULT_ROOM_RETENTION_DAYS = int(os.getenv("MESSAGE_RETENTION_DAYS", "0"))
+DM_RETENTION_DAYS = int(os.getenv("DM_RETENTION_DAYS", "0"))
+TOMBSTONE_GRACE_DAYS = int(os.getenv("TOMBSTONE_GRACE_DAYS", "7"))
+BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "5000"))
+INTERVAL_HOURS = float(os.getenv("RETENTION_INTERVAL_HOURS", "0"))
+
+
+def _database_now(cursor):
+    # Compare against the database clock so app and DB time zones can't disagree
+    cursor.execute(
+        for_backend(
+            mysql="SELECT CURRENT_TIMESTAMP",
+            # Column-name type hint so sqlite3 returns a datetime, not a string
+            sqlite='SELECT CURRENT_TIMESTAMP AS "now [TIMESTAMP]"',
+        )
+    )
+    return cursor.fetchone()[0]
+
+
+def _delete_ids(cursor, table: str, ids) -> None:
+    placeholders = ", ".join(["%s"] * len(ids))
+    cursor.execute(f"DELETE FROM {table} WHERE id IN ({placeholders})", tuple(ids))
+
+
+def archive_room_messages(conn, room_id: int, cutoff, batch_size: int = BATCH_SIZE) -> int:
+    """Archive a room's live messages older than ``cutoff``. Returns the number moved."""
+    moved = 0
+    cursor = conn.cursor(dictionary=True)
+    try:
+        while True:
+            cursor.execute(
+                """
+                SELECT id, room_id, user_id, content, deleted, timestamp
+                FROM messages
+                WHERE room_id = %s AND deleted = FALSE AND timestamp < %s
+                ORDER BY id
+                LIMIT %s
+                """,
+                (room_id, cutoff, batch_size),
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                return moved
+            message_archive.write_segment("rooms", room_id, rows)
+            _delete_ids(cursor, "messages", [row["id"] for row in rows])
+            conn.commit()
+            moved += len(rows)
+    finally:
+        cursor.close()
+
+
+def archive_private_messages(conn, cutoff, batch_size: int = BATCH_SIZE) -> int:
+    """Archive live private messages older than ``cutoff``. Returns the number moved."""
+    moved = 0
+    cursor = conn.cursor(dictionary=True)
+    try:
+        last_id = 0
+        while True:
+            cursor.execute(
+                """
+                SELECT id, room_key, sender_id, receiver_id, content, deleted,
+                       read_status, timestamp
+                FROM private_messages
+                WHERE id > %s AND deleted = FALSE AND timestamp < %s
+                ORDER BY id
+                LIMIT %s
+                """,
+                (last_id, cutoff, batch_size),
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                return moved
+            last_id = rows[-1]["id"]
+
+            by_room = defaultdict(list)
+            for row in rows:
+                by_room[row["room_key"]].append(row)
+
+            archived_ids = []
+            for room_key, room_rows in by_room.items():
+                try:
+                    message_archive.write_segment("dms", room_key, room_rows)
+                except ValueError:
+                    # Malformed room key; leave those rows in the hot table
+                    continue
+                archived_ids.extend(row["id"] for row in room_rows)
+
+            if archived_ids:
+                _delete_ids(cursor, "private_messages", archived_ids)
+                conn.commit()
+                moved += len(archived_ids)
+    finally:
+        cursor.close()
+
+
+def purge_tombstones(conn, cutoff, batch_size: int = BATCH_SIZE) -> int:
+    """Remove messages deleted before ``cutoff`` from both tables.
+
+    Tombstones from before the deleted_at column (or imported ones) have no
+    deletion time and fall back to the message's own timestamp.
+    """
+    purged = 0
+    cursor = conn.cursor()
+    try:
+        for table in ("messages", "private_messages"):
+            while True:
+                cursor.execute(
+                    f"""
+                    SELECT id FROM {table}
+                    WHERE deleted = TRUE
+                      AND (deleted_at < %s OR (deleted_at IS NULL AND timestamp < %s))
+                    ORDER BY id
+                    LIMIT %s
+                    """,
+                    (cutoff, cutoff, batch_size),
+                )
+                ids = [row[0] for row in cursor.fetchall()]
+                if not ids:
+                    break
+                _delete_ids(cursor, table, ids)
+                conn.commit()
+                purged += len(ids)
+    finally:
+        cursor.close()
+    return purged
+
+
+def apply_retention():
+    """Apply every retention policy once.
+
+    Returns: stats dict, or None if the database is unavailable
+    """
+    conn = get_connection()
+    if not conn:
+        return None
+
+    stats = {"room_messages_archived": 0, "private_messages_archived": 0, "tombstones_purged": 0}
+    try:
+        cursor = conn.cursor()
+        now = _database_now(cursor)
+        cursor.close()
+
+        for room_id, retention_days in get_room_retention_policies():
+            days = DEFAULT_ROOM_RETENTION_DAYS if retention_days is None else retention_days
+            if days > 0:
+                stats["room_messages_archived"] += archive_room_messages(
+                    conn, room_id, now - timedelta(days=days)
+                )
+
+        if DM_RETENTION_DAYS > 0:
+            stats["private_messages_archived"] = archive_private_messages(
+                conn, now - timedelta(days=DM_RETENTION_DAYS)
+            )
+
+        stats["tombstones_purged"] = purge_tombstones(
+            conn, now - timedelta(days=TOMBSTONE_GRACE_DAYS)
+        )
+        return stats
+    except (Error, OSError) as e:
+        print("Error applying message retention:", e)
+        return None
+    finally:
+        conn.close()
+
+
+def start_retention_scheduler():
+    """Run apply_retention() every RETENTION_INTERVAL_HOURS in a daemon thread (0 disables)."""
+    if INTERVAL_HOURS <= 0:
+        return None
+
+    def loop():
+        while True:
+            time.sleep(INTERVAL_HOURS * 3600)
+            stats = apply_retention()
+            if stats:
+                print(f"Message retention: {stats}")
+
+    thread = threading.Thread(target=loop, name="message-retention", daemon=True)
+    thread.start()
+    return thread
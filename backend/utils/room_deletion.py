@@ -0,0 +1,145 @@
+"""Asynchronous room deletion jobs.
+
+Deleting a room hides it immediately (soft delete) and hands the heavy part,
+purging its messages, to a single background worker. The worker removes
+messages in small chunks with a pause between them, so a room with millions
+of messages never becomes one long, lock-heavy transaction and other rooms'
+traffic keeps flowing. Rooms left soft-deleted by a restart are picked up
+again by resume_pending_room_deletions().
+"""
+
+import itertools
+import os
+import queue
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from models import message_archive
+from models.room_member_model import forget_room
+from models.room_model import get_soft_deleted_room_ids, purge_room, soft_delete_rooms
+
+CHUNK_SIZE = int(os.getenv("ROOM_PURGE_CHUNK_SIZE", "1000"))
+PAUSE_SECONDS = float(os.getenv("ROOM_PURGE_PAUSE_MS", "50")) / 1000
+MAX_FINISHED_JOBS = 200
+
+_job_ids = itertools.count(1)
+_jobs: Dict[int, Dict] = {}
+_jobs_lock = threading.Lock()
+_queue: "queue.Queue[int]" = queue.Queue()
+_worker: Optional[threading.Thread] = None
+
+
+def _new_job(room_ids: List[int], requested_by: Optional[str] = None) -> Dict:
+    job = {
+        "id": next(_job_ids),
+        "status": "queued",
+        "requested_by": requested_by,
+        "room_ids": room_ids,
+        "rooms_done": 0,
+        "current_room_id": None,
+        "messages_purged": 0,
+        "failed_room_ids": [],
+        "created_at": time.time(),
+        "finished_at": None,
+    }
+    with _jobs_lock:
+        _jobs[job["id"]] = job
+        finished = [job_id for job_id, j in _jobs.items() if j["finished_at"]]
+        for job_id in finished[:-MAX_FINISHED_JOBS]:
+            del _jobs[job_id]
+    return job
+
+
+def _run_job(job: Dict):
+    job["status"] = "running"
+    for room_id in job["room_ids"]:
+        job["current_room_id"] = room_id
+        purged_before = job["messages_purged"]
+
+        def progress(purged, base=purged_before):
+            job["messages_purged"] = base + purged
+
+        purged = purge_room(room_id, CHUNK_SIZE, PAUSE_SECONDS, progress)
+        if purged is None:
+            job["failed_room_ids"].append(room_id)
+        else:
+            message_archive.delete_archive("rooms", room_id)
+        job["rooms_done"] += 1
+
+    job["current_room_id"] = None
+    job["status"] = "failed" if job["failed_room_ids"] else "done"
+    job["finished_at"] = time.time()
+
+
+def _work():
+    while True:
+        job_id = _queue.get()
+        with _jobs_lock:
+            job = _jobs.get(job_id)
+        if job:
+            try:
+                _run_job(job)
+            except Exception as e:
+                print(f"Room deletion job {job_id} crashed: {e}")
+                job["status"] = "failed"
+                job["finished_at"] = time.time()
+        _queue.task_done()
+
+
+def _ensure_worker():
+    global _worker
+    with _jobs_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(
+                target=_work, name="room-deletion", daemon=True
+            )
+            _worker.start()
+
+
+def _enqueue(room_ids: List[int], requested_by: Optional[str] = None) -> Dict:
+    job = _new_job(room_ids, requested_by)
+    _ensure_worker()
+    _queue.put(job["id"])
+    return job
+
+
+def start_room_deletion(room_ids: Iterable[int], requested_by=None) -> Optional[Dict]:
+    """Soft-delete rooms now and queue their purge.
+
+    ``requested_by`` (a user id) is kept on the job so only that user (and
+    admins) can follow it. Returns a snapshot of the job, or None if none of
+    the rooms were live.
+    """
+    deleted = soft_delete_rooms(room_ids)
+    if not deleted:
+        return None
+    for room_id in deleted:
+        forget_room(room_id)
+    requested_by = None if requested_by is None else str(requested_by)
+    return get_job(_enqueue(deleted, requested_by)["id"])
+
+
+def resume_pending_room_deletions() -> Optional[Dict]:
+    """Queue a purge for rooms soft-deleted before the last restart."""
+    room_ids = get_soft_deleted_room_ids()
+    if not room_ids:
+        return None
+    return get_job(_enqueue(room_ids)["id"])
+
+
+def get_job(job_id: int) -> Optional[Dict]:
+    """Return a snapshot of a deletion job's progress."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if not job:
+            return None
+        snapshot = dict(job)
+        snapshot["room_ids"] = list(job["room_ids"])
+        snapshot["failed_room_ids"] = list(job["failed_room_ids"])
+        return snapshot
+
+
+def pending_jobs() -> int:
+    """Return the number of jobs waiting for the worker."""
+    return _queue.qsize()
@@ -0,0 +1,149 @@
+"""Cache-friendly serving of files from disk.
+
+Files whose names carry a content hash never change, so they are sent with a
+year-long ``immutable`` Cache-Control and browsers stop asking for them.
+Everything else gets a short max-age plus a strong (content-derived) ETag,
+and a matching If-None-Match is answered with 304.
+
+Set STATIC_OFFLOAD=x-accel (nginx) or x-sendfile (Apache/lighttpd) to have
+the front proxy send the bytes: the response then carries only headers and
+X-Accel-Redirect / X-Sendfile. With x-accel, STATIC_ACCEL_PREFIX is the
+internal nginx location that maps onto the project root.
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from flask import abort, make_response, request, send_file
+from werkzeug.security import safe_join
+
+OFFLOAD = os.getenv("STATIC_OFFLOAD", "").lower()
+ACCEL_PREFIX = os.getenv("STATIC_ACCEL_PREFIX", "/protected/")
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "public, max-age=300, must-revalidate"
+
+# A 16-64 char hex hash as the name or a dotted/dashed part of it, e.g.
+# 3f2a...c1-64.webp (avatars) or chat.3f2a...c1.js (built assets)
+_HASHED_NAME = re.compile(r"(?:^|[.-])([0-9a-f]{16,64})(?:-\d+)?(?:\.[\w]+)+$")
+
+_etag_cache: Dict[str, Tuple[float, int, str]] = {}
+_etag_lock = threading.Lock()
+
+
+def content_hash(name: str) -> Optional[str]:
+    """Return the content hash embedded in a fingerprinted file name, if any."""
+    match = _HASHED_NAME.search(name)
+    return match.group(1) if match else None
+
+
+def _file_etag(path: Path, stat: os.stat_result) -> str:
+    """SHA-256 based ETag, cached until the file's mtime or size changes."""
+    key = str(path)
+    with _etag_lock:
+        cached = _etag_cache.get(key)
+    if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+        return cached[2]
+
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(65536), b""):
+            sha256.update(chunk)
+    etag = sha256.hexdigest()[:32]
+    with _etag_lock:
+        _etag_cache[key] = (stat.st_mtime, stat.st_size, etag)
+    return etag
+
+
+def send_cached_file(
+    directory: Path,
+    filename: str,
+    mimetype: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+    etag_suffix: str = "",
+):
+    """Send ``directory/filename`` with caching headers and conditional GET support.
+
+    Args:
+        directory: Directory to serve from (``filename`` may not escape it)
+        filename: Requested path relative to ``directory``
+        mimetype: Override the guessed mimetype
+        headers: Extra headers (e.g. Content-Encoding, Vary) for the response
+        etag_suffix: Appended to the ETag, to tell encodings of one file apart
+    """
+    safe_path = safe_join(str(directory), filename)
+    if safe_path is None:
+        abort(404)
+    path = Path(safe_path)
+    try:
+        stat = path.stat()
+    except OSError:
+        abort(404)
+    if not path.is_file():
+        abort(404)
+
+    digest = content_hash(path.name)
+    etag = (digest or _file_etag(path, stat)) + etag_suffix
+    cache_control = IMMUTABLE_CACHE if digest else REVALIDATE_CACHE
+
+    if request.if_none_match.contains(etag):
+        response = make_response("", 304)
+    elif OFFLOAD in ("x-accel", "x-sendfile"):
+        response = make_response("")
+        if OFFLOAD == "x-accel":
+            relative = path.resolve().relative_to(PROJECT_ROOT.resolve())
+            response.headers["X-Accel-Redirect"] = ACCEL_PREFIX + relative.as_posix()
+        else:
+            response.headers["X-Sendfile"] = str(path.resolve())
+        if mimetype:
+            response.mimetype = mimetype
+        else:
+            response.headers.pop("Content-Type", None)
+    else:
+        response = send_file(
+            path, mimetype=mimetype, conditional=False, etag=False, max_age=None
+        )
+
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    for name, value in (headers or {}).items():
+        response.headers[name] = value
+    return response
+
+
+# Precompressed siblings written by build_frontend.py, best first
+_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def send_precompressed(directory: Path, filename: str):
+    """Send a built asset, preferring a .br/.gz sibling the client accepts."""
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    if mimetype.startswith("text/") or mimetype == "application/javascript":
+        mimetype += "; charset=utf-8"
+
+    safe_path = safe_join(str(directory), filename)
+    if safe_path is None:
+        abort(404)
+
+    has_variants = False
+    for encoding, suffix in _ENCODINGS:
+        if not os.path.isfile(safe_path + suffix):
+            continue
+        has_variants = True
+        if request.accept_encodings[encoding]:
+            return send_cached_file(
+                directory,
+                filename + suffix,
+                mimetype=mimetype,
+                headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"},
+                etag_suffix="-" + encoding,
+            )
+
+    headers = {"Vary": "Accept-Encoding"} if has_variants else None
+    return send_cached_file(directory, filename, mimetype=mimetype, headers=headers)
@@ -0,0 +1,112 @@
+"""Streaming multipart uploads with early size rejection.
+
+The multipart body is parsed straight off the socket: each file part is
+written in chunks to a temporary file next to its final location while a
+SHA-256 is updated as it goes, and the upload is aborted with 413 as soon
+as it grows past the limit. The file type is decided by the first bytes of
+the content, not by the client's filename.
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional
+
+from flask import request
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.formparser import parse_form_data
+
+TMP_DIR = Path(__file__).parent.parent.parent / "uploads" / ".tmp"
+
+# Leading bytes of each accepted image type -> extension
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+)
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Return the extension for an image's magic bytes, or None if unrecognised."""
+    for signature, ext in _SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+class HashingFile:
+    """Temp file that hashes and size-checks everything written to it."""
+
+    def __init__(self, max_bytes: int):
+        TMP_DIR.mkdir(parents=True, exist_ok=True)
+        self._file = tempfile.NamedTemporaryFile(dir=TMP_DIR, delete=False)
+        self.path = Path(self._file.name)
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.head = b""
+        self._sha256 = hashlib.sha256()
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            self.discard()
+            raise RequestEntityTooLarge()
+        if len(self.head) < 16:
+            self.head += data[: 16 - len(self.head)]
+        self._sha256.update(data)
+        return self._file.write(data)
+
+    def hexdigest(self) -> str:
+        return self._sha256.hexdigest()
+
+    def discard(self):
+        """Close and delete the temp file."""
+        self._file.close()
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+def receive_files(max_file_bytes: int) -> Dict[str, HashingFile]:
+    """Parse the current multipart request, streaming each file to a HashingFile.
+
+    Raises RequestEntityTooLarge (413) as soon as a file passes
+    ``max_file_bytes``. The caller owns the returned files and must
+    discard() them, or move them into place with os.replace().
+    """
+    created = []
+
+    def stream_factory(total_content_length, content_type, filename, content_length=None):
+        if content_length and content_length > max_file_bytes:
+            raise RequestEntityTooLarge()
+        spool = HashingFile(max_file_bytes)
+        created.append(spool)
+        return spool
+
+    try:
+        _, _, files = parse_form_data(
+            request.environ,
+            stream_factory=stream_factory,
+            max_content_length=request.max_content_length,
+        )
+    except Exception:
+        for spool in created:
+            spool.discard()
+        raise
+
+    received = {}
+    for field, storage in files.items():
+        storage.stream.flush()
+        received[field] = storage.stream
+    for spool in created:
+        if spool not in received.values():
+            spool.discard()
+    return received
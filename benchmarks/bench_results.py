@@ -0,0 +1,67 @@
+"""
+Saving and comparing benchmark results.
+
+Each run is written to benchmarks/results/<benchmark>-<commit>-<time>.json
+(gitignored) so numbers from different commits can be compared later.
+"""
+
+import json
+import subprocess
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = PROJECT_ROOT / "benchmarks" / "results"
+
+
+def git_commit():
+    """Short HEAD hash, suffixed with -dirty when tracked files have changes."""
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, text=True
+        ).strip()
+        dirty = bool(
+            subprocess.check_output(
+                ["git", "status", "--porcelain", "--untracked-files=no"], cwd=PROJECT_ROOT, text=True
+            ).strip()
+        )
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def save_result(benchmark, params, result):
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    commit = git_commit()
+    path = RESULTS_DIR / f"{benchmark}-{commit}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    path.write_text(
+        json.dumps(
+            {"benchmark": benchmark, "commit": commit, "time": time.time(), "params": params, "result": result},
+            indent=2,
+            default=str,
+        ),
+        encoding="utf-8",
+    )
+    return path
+
+
+def load_baseline(benchmark, compare, current=None):
+    """Return (path, result) of ``compare`` ('latest' or a file), or (None, None)."""
+    if compare == "latest":
+        previous = sorted(
+            (p for p in RESULTS_DIR.glob(f"{benchmark}-*.json") if p != current),
+            key=lambda p: p.stat().st_mtime,
+        )
+        if not previous:
+            return None, None
+        path = previous[-1]
+    else:
+        path = Path(compare)
+    return path, json.loads(path.read_text(encoding="utf-8"))["result"]
+
+
+def change(value, old):
+    """'(was X, +N.N%)' for numeric values with a non-zero baseline, else ''."""
+    if isinstance(value, (int, float)) and isinstance(old, (int, float)) and old:
+        return f"(was {old}, {100 * (value - old) / old:+.1f}%)"
+    return ""
@@ -0,0 +1,360 @@
+"""
+Model-layer benchmark: time hot model functions at several data sizes and
+record the query plans behind them.
+
+For each --sizes entry (room-message count; users, rooms and DMs scale with
+it, see seed_data.profile_for) the seeded data set is grown to that size and
+every case below is timed over --iterations calls after a short warm-up:
+
+- create_message                     into the busiest room
+- get_room_messages                  latest page of a busy, a median and a quiet room,
+                                     plus a page from the middle of the busiest room
+- get_private_messages               busiest and median conversation
+- mark_messages_as_read              busiest conversation, with 5 fresh unread messages
+- get_unread_count                   busiest conversation
+- search_users_by_name               2-char, 3-char, full-name and mid-word queries
+                                     (in-memory index; its load time is recorded too)
+
+The SQL each case actually runs is captured on one extra call and passed
+through EXPLAIN (EXPLAIN QUERY PLAN with DB_BACKEND=sqlite); plans showing
+full scans, filesorts or temporary tables are flagged. Results (timings, plans and row counts per size) are saved under
+benchmarks/results/ and --compare latest prints the change in p95 against an
+earlier run.
+
+    python benchmarks/model_bench.py --sizes 100k,1m,5m
+    python benchmarks/model_bench.py --no-seed --compare latest
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import argparse
+import statistics
+import time
+from contextlib import contextmanager
+
+from bench_results import change, load_baseline, save_result
+from seed_data import (
+    SEED_EMAIL_PATTERN,
+    SEED_ROOM_PATTERN,
+    ensure_tables,
+    parse_count,
+    profile_for,
+    seed,
+)
+
+from config.database import get_connection
+from models import message_model, private_message_model, user_model
+from models.storage import for_backend, get_storage
+from models.user_search_index import UserSearchIndex
+
+PLAN_COLUMNS = ("table", "type", "key", "rows", "filtered", "Extra")
+SEARCH_QUERIES = ("ma", "mar", "maria garcia", "tin")
+
+
+# --- Query capture and plans --------------------------------------------------
+
+
+class _RecordingCursor:
+    def __init__(self, cursor, log):
+        self._cursor = cursor
+        self._log = log
+
+    def execute(self, statement, params=None, *args, **kwargs):
+        self._log.append((statement, params))
+        return self._cursor.execute(statement, params, *args, **kwargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+        return False
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _RecordingConnection:
+    def __init__(self, conn, log):
+        self._conn = conn
+        self._log = log
+
+    def cursor(self, *args, **kwargs):
+        return _RecordingCursor(self._conn.cursor(*args, **kwargs), self._log)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+@contextmanager
+def capture_queries(*modules):
+    """Record (statement, params) of everything the given model modules execute."""
+    log = []
+    originals = {module: module.get_connection for module in modules}
+
+    def recording_connection(*args, **kwargs):
+        conn = get_connection(*args, **kwargs)
+        return _RecordingConnection(conn, log) if conn else None
+
+    for module in modules:
+        module.get_connection = recording_connection
+    try:
+        yield log
+    finally:
+        for module, original in originals.items():
+            module.get_connection = original
+
+
+def explain(statement, params):
+    """EXPLAIN a captured statement; returns the plan rows (INSERTs are skipped)."""
+    if statement.lstrip().upper().startswith("INSERT"):
+        return None
+    conn = get_connection()
+    if not conn:
+        return None
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(for_backend(mysql="EXPLAIN ", sqlite="EXPLAIN QUERY PLAN ") + statement, params)
+        rows = cursor.fetchall()
+        cursor.close()
+        if get_storage().name == "sqlite":
+            return [{"detail": row["detail"]} for row in rows]
+        return [{column: row.get(column) for column in PLAN_COLUMNS} for row in rows]
+    finally:
+        conn.close()
+
+
+def plan_warnings(rows):
+    warnings = []
+    for row in rows or ():
+        if "detail" in row:
+            # SQLite: "SCAN messages" is a full scan, "SEARCH ... USING INDEX" is not
+            detail = row["detail"]
+            if detail.startswith("SCAN ") and "USING" not in detail:
+                warnings.append(f"full scan: {detail}")
+            if "USE TEMP B-TREE" in detail:
+                warnings.append(f"temporary sort: {detail}")
+            continue
+        extra = row.get("Extra") or ""
+        if row.get("type") == "ALL":
+            warnings.append(f"full scan of {row['table']} (~{row['rows']} rows)")
+        if "filesort" in extra:
+            warnings.append(f"filesort on {row['table']}")
+        if "temporary" in extra:
+            warnings.append(f"temporary table for {row['table']}")
+    return warnings
+
+
+# --- Cases --------------------------------------------------------------------
+
+
+def _query(sql, params=()):
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    conn.commit()
+    cursor.close()
+    conn.close()
+    return rows
+
+
+def pick_fixtures():
+    """Busy/median/quiet rooms and conversations from the seeded data."""
+    rooms = _query(
+        "SELECT id, message_count, last_message_id FROM rooms WHERE name LIKE %s "
+        "AND message_count > 0 ORDER BY message_count DESC",
+        (SEED_ROOM_PATTERN,),
+    )
+    busiest, median, quiet = rooms[0], rooms[len(rooms) // 2], rooms[-1]
+    middle_id = _query(
+        "SELECT id FROM messages WHERE room_id = %s ORDER BY id LIMIT 1 OFFSET %s",
+        (busiest[0], busiest[1] // 2),
+    )[0][0]
+    author = _query("SELECT user_id FROM room_members WHERE room_id = %s LIMIT 1", (busiest[0],))[0][0]
+
+    conversations = _query(
+        "SELECT pm.room_key, pm.receiver_id, COUNT(*) AS c FROM private_messages pm "
+        "JOIN users u ON u.id = pm.sender_id WHERE u.email LIKE %s "
+        "GROUP BY pm.room_key, pm.receiver_id ORDER BY c DESC",
+        (SEED_EMAIL_PATTERN,),
+    )
+    return {
+        "busiest_room": busiest[0],
+        "median_room": median[0],
+        "quiet_room": quiet[0],
+        "middle_id": middle_id,
+        "author": author,
+        "busiest_dm": conversations[0][:2],
+        "median_dm": conversations[len(conversations) // 2][:2],
+    }
+
+
+def mark_unread(room_key, receiver_id, count=5):
+    """Untimed setup for mark_messages_as_read: flag the latest messages unread."""
+    ids = [
+        row[0]
+        for row in _query(
+            "SELECT id FROM private_messages WHERE room_key = %s AND receiver_id = %s "
+            "ORDER BY id DESC LIMIT %s",
+            (room_key, receiver_id, count),
+        )
+    ]
+    if ids:
+        _query(
+            f"UPDATE private_messages SET read_status = FALSE WHERE id IN ({', '.join(['%s'] * len(ids))})",
+            ids,
+        )
+
+
+def build_cases(f):
+    """name -> (function, args, setup or None, modules whose SQL to capture)."""
+    dm_key, dm_reader = f["busiest_dm"]
+    median_key, _ = f["median_dm"]
+    messages = (message_model,)
+    private = (private_message_model,)
+    cases = {
+        "create_message": (
+            message_model.create_message,
+            (f["busiest_room"], f["author"], "benchmark message"),
+            None,
+            messages,
+        ),
+        "get_room_messages[busiest]": (message_model.get_room_messages, (f["busiest_room"], 50), None, messages),
+        "get_room_messages[median]": (message_model.get_room_messages, (f["median_room"], 50), None, messages),
+        "get_room_messages[quiet]": (message_model.get_room_messages, (f["quiet_room"], 50), None, messages),
+        "get_room_messages[deep page]": (
+            message_model.get_room_messages,
+            (f["busiest_room"], 50, f["middle_id"]),
+            None,
+            messages,
+        ),
+        "get_private_messages[busiest]": (private_message_model.get_private_messages, (dm_key, 50), None, private),
+        "get_private_messages[median]": (private_message_model.get_private_messages, (median_key, 50), None, private),
+        "mark_messages_as_read": (
+            private_message_model.mark_messages_as_read,
+            (dm_key, dm_reader),
+            lambda: mark_unread(dm_key, dm_reader),
+            private,
+        ),
+        "get_unread_count": (private_message_model.get_unread_count, (dm_key, dm_reader), None, private),
+    }
+    for query in SEARCH_QUERIES:
+        cases[f"search_users_by_name[{query}]"] = (user_model.search_users_by_name, (query,), None, ())
+    return cases
+
+
+def time_case(function, args, setup, iterations, warmup=5):
+    samples = []
+    for i in range(warmup + iterations):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            samples.append(elapsed * 1000)
+    ordered = sorted(samples)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))], 3)
+
+    return {
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "mean_ms": round(statistics.mean(samples), 3),
+    }
+
+
+def run_size(label, iterations, grow):
+    print(f"\n{label}")
+    print("-" * 60)
+    counts = grow()
+    print("  data: " + ", ".join(f"{k}={v:,}" for k, v in counts.items()))
+
+    # A fresh people-search index, loaded from the current users table
+    user_model.user_search_index = UserSearchIndex()
+    start = time.perf_counter()
+    user_model.user_search_index.ensure_loaded()
+    index_load_ms = round((time.perf_counter() - start) * 1000, 1)
+    print(f"  search index load: {index_load_ms} ms")
+
+    fixtures = pick_fixtures()
+    timings, plans = {}, {}
+    for name, (function, args, setup, modules) in build_cases(fixtures).items():
+        timings[name] = time_case(function, args, setup, iterations)
+        if modules:
+            if setup:
+                setup()
+            with capture_queries(*modules) as log:
+                function(*args)
+            plans[name] = []
+            for statement, params in log:
+                rows = explain(statement, params)
+                if rows is not None:
+                    plans[name].append(
+                        {"sql": " ".join(statement.split()), "plan": rows, "warnings": plan_warnings(rows)}
+                    )
+        t = timings[name]
+        flags = sorted({w for p in plans.get(name, ()) for w in p["warnings"]})
+        print(
+            f"  {name:<34} p50 {t['p50_ms']:>8.2f}  p95 {t['p95_ms']:>8.2f}  p99 {t['p99_ms']:>8.2f} ms"
+            + (f"  ⚠️  {'; '.join(flags)}" if flags else "")
+        )
+    return {
+        "counts": counts,
+        "search_index_load_ms": index_load_ms,
+        "fixtures": fixtures,
+        "timings": timings,
+        "plans": plans,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark model functions at several data sizes")
+    parser.add_argument("--sizes", default="100k,1m", help="room-message counts, e.g. 100k,1m,5m")
+    parser.add_argument("--iterations", type=int, default=200, help="timed calls per case")
+    parser.add_argument("--no-seed", action="store_true", help="benchmark the current data only")
+    parser.add_argument("--compare", help="'latest' or a saved result file to compare p95 against")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    if not get_connection():
+        print("❌ Could not connect to database")
+        sys.exit(1)
+    ensure_tables()
+
+    print("=" * 60)
+    print("Model benchmark")
+    print("=" * 60)
+
+    results = {}
+    if args.no_seed:
+        results["current"] = run_size("current data", args.iterations, lambda: seed(0, 0, 0, 0, 0))
+    else:
+        for size in (parse_count(part) for part in args.sizes.split(",")):
+            profile = profile_for(size)
+            results[f"{size:,} messages"] = run_size(
+                f"{size:,} messages", args.iterations, lambda: seed(**profile, progress=lambda _: None)
+            )
+
+    saved = None if args.no_save else save_result("model_bench", vars(args), results)
+    if args.compare:
+        baseline_path, baseline = load_baseline("model_bench", args.compare, saved)
+        if baseline:
+            print(f"\np95 vs {baseline_path.name}")
+            print("-" * 60)
+            for size, result in results.items():
+                old_size = baseline.get(size, {}).get("timings", {})
+                for name, timing in result["timings"].items():
+                    old = old_size.get(name, {}).get("p95_ms")
+                    print(f"  {size:<18} {name:<34} {timing['p95_ms']:>8.2f} ms {change(timing['p95_ms'], old)}")
+
+    print("\n" + "=" * 60)
+    if saved:
+        print(f"📂 Saved: benchmarks/results/{saved.name}")
+    print("=" * 60)
@@ -0,0 +1,428 @@
+"""
+Seed the database with realistic chat volumes for benchmarking.
+
+Grows the seeded data set to the requested size, so repeated runs with larger
+targets only insert the difference:
+
+- users with common first/last names (seed-<n>@seed.invalid)
+- rooms (seed-room-<n>) whose member counts follow a Zipf distribution: a
+  few very large rooms and a long tail of small ones
+- room messages spread over rooms in proportion to their size, with
+  Zipf-distributed words so full-text search sees a natural vocabulary
+- private messages between user pairs whose activity is also skewed, about
+  5% of them unread
+
+Rows are inserted with multi-row INSERTs in --batch sized transactions. Use a
+dedicated database: point MYSQL_DB at it or pass --database.
+
+    python benchmarks/seed_data.py --messages 2000000
+    python benchmarks/seed_data.py --messages 5000000 --users 300000 --yes
+    python benchmarks/seed_data.py --reset --yes
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import argparse
+import bisect
+import itertools
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+SEED_EMAIL = "seed-{}@seed.invalid"
+SEED_EMAIL_PATTERN = "seed-%@seed.invalid"
+SEED_ROOM = "seed-room-{}"
+SEED_ROOM_PATTERN = "seed-room-%"
+MESSAGE_SPACING_SECONDS = 15
+UNREAD_RATIO = 0.05
+
+FIRST_NAMES = (
+    "James Mary John Patricia Robert Jennifer Michael Linda William Elizabeth David Barbara "
+    "Richard Susan Joseph Jessica Thomas Sarah Charles Karen Christopher Nancy Daniel Lisa "
+    "Matthew Betty Anthony Margaret Mark Sandra Donald Ashley Steven Kimberly Paul Emily "
+    "Andrew Donna Joshua Michelle Kenneth Carol Kevin Amanda Brian Dorothy George Melissa "
+    "Timothy Deborah Ronald Stephanie Jason Rebecca Edward Sharon Jeffrey Laura Ryan Cynthia "
+    "Jacob Amy Gary Kathleen Nicholas Angela Eric Shirley Jonathan Anna Stephen Brenda "
+    "José María Zoë Chloé Amara Kwame Aiko Hiroshi Mei Wei Priya Arjun Fatima Omar Lexa"
+).split()
+LAST_NAMES = (
+    "Smith Johnson Williams Brown Jones Garcia Miller Davis Rodriguez Martinez Hernandez "
+    "Lopez Gonzalez Wilson Anderson Thomas Taylor Moore Jackson Martin Lee Perez Thompson "
+    "White Harris Sanchez Clark Ramirez Lewis Robinson Walker Young Allen King Wright Scott "
+    "Torres Nguyen Hill Flores Green Adams Nelson Baker Hall Rivera Campbell Mitchell Carter "
+    "Roberts Okafor Mensah Tanaka Suzuki Chen Wang Patel Sharma Khan Haddad Müller Schmidt "
+    "Dubois Rossi Novak Kowalski Ivanova Silva Santos O'Brien Smith-Jones"
+).split()
+COMMON_WORDS = (
+    "the be to of and a in that have I it for not on with he as you do at this but his by "
+    "from they we say her she or an will my one all would there their what so up out if "
+    "about who get which go me when make can like time no just him know take people into "
+    "year your good some could them see other than then now look only come its over think "
+    "also back after use two how our work first well way even new want because any these "
+    "give day most us meeting deploy release bug fix review lunch today tomorrow thanks "
+    "please ticket build server database error test merge branch coffee weekend call"
+).split()
+
+
+def _zipf_weights(count, skew):
+    return [1.0 / (rank + 1) ** skew for rank in range(count)]
+
+
+def _vocabulary(rng, size=3000):
+    """Common words first, then pronounceable made-up words for the long tail."""
+    syllables = ["ka", "lo", "mi", "ne", "ru", "ta", "shi", "vo", "den", "par", "sel", "tor"]
+    words = list(COMMON_WORDS)
+    while len(words) < size:
+        words.append("".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))))
+    return words
+
+
+class Seeder:
+    def __init__(self, conn, rng, skew, batch, progress=print):
+        self.conn = conn
+        self.rng = rng
+        self.skew = skew
+        self.batch = batch
+        self.progress = progress
+        self.words = _vocabulary(rng)
+        self.word_weights = list(itertools.accumulate(_zipf_weights(len(self.words), 1.0)))
+
+    def _ids(self, query, params=()):
+        cursor = self.conn.cursor()
+        cursor.execute(query, params)
+        ids = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+        return ids
+
+    def _count(self, query, params=()):
+        cursor = self.conn.cursor()
+        cursor.execute(query, params)
+        count = cursor.fetchone()[0]
+        cursor.close()
+        return count
+
+    def _insert(self, statement, rows, label, total):
+        """Insert rows from an iterator in batches, one transaction per batch."""
+        cursor = self.conn.cursor()
+        done = 0
+        started = time.perf_counter()
+        while True:
+            chunk = list(itertools.islice(rows, self.batch))
+            if not chunk:
+                break
+            cursor.executemany(statement, chunk)
+            self.conn.commit()
+            done += len(chunk)
+            rate = done / max(time.perf_counter() - started, 1e-9)
+            self.progress(f"  {label}: {done}/{total} ({rate:,.0f} rows/s)")
+        cursor.close()
+        return done
+
+    def _content(self):
+        length = min(60, max(1, int(self.rng.lognormvariate(2.2, 0.6))))
+        return " ".join(self.rng.choices(self.words, cum_weights=self.word_weights, k=length))
+
+    # --- Users and rooms ----------------------------------------------------
+
+    def seeded_users(self):
+        return self._ids(
+            "SELECT id FROM users WHERE email LIKE %s ORDER BY id", (SEED_EMAIL_PATTERN,)
+        )
+
+    def seeded_rooms(self):
+        return self._ids(
+            "SELECT id FROM rooms WHERE name LIKE %s ORDER BY id", (SEED_ROOM_PATTERN,)
+        )
+
+    def grow_users(self, target):
+        existing = len(self.seeded_users())
+        if existing >= target:
+            return 0
+        password_hash = generate_password_hash("SeedPass123")
+        rows = (
+            (
+                SEED_EMAIL.format(n),
+                password_hash,
+                self.rng.choice(FIRST_NAMES),
+                self.rng.choice(LAST_NAMES),
+                "offline",
+            )
+            for n in range(existing, target)
+        )
+        return self._insert(
+            "INSERT INTO users (email, password_hash, first_name, last_name, status) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            rows,
+            "users",
+            target - existing,
+        )
+
+    def room_size(self, rank, user_count):
+        largest = min(user_count, max(50, user_count // 20))
+        return max(2, int(largest / (rank + 1) ** self.skew))
+
+    def grow_rooms(self, target, user_ids):
+        existing = len(self.seeded_rooms())
+        if existing >= target:
+            return 0
+        self._insert(
+            "INSERT INTO rooms (name, created_by) VALUES (%s, %s)",
+            ((SEED_ROOM.format(n), user_ids[0]) for n in range(existing, target)),
+            "rooms",
+            target - existing,
+        )
+        new_rooms = self.seeded_rooms()[existing:]
+        memberships = sum(self.room_size(existing + i, len(user_ids)) for i in range(len(new_rooms)))
+        rows = (
+            (room_id, user_id)
+            for i, room_id in enumerate(new_rooms)
+            for user_id in self.rng.sample(user_ids, self.room_size(existing + i, len(user_ids)))
+        )
+        self._insert(
+            "INSERT IGNORE INTO room_members (room_id, user_id) VALUES (%s, %s)",
+            rows,
+            "room members",
+            memberships,
+        )
+        return len(new_rooms)
+
+    # --- Messages -----------------------------------------------------------
+
+    def seeded_message_count(self):
+        return self._count(
+            "SELECT COUNT(*) FROM messages m JOIN rooms r ON r.id = m.room_id WHERE r.name LIKE %s",
+            (SEED_ROOM_PATTERN,),
+        )
+
+    def grow_messages(self, target, room_ids):
+        existing = self.seeded_message_count()
+        if existing >= target or not room_ids:
+            return 0
+
+        members = {}
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT rm.room_id, rm.user_id FROM room_members rm "
+            "JOIN rooms r ON r.id = rm.room_id WHERE r.name LIKE %s",
+            (SEED_ROOM_PATTERN,),
+        )
+        for room_id, user_id in cursor.fetchall():
+            members.setdefault(room_id, []).append(user_id)
+        cursor.close()
+        room_ids = [room_id for room_id in room_ids if members.get(room_id)]
+
+        # Activity follows room size: busy rooms get most of the traffic
+        weights = list(
+            itertools.accumulate(len(members[room_id]) for room_id in room_ids)
+        )
+        count = target - existing
+        newest = datetime.now()
+
+        def rows():
+            for n in range(count):
+                room_id = room_ids[bisect.bisect_left(weights, self.rng.uniform(0, weights[-1]))]
+                yield (
+                    room_id,
+                    self.rng.choice(members[room_id]),
+                    self._content(),
+                    newest - timedelta(seconds=(count - n) * MESSAGE_SPACING_SECONDS),
+                )
+
+        return self._insert(
+            "INSERT INTO messages (room_id, user_id, content, timestamp) VALUES (%s, %s, %s, %s)",
+            rows(),
+            "room messages",
+            count,
+        )
+
+    def seeded_dm_count(self):
+        return self._count(
+            "SELECT COUNT(*) FROM private_messages pm JOIN users u ON u.id = pm.sender_id "
+            "WHERE u.email LIKE %s",
+            (SEED_EMAIL_PATTERN,),
+        )
+
+    def grow_dms(self, target, user_ids, pairs):
+        existing = self.seeded_dm_count()
+        if existing >= target or len(user_ids) < 2:
+            return 0
+
+        conversations = []
+        seen = set()
+        while len(conversations) < min(pairs, len(user_ids) * (len(user_ids) - 1) // 2):
+            a, b = self.rng.sample(user_ids, 2)
+            key = (min(a, b), max(a, b))
+            if key not in seen:
+                seen.add(key)
+                conversations.append(key)
+        weights = list(itertools.accumulate(_zipf_weights(len(conversations), self.skew)))
+        count = target - existing
+        newest = datetime.now()
+
+        def rows():
+            for n in range(count):
+                a, b = conversations[bisect.bisect_left(weights, self.rng.uniform(0, weights[-1]))]
+                sender, receiver = (a, b) if self.rng.random() < 0.5 else (b, a)
+                yield (
+                    f"private_{a}_{b}",
+                    sender,
+                    receiver,
+                    self._content(),
+                    self.rng.random() >= UNREAD_RATIO,
+                    newest - timedelta(seconds=(count - n) * MESSAGE_SPACING_SECONDS),
+                )
+
+        return self._insert(
+            "INSERT INTO private_messages "
+            "(room_key, sender_id, receiver_id, content, read_status, timestamp) "
+            "VALUES (%s, %s, %s, %s, %s, %s)",
+            rows(),
+            "private messages",
+            count,
+        )
+
+    def reset(self):
+        """Delete every seeded row; one room (and its cascaded messages) per transaction."""
+        cursor = self.conn.cursor()
+        for room_id in self.seeded_rooms():
+            cursor.execute("DELETE FROM rooms WHERE id = %s", (room_id,))
+            self.conn.commit()
+        user_ids = self.seeded_users()
+        for start in range(0, len(user_ids), self.batch):
+            chunk = user_ids[start : start + self.batch]
+            cursor.execute(
+                f"DELETE FROM users WHERE id IN ({', '.join(['%s'] * len(chunk))})", chunk
+            )
+            self.conn.commit()
+        cursor.close()
+
+
+def profile_for(messages):
+    """Data set proportions used when only a message count is given."""
+    users = max(1000, messages // 10)
+    return {
+        "users": users,
+        "rooms": max(20, messages // 1000),
+        "messages": messages,
+        "dms": messages // 4,
+        "dm_pairs": max(100, users // 10),
+    }
+
+
+def seed(users, rooms, messages, dms, dm_pairs, skew=1.1, batch=5000, random_seed=42, progress=print):
+    """Grow the seeded data set to the given sizes; returns the counts afterwards."""
+    from config.database import get_connection
+    from models.room_model import rebuild_room_summaries
+
+    conn = get_connection()
+    if not conn:
+        raise RuntimeError("could not connect to database")
+    try:
+        seeder = Seeder(conn, random.Random(f"{random_seed}-{users}-{messages}"), skew, batch, progress)
+        seeder.grow_users(users)
+        user_ids = seeder.seeded_users()
+        seeder.grow_rooms(rooms, user_ids)
+        room_ids = seeder.seeded_rooms()
+        added = seeder.grow_messages(messages, room_ids)
+        seeder.grow_dms(dms, user_ids, dm_pairs)
+        counts = {
+            "users": len(user_ids),
+            "rooms": len(room_ids),
+            "messages": seeder.seeded_message_count(),
+            "dms": seeder.seeded_dm_count(),
+        }
+    finally:
+        conn.close()
+
+    if added:
+        progress("  rebuilding room summaries")
+        rebuild_room_summaries()
+    return counts
+
+
+def reset(batch=5000):
+    from config.database import get_connection
+
+    conn = get_connection()
+    if not conn:
+        raise RuntimeError("could not connect to database")
+    try:
+        Seeder(conn, random.Random(), 1.0, batch).reset()
+    finally:
+        conn.close()
+
+
+def ensure_tables():
+    """Create the tables (the model modules create theirs on import)."""
+    from models.user_model import init_user_table
+
+    init_user_table()
+    import models.room_model  # noqa: F401
+    import models.room_member_model  # noqa: F401
+    import models.message_model  # noqa: F401
+    import models.private_message_model  # noqa: F401
+
+
+def parse_count(text):
+    """'2m' -> 2000000, '250k' -> 250000."""
+    text = text.strip().lower()
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * multiplier)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed benchmark data")
+    parser.add_argument("--messages", type=parse_count, default=parse_count("1m"))
+    parser.add_argument("--users", type=parse_count, help="default: messages / 10")
+    parser.add_argument("--rooms", type=parse_count, help="default: messages / 1000")
+    parser.add_argument("--dms", type=parse_count, help="default: messages / 4")
+    parser.add_argument("--dm-pairs", type=parse_count, help="default: users / 10")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for room sizes and activity")
+    parser.add_argument("--batch", type=int, default=5000, help="rows per INSERT transaction")
+    parser.add_argument("--seed", type=int, default=42, help="random seed")
+    parser.add_argument("--database", help="override MYSQL_DB")
+    parser.add_argument("--reset", action="store_true", help="delete all seeded data")
+    parser.add_argument("--yes", action="store_true", help="don't ask for confirmation")
+    args = parser.parse_args()
+
+    if args.database:
+        os.environ["MYSQL_DB"] = args.database
+    from config.database import _get_env
+
+    database = _get_env("MYSQL_DB")
+    if not args.yes:
+        action = "DELETE all seeded data from" if args.reset else "Seed benchmark data into"
+        if input(f"{action} database '{database}'? (yes/no): ").strip().lower() != "yes":
+            print("Cancelled.")
+            sys.exit(0)
+
+    print("=" * 60)
+    if args.reset:
+        print(f"Resetting seeded data in '{database}'")
+        print("=" * 60)
+        reset(args.batch)
+        print("✓ Seeded data removed")
+        print("=" * 60)
+        sys.exit(0)
+
+    profile = profile_for(args.messages)
+    for key in ("users", "rooms", "dms", "dm_pairs"):
+        if getattr(args, key) is not None:
+            profile[key] = getattr(args, key)
+    print(f"Seeding '{database}': " + ", ".join(f"{k}={v:,}" for k, v in profile.items()))
+    print("=" * 60)
+
+    ensure_tables()
+    started = time.perf_counter()
+    counts = seed(**profile, skew=args.skew, batch=args.batch, random_seed=args.seed)
+    print("=" * 60)
+    for key, value in counts.items():
+        print(f"✓ {key:<9} {value:>12,}")
+    print(f"⏱  {time.perf_counter() - started:.1f}s")
+    print("=" * 60)
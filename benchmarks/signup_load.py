@@ -0,0 +1,137 @@
+"""
+Signup load benchmark: legacy two-query registration vs single-statement register_user.
+
+Registers --users accounts per path from --concurrency threads straight
+against the database (the password hash is computed once up front so the
+numbers reflect the database path, not hashing), with --duplicates percent of
+attempts reusing an email that already exists. Prints throughput and latency
+percentiles for each path and removes the accounts it created.
+
+    python benchmarks/signup_load.py --users 2000 --concurrency 16
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import argparse
+import random
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import generate_password_hash
+
+from config.database import get_connection
+from models.user_model import create_user, get_user_by_email, register_user
+
+
+def legacy_signup(email, password_hash):
+    """The old /auth/register path: look the email up, then insert."""
+    if get_user_by_email(email):
+        return "duplicate"
+    return "ok" if create_user(email, password_hash, "Bench", "User") else "error"
+
+
+def single_statement_signup(email, password_hash):
+    """The current /auth/register path: one INSERT, duplicates from the unique index."""
+    _, error = register_user(email, password_hash, "Bench", "User")
+    return error or "ok"
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(name, signup, emails, password_hash, concurrency):
+    latencies = []
+    outcomes = {}
+
+    def one(email):
+        start = time.perf_counter()
+        outcome = signup(email, password_hash)
+        return outcome, time.perf_counter() - start
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for outcome, latency in pool.map(one, emails):
+            latencies.append(latency)
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    elapsed = time.perf_counter() - started
+
+    print(f"\n{name}")
+    print("-" * 60)
+    print(f"  signups/s : {len(emails) / elapsed:10.1f}")
+    print(f"  p50 (ms)  : {percentile(latencies, 50) * 1000:10.2f}")
+    print(f"  p95 (ms)  : {percentile(latencies, 95) * 1000:10.2f}")
+    print(f"  p99 (ms)  : {percentile(latencies, 99) * 1000:10.2f}")
+    print(f"  mean (ms) : {statistics.mean(latencies) * 1000:10.2f}")
+    print(f"  outcomes  : {outcomes}")
+    return len(emails) / elapsed
+
+
+def make_emails(prefix, count, duplicate_pct):
+    emails = [f"{prefix}-{i}@bench.invalid" for i in range(count)]
+    duplicates = int(count * duplicate_pct / 100)
+    for i in random.sample(range(1, count), min(duplicates, count - 1)):
+        # Reuse an earlier email so the attempt hits the duplicate path
+        emails[i] = emails[random.randrange(0, i)]
+    return emails
+
+
+def cleanup(prefix):
+    conn = get_connection()
+    if not conn:
+        return
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM users WHERE email LIKE %s", (f"{prefix}-%@bench.invalid",))
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark bulk user registration")
+    parser.add_argument("--users", type=int, default=1000, help="signups per path")
+    parser.add_argument("--concurrency", type=int, default=16, help="parallel signups")
+    parser.add_argument("--duplicates", type=float, default=10, help="percent duplicate emails")
+    args = parser.parse_args()
+
+    if not get_connection():
+        print("❌ Could not connect to database")
+        sys.exit(1)
+
+    password_hash = generate_password_hash("BenchPass123")
+    run_id = uuid.uuid4().hex[:8]
+    legacy_prefix, single_prefix = f"legacy-{run_id}", f"single-{run_id}"
+
+    print("=" * 60)
+    print(f"Signup load: {args.users} signups/path, concurrency {args.concurrency}")
+    print("=" * 60)
+    try:
+        legacy = run(
+            "Legacy (SELECT then INSERT)",
+            legacy_signup,
+            make_emails(legacy_prefix, args.users, args.duplicates),
+            password_hash,
+            args.concurrency,
+        )
+        single = run(
+            "Single statement (INSERT, unique index)",
+            single_statement_signup,
+            make_emails(single_prefix, args.users, args.duplicates),
+            password_hash,
+            args.concurrency,
+        )
+    finally:
+        cleanup(legacy_prefix)
+        cleanup(single_prefix)
+
+    print("\n" + "=" * 60)
+    print(f"Throughput gain: {single / legacy:.2f}x")
+    print("=" * 60)
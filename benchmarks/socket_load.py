@@ -0,0 +1,420 @@
+"""
+Socket.IO load benchmark: many concurrent chat clients against a running backend.
+
+Creates --clients throwaway accounts and --rooms rooms straight in the
+database, mints access tokens for them with JWT_SECRET_KEY, then connects
+every client over WebSocket. Each client goes online, joins a room and, until
+--duration runs out, sends messages (--message-rate per second), emits typing
+indicators (--typing-rate) and occasionally disconnects and rejoins
+(--reconnect-rate). Message contents carry their send time, so every
+delivery to every room member yields an end-to-end latency sample.
+
+Reports send/delivery throughput, p50/p95/p99 delivery latency and the
+server's CPU and memory use, and saves everything to
+benchmarks/results/socket_load-<commit>-<time>.json. --compare latest (or a
+path) prints the difference against an earlier run.
+
+The backend is either started by the benchmark (--spawn, against the
+database configured in .env) or already running (--url, with --server-pid to
+sample its resources). Needs python-socketio's asyncio client
+(pip install "python-socketio[asyncio_client]"); psutil is used for resource
+sampling when installed, /proc otherwise. Thousands of clients need a raised
+open-file limit (ulimit -n).
+
+    python benchmarks/socket_load.py --spawn --clients 1000 --rooms 50 --duration 60
+    python benchmarks/socket_load.py --url http://localhost:5000 --server-pid 1234 --compare latest
+"""
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import jwt
+import socketio
+from dotenv import load_dotenv
+from werkzeug.security import generate_password_hash
+
+from bench_results import change, load_baseline, save_result
+from config.database import get_connection
+from models.room_model import create_room, purge_room, soft_delete_rooms
+from models.user_model import register_user
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+load_dotenv(PROJECT_ROOT / ".env")
+
+_SAMPLE_ERRORS = (OSError, IndexError, ValueError) + ((psutil.Error,) if psutil else ())
+MARKER = "bench"
+
+
+# --- Fixtures -----------------------------------------------------------------
+
+
+def create_fixtures(run_id, clients, rooms):
+    """Create the benchmark's users and rooms; returns (user ids, room ids)."""
+    password_hash = generate_password_hash("BenchPass123")
+
+    def one(i):
+        profile, _ = register_user(
+            f"load-{run_id}-{i}@bench.invalid", password_hash, "Load", f"Client{i}"
+        )
+        return profile["id"] if profile else None
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        user_ids = [user_id for user_id in pool.map(one, range(clients)) if user_id]
+    room_ids = [
+        room_id
+        for room_id in (create_room(f"load-{run_id}-{i}", user_ids[0]) for i in range(rooms))
+        if room_id
+    ]
+    return user_ids, room_ids
+
+
+def cleanup(run_id, room_ids):
+    # purge_room only removes rooms that were soft-deleted first
+    if room_ids:
+        soft_delete_rooms(room_ids)
+    for room_id in room_ids:
+        purge_room(room_id)
+    conn = get_connection()
+    if not conn:
+        return
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM users WHERE email LIKE %s", (f"load-{run_id}-%@bench.invalid",))
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def mint_token(user_id, lifetime):
+    """An access token equivalent to what /auth/login issues."""
+    now = int(time.time())
+    claims = {
+        "sub": str(user_id),
+        "type": "access",
+        "fresh": False,
+        "jti": str(uuid.uuid4()),
+        "iat": now,
+        "nbf": now,
+        "exp": now + lifetime,
+    }
+    return jwt.encode(claims, os.getenv("JWT_SECRET_KEY", "change-me"), algorithm="HS256")
+
+
+# --- Server -------------------------------------------------------------------
+
+
+def spawn_server(port):
+    """Start the backend without the debug reloader so its pid is the server's."""
+    code = (
+        "from app import create_app; app, socketio = create_app(); "
+        f"socketio.run(app, host='127.0.0.1', port={port}, allow_unsafe_werkzeug=True)"
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-c", code],
+        cwd=PROJECT_ROOT / "backend",
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("backend exited during startup")
+        try:
+            with urllib.request.urlopen(url + "/health", timeout=1):
+                return process, url
+        except OSError:
+            time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError("backend did not become healthy within 30s")
+
+
+class ProcessSampler:
+    """CPU percent and RSS of one process, via psutil or /proc."""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.cpu = []
+        self.rss = []
+        self._process = psutil.Process(pid) if psutil else None
+        self._last = None
+
+    def _proc_times(self):
+        with open(f"/proc/{self.pid}/stat") as fh:
+            fields = fh.read().rsplit(")", 1)[1].split()
+        ticks = os.sysconf("SC_CLK_TCK")
+        cpu_seconds = (int(fields[11]) + int(fields[12])) / ticks
+        rss = int(fields[21]) * os.sysconf("SC_PAGE_SIZE")
+        return cpu_seconds, rss
+
+    def sample(self):
+        try:
+            if self._process is not None:
+                self.cpu.append(self._process.cpu_percent(None))
+                self.rss.append(self._process.memory_info().rss)
+                return
+            cpu_seconds, rss = self._proc_times()
+        except _SAMPLE_ERRORS:
+            return
+        now = time.monotonic()
+        if self._last is not None:
+            self.cpu.append(100 * (cpu_seconds - self._last[1]) / (now - self._last[0]))
+        self._last = (now, cpu_seconds)
+        self.rss.append(rss)
+
+    async def run(self, stop):
+        self.sample()
+        while not stop.is_set():
+            await asyncio.sleep(1)
+            self.sample()
+
+    def summary(self):
+        if not self.rss:
+            return None
+        cpu = self.cpu[1:] if psutil else self.cpu  # psutil's first reading is 0
+        return {
+            "cpu_avg_pct": round(sum(cpu) / len(cpu), 1) if cpu else None,
+            "cpu_max_pct": round(max(cpu), 1) if cpu else None,
+            "rss_start_mb": round(self.rss[0] / 2**20, 1),
+            "rss_max_mb": round(max(self.rss) / 2**20, 1),
+        }
+
+
+# --- Clients ------------------------------------------------------------------
+
+
+class Stats:
+    def __init__(self):
+        self.sent = 0
+        self.delivered = 0
+        self.typing = 0
+        self.reconnects = 0
+        self.connect_errors = 0
+        self.server_errors = 0
+        self.latencies = []
+
+
+async def connect(url, token, room_id, run_id, stats, timeout):
+    """Connect one client, go online and join its room; returns the client or None."""
+    client = socketio.AsyncClient(reconnection=False)
+    joined = asyncio.Event()
+
+    @client.on("joined_room")
+    async def on_joined(data):
+        joined.set()
+
+    @client.on("new_message")
+    async def on_message(data):
+        parts = (data.get("content") or "").split(":", 3)
+        if len(parts) >= 3 and parts[0] == MARKER and parts[1] == run_id:
+            stats.delivered += 1
+            stats.latencies.append(time.time() - float(parts[2]))
+
+    @client.on("error")
+    async def on_error(data):
+        stats.server_errors += 1
+
+    try:
+        await client.connect(f"{url}?token={token}", transports=["websocket"], wait_timeout=timeout)
+        await client.emit("user_online")
+        await client.emit("join_room", {"room_id": room_id})
+        await asyncio.wait_for(joined.wait(), timeout)
+        return client
+    except (socketio.exceptions.SocketIOError, asyncio.TimeoutError, OSError):
+        stats.connect_errors += 1
+        try:
+            await client.disconnect()
+        except Exception:
+            pass
+        return None
+
+
+async def run_client(url, token, room_id, run_id, args, stats, start_at, end_at):
+    await asyncio.sleep(max(0.0, start_at - time.monotonic()))
+    client = await connect(url, token, room_id, run_id, stats, args.timeout)
+    if client is None:
+        return
+
+    padding = "x" * max(0, args.message_size - 40)
+    total_rate = args.message_rate + args.typing_rate + args.reconnect_rate
+    while total_rate > 0:
+        await asyncio.sleep(random.expovariate(total_rate))
+        if time.monotonic() >= end_at:
+            break
+        roll = random.uniform(0, total_rate)
+        if roll < args.message_rate:
+            content = f"{MARKER}:{run_id}:{time.time():.6f}:{padding}"
+            await client.emit("send_message", {"room_id": room_id, "content": content})
+            stats.sent += 1
+        elif roll < args.message_rate + args.typing_rate:
+            await client.emit("typing", {"room_id": room_id, "is_typing": True})
+            stats.typing += 1
+        else:
+            await client.disconnect()
+            stats.reconnects += 1
+            client = await connect(url, token, room_id, run_id, stats, args.timeout)
+            if client is None:
+                return
+
+    # Let in-flight broadcasts arrive before leaving
+    await asyncio.sleep(max(0.0, end_at + args.drain - time.monotonic()))
+    await client.disconnect()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run_load(url, tokens, room_ids, run_id, args, sampler):
+    stats = Stats()
+    now = time.monotonic()
+    end_at = now + args.ramp + args.duration
+    stop = asyncio.Event()
+    sampler_task = asyncio.create_task(sampler.run(stop)) if sampler else None
+
+    tasks = [
+        run_client(
+            url,
+            token,
+            room_ids[i % len(room_ids)],
+            run_id,
+            args,
+            stats,
+            now + args.ramp * i / len(tokens),
+            end_at,
+        )
+        for i, token in enumerate(tokens)
+    ]
+    started = time.monotonic()
+    await asyncio.gather(*tasks)
+    elapsed = time.monotonic() - started - args.drain
+
+    stop.set()
+    if sampler_task:
+        await sampler_task
+
+    latencies = stats.latencies
+    result = {
+        "clients": len(tokens),
+        "rooms": len(room_ids),
+        "elapsed_seconds": round(elapsed, 1),
+        "messages_sent": stats.sent,
+        "messages_delivered": stats.delivered,
+        "typing_events": stats.typing,
+        "reconnects": stats.reconnects,
+        "connect_errors": stats.connect_errors,
+        "server_errors": stats.server_errors,
+        "send_rate": round(stats.sent / elapsed, 1),
+        "delivery_rate": round(stats.delivered / elapsed, 1),
+    }
+    if latencies:
+        result.update(
+            {
+                "latency_p50_ms": round(percentile(latencies, 50) * 1000, 2),
+                "latency_p95_ms": round(percentile(latencies, 95) * 1000, 2),
+                "latency_p99_ms": round(percentile(latencies, 99) * 1000, 2),
+                "latency_max_ms": round(max(latencies) * 1000, 2),
+            }
+        )
+    server = sampler.summary() if sampler else None
+    if server:
+        result.update(server)
+    return result
+
+
+# --- Results ------------------------------------------------------------------
+
+
+def print_result(result, baseline=None):
+    for key, value in result.items():
+        print(f"  {key:<20}: {str(value):>12}   {change(value, (baseline or {}).get(key))}".rstrip())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the Socket.IO chat backend")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", default="http://localhost:5000", help="running backend")
+    target.add_argument("--spawn", action="store_true", help="start a backend for the run")
+    parser.add_argument("--port", type=int, default=5055, help="port for --spawn")
+    parser.add_argument("--server-pid", type=int, help="pid to sample CPU/memory of (with --url)")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--rooms", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="seconds of steady load")
+    parser.add_argument("--ramp", type=float, default=10, help="seconds over which clients connect")
+    parser.add_argument("--drain", type=float, default=2, help="seconds to wait for late deliveries")
+    parser.add_argument("--message-rate", type=float, default=0.2, help="messages/s per client")
+    parser.add_argument("--typing-rate", type=float, default=0.5, help="typing events/s per client")
+    parser.add_argument("--reconnect-rate", type=float, default=0.005, help="reconnects/s per client")
+    parser.add_argument("--message-size", type=int, default=80, help="message length in chars")
+    parser.add_argument("--timeout", type=float, default=10, help="connect/join timeout")
+    parser.add_argument("--compare", help="'latest' or a saved result file to compare against")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    if not get_connection():
+        print("❌ Could not connect to database")
+        sys.exit(1)
+
+    run_id = uuid.uuid4().hex[:8]
+    print("=" * 60)
+    print(f"Socket load: {args.clients} clients, {args.rooms} rooms, {args.duration:.0f}s")
+    print("=" * 60)
+
+    user_ids, room_ids = create_fixtures(run_id, args.clients, args.rooms)
+    if not user_ids or not room_ids:
+        print("❌ Could not create benchmark users/rooms")
+        cleanup(run_id, room_ids)
+        sys.exit(1)
+    print(f"✓ Created {len(user_ids)} users and {len(room_ids)} rooms")
+
+    server = None
+    try:
+        url, pid = args.url, args.server_pid
+        if args.spawn:
+            server, url = spawn_server(args.port)
+            pid = server.pid
+            print(f"✓ Backend started at {url} (pid {pid})")
+
+        lifetime = int(args.ramp + args.duration + args.drain + 600)
+        tokens = [mint_token(user_id, lifetime) for user_id in user_ids]
+        sampler = ProcessSampler(pid) if pid else None
+        result = asyncio.run(run_load(url, tokens, room_ids, run_id, args, sampler))
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=10)
+        cleanup(run_id, room_ids)
+
+    params = {key: value for key, value in vars(args).items() if key not in ("compare", "no_save")}
+    saved = None if args.no_save else save_result("socket_load", params, result)
+    baseline_path, baseline = (
+        load_baseline("socket_load", args.compare, saved) if args.compare else (None, None)
+    )
+
+    print("\nResults" + (f" (vs {baseline_path.name})" if baseline else ""))
+    print("-" * 60)
+    print_result(result, baseline)
+    if not sampler:
+        print("⚠️  No server pid - CPU/memory not sampled (use --spawn or --server-pid)")
+    if saved:
+        print(f"\n📂 Saved: {saved.relative_to(PROJECT_ROOT)}")
+    print("=" * 60)
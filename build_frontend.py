@@ -0,0 +1,162 @@
+"""
+Build the frontend for production into frontend/dist.
+
+- CSS and JS are minified and renamed with a content hash
+  (js/chat.js -> js/chat.<hash>.js), and the HTML pages are rewritten to
+  point at the new names. A manifest.json maps original to built names.
+- Every text asset gets .gz and (if the `brotli` package is installed) .br
+  siblings, which the backend's /app/ handler serves by Accept-Encoding.
+
+Uses rjsmin / rcssmin for minification when installed; otherwise falls back
+to a conservative whitespace and comment stripper.
+
+    python build_frontend.py
+"""
+
+import gzip
+import hashlib
+import json
+import re
+import shutil
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+SOURCE = Path(__file__).parent / "frontend"
+DIST = SOURCE / "dist"
+HASH_LENGTH = 16
+COMPRESSIBLE = {".html", ".css", ".js", ".json", ".svg", ".txt"}
+
+
+def minify_css(text):
+    if rcssmin:
+        return rcssmin.cssmin(text)
+    text = re.sub(r"/\*.*?\*/", "", text, flags=re.S)
+    text = re.sub(r"\s+", " ", text)
+    parts = re.split(r"([{};])", text)
+    for index, part in enumerate(parts):
+        if part in ("{", "}", ";"):
+            continue
+        if index + 1 < len(parts) and parts[index + 1] == "{":
+            # A selector or @-rule: the space in "a :hover" is a descendant
+            # combinator, so whitespace around ":" stays
+            parts[index] = re.sub(r"\s*([,>])\s*", r"\1", part).strip()
+        else:
+            parts[index] = re.sub(r"\s*([:,])\s*", r"\1", part).strip()
+    return "".join(parts).replace(";}", "}").strip()
+
+
+def minify_js(text):
+    if rjsmin:
+        return rjsmin.jsmin(text)
+    # Conservative: only indentation, blank lines and whole-line // comments
+    lines = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("//"):
+            continue
+        lines.append(stripped)
+    return "\n".join(lines) + "\n"
+
+
+def minify_html(text):
+    return "\n".join(line.strip() for line in text.splitlines() if line.strip()) + "\n"
+
+
+def fingerprint(relative, data):
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    return relative.with_name(f"{relative.stem}.{digest}{relative.suffix}")
+
+
+def precompress(path):
+    data = path.read_bytes()
+    with open(path.with_name(path.name + ".gz"), "wb") as fh:
+        with gzip.GzipFile(fileobj=fh, mode="wb", compresslevel=9, mtime=0) as gz:
+            gz.write(data)
+    if brotli:
+        path.with_name(path.name + ".br").write_bytes(
+            brotli.compress(data, quality=11)
+        )
+
+
+def build():
+    if DIST.exists():
+        shutil.rmtree(DIST)
+    DIST.mkdir(parents=True)
+
+    manifest = {}
+    pages = []
+    for path in sorted(SOURCE.rglob("*")):
+        if not path.is_file() or DIST in path.parents:
+            continue
+        relative = path.relative_to(SOURCE)
+
+        if path.suffix == ".html":
+            pages.append(relative)
+            continue
+
+        data = path.read_bytes()
+        if path.suffix == ".css":
+            data = minify_css(data.decode("utf-8")).encode("utf-8")
+        elif path.suffix == ".js":
+            data = minify_js(data.decode("utf-8")).encode("utf-8")
+        else:
+            target = DIST / relative
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(path, target)
+            continue
+
+        built = fingerprint(relative, data)
+        target = DIST / built
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+        manifest[relative.as_posix()] = built.as_posix()
+
+    # Point pages at the fingerprinted assets
+    reference = re.compile(r'((?:src|href)=["\'])([^"\']+)(["\'])')
+    for relative in pages:
+        html = (SOURCE / relative).read_text(encoding="utf-8")
+        html = reference.sub(
+            lambda m: m.group(1) + manifest.get(m.group(2), m.group(2)) + m.group(3), html
+        )
+        target = DIST / relative
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(minify_html(html), encoding="utf-8")
+
+    (DIST / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+    for path in DIST.rglob("*"):
+        if path.is_file() and path.suffix in COMPRESSIBLE:
+            precompress(path)
+    return manifest
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Build Frontend")
+    print("=" * 60)
+
+    manifest = build()
+    source_bytes = sum(p.stat().st_size for p in SOURCE.rglob("*") if p.is_file() and DIST not in p.parents)
+    for original, built in manifest.items():
+        size = (DIST / built).stat().st_size
+        gz_size = (DIST / (built + ".gz")).stat().st_size
+        print(f"✓ {original:<20} -> {built:<32} {size:>7} B  gzip {gz_size:>6} B")
+    print(f"\n📂 Output: {DIST}  (sources: {source_bytes} B)")
+    if not brotli:
+        print("⚠️  brotli not installed - only .gz variants were written")
+    print("🌐 Served by the backend at http://localhost:5000/app/")
+    print("=" * 60)
@@ -0,0 +1,30 @@
+"""
+Delete avatar files that no user references any more.
+
+Superseded avatars are normally removed on upload; this sweeps up anything
+left behind (failed uploads, legacy user_<id>_<name> files, crashes).
+Files younger than an hour are kept. Safe to run from cron.
+"""
+
+import sys
+
+sys.path.insert(0, "backend")
+
+from models.user_model import get_avatar_urls
+from utils.avatar_pipeline import collect_garbage
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Avatar Cleanup")
+    print("=" * 60)
+
+    referenced = get_avatar_urls()
+    if referenced is None:
+        print("❌ Could not read avatar URLs - nothing deleted")
+        sys.exit(1)
+
+    removed = collect_garbage(referenced)
+    print(f"✓ Avatars in use:       {len(referenced)}")
+    print(f"✓ Unused files removed: {removed}")
+    print("=" * 60)
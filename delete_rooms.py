@@ -7,11 +7,18 @@ import sys
 sys.path.insert(0, "backend")
 
 from config.database import get_connection
+from models import message_archive
+from models.room_model import purge_room, soft_delete_rooms
+import argparse
 import mysql.connector
 
 
-def delete_rooms():
-    """Delete General chat and admin-related rooms."""
+def delete_rooms(choice=None, chunk_size=1000):
+    """Delete General chat and admin-related rooms.
+
+    ``choice`` is a comma-separated list of room IDs or 'all'; when omitted
+    the rooms are listed and the user is asked interactively.
+    """
     conn = get_connection()
     if not conn:
         print("❌ Could not connect to database")
@@ -21,7 +28,7 @@ def delete_rooms():
         cursor = conn.cursor(dictionary=True)
 
         # First, show all rooms
-        cursor.execute("SELECT id, name, created_by FROM rooms")
+        cursor.execute("SELECT id, name, created_by FROM rooms WHERE deleted_at IS NULL")
         rooms = cursor.fetchall()
 
         print("\n📋 Current Rooms:")
@@ -36,13 +43,14 @@ def delete_rooms():
             print("\n✓ No rooms found in database")
             return True
 
-        # Ask which rooms to delete
-        print("\n🗑️  Which rooms do you want to delete?")
-        print("Enter room IDs separated by commas (e.g., 1,2,3)")
-        print("Or type 'all' to delete all rooms")
-        print("Or press Enter to cancel")
+        if choice is None:
+            # Ask which rooms to delete
+            print("\n🗑️  Which rooms do you want to delete?")
+            print("Enter room IDs separated by commas (e.g., 1,2,3)")
+            print("Or type 'all' to delete all rooms")
+            print("Or press Enter to cancel")
 
-        choice = input("\nYour choice: ").strip()
+            choice = input("\nYour choice: ").strip()
 
         if not choice:
             print("\n❌ Cancelled - no rooms deleted")
@@ -57,34 +65,35 @@ def delete_rooms():
                 print("\n❌ Invalid input - please enter numbers separated by commas")
                 return False
 
-        # Delete the rooms
-        deleted_count = 0
+        # Hide the rooms first, then purge their messages in small chunks so a
+        # large room never turns into one huge transaction
+        known = {room["id"]: room["name"] for room in rooms}
         for room_id in room_ids:
-            # Check if room exists
-            cursor.execute("SELECT name FROM rooms WHERE id = %s", (room_id,))
-            room = cursor.fetchone()
-
-            if room:
-                # Delete messages first (due to foreign key)
-                cursor.execute("DELETE FROM messages WHERE room_id = %s", (room_id,))
-                messages_deleted = cursor.rowcount
-
-                # Delete the room
-                cursor.execute("DELETE FROM rooms WHERE id = %s", (room_id,))
-
-                print(
-                    f"✓ Deleted room '{room['name']}' (ID: {room_id}) and {messages_deleted} messages"
-                )
-                deleted_count += 1
-            else:
+            if room_id not in known:
                 print(f"⚠️  Room ID {room_id} not found")
 
-        conn.commit()
+        deleted_ids = soft_delete_rooms([rid for rid in room_ids if rid in known])
+        deleted_count = 0
+        for room_id in deleted_ids:
+
+            def progress(purged, room_id=room_id):
+                print(f"  … room {room_id}: {purged} messages purged", end="\r")
+
+            messages_deleted = purge_room(room_id, chunk_size=chunk_size, progress=progress)
+            if messages_deleted is None:
+                print(f"\n❌ Failed to purge room ID {room_id}; the backend resumes it on next start")
+                continue
+            # Archived messages live in segment files, not in the messages table
+            message_archive.delete_archive("rooms", room_id)
+            print(
+                f"✓ Deleted room '{known[room_id]}' (ID: {room_id}) and {messages_deleted} messages"
+            )
+            deleted_count += 1
 
         print(f"\n✓ Successfully deleted {deleted_count} room(s)")
 
         # Show remaining rooms
-        cursor.execute("SELECT id, name FROM rooms")
+        cursor.execute("SELECT id, name FROM rooms WHERE deleted_at IS NULL")
         remaining = cursor.fetchall()
 
         if remaining:
@@ -107,11 +116,18 @@ def delete_rooms():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete chat rooms and their messages")
+    parser.add_argument("--ids", help="comma-separated room IDs, or 'all' (skips the prompt)")
+    parser.add_argument(
+        "--chunk-size", type=int, default=1000, help="messages deleted per transaction"
+    )
+    args = parser.parse_args()
+
     print("=" * 60)
     print("Delete Chat Rooms")
     print("=" * 60)
 
-    success = delete_rooms()
+    success = delete_rooms(args.ids, args.chunk_size)
 
     print("=" * 60)
     if success:
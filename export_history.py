@@ -0,0 +1,95 @@
+"""
+Export or import chat history as NDJSON (one message per line).
+
+Examples:
+    python export_history.py export --room 3 -o room3.ndjson.gz --gzip
+    python export_history.py export --user 7 > user7.ndjson
+    python export_history.py import room3.ndjson.gz --room-id 12
+
+Exports stream through a server-side cursor, so memory use stays flat no
+matter how large the room is. Imports use batched multi-row INSERTs.
+"""
+
+import sys
+
+sys.path.insert(0, "backend")
+
+import argparse
+
+from utils.history_io import (
+    gzip_stream,
+    import_history,
+    iter_room_history,
+    iter_user_history,
+    read_ndjson,
+    to_ndjson,
+)
+
+
+def export(args):
+    records = iter_room_history(args.room) if args.room else iter_user_history(args.user)
+    chunks = to_ndjson(records)
+    if args.gzip:
+        chunks = gzip_stream(chunks)
+
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+    print("✓ Export finished", file=sys.stderr)
+    return True
+
+
+def import_(args):
+    stream = open(args.input, "rb") if args.input != "-" else sys.stdin.buffer
+    try:
+        counts = import_history(
+            read_ndjson(stream),
+            room_id=args.room_id,
+            keep_ids=args.keep_ids,
+            batch_size=args.batch_size,
+        )
+    finally:
+        if args.input != "-":
+            stream.close()
+
+    if counts is None:
+        print("❌ Import failed - check the errors above", file=sys.stderr)
+        return False
+    error = counts.pop("error", None)
+    if error:
+        print(f"❌ Import stopped: {error} - counts below were committed", file=sys.stderr)
+    print(f"✓ Room messages imported:    {counts['room_messages']}", file=sys.stderr)
+    print(f"✓ Private messages imported: {counts['private_messages']}", file=sys.stderr)
+    if counts["skipped"]:
+        print(f"⚠️  Unknown records skipped:  {counts['skipped']}", file=sys.stderr)
+    if counts["invalid"]:
+        print(f"⚠️  Invalid lines skipped:    {counts['invalid']}", file=sys.stderr)
+    return not error
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export or import chat history as NDJSON")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    exp = sub.add_parser("export", help="stream a room's or user's history")
+    who = exp.add_mutually_exclusive_group(required=True)
+    who.add_argument("--room", type=int, help="room ID to export")
+    who.add_argument("--user", type=int, help="user ID whose history to export")
+    exp.add_argument("-o", "--output", help="output file (default: stdout)")
+    exp.add_argument("--gzip", action="store_true", help="gzip the output")
+
+    imp = sub.add_parser("import", help="bulk-load an NDJSON export")
+    imp.add_argument("input", help="NDJSON file, optionally gzipped ('-' for stdin)")
+    imp.add_argument("--room-id", type=int, help="load room messages into this room")
+    imp.add_argument(
+        "--keep-ids", action="store_true", help="keep exported message ids (skips existing)"
+    )
+    imp.add_argument("--batch-size", type=int, default=1000, help="rows per INSERT")
+
+    args = parser.parse_args()
+    ok = export(args) if args.command == "export" else import_(args)
+    sys.exit(0 if ok else 1)
@@ -67,6 +67,14 @@ def fix_database():
             count = cursor.fetchone()[0]
             print(f"📊 Total messages in database: {count}")
 
+            # Backfill room activity summaries (last message, message count)
+            from models.room_model import rebuild_room_summaries
+
+            if rebuild_room_summaries():
+                print("✓ Room summaries rebuilt")
+            else:
+                print("⚠️  Could not rebuild room summaries")
+
             return True
         else:
             print("❌ Column still missing after fix attempt")
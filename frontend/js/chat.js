@@ -40,6 +40,8 @@ function checkAuth() {
     }
 
     console.log('Token found, fetching user info...');
+    scheduleTokenRefresh(token);
+
     // Get user info
     fetchUserInfo(token);
 
@@ -50,15 +52,63 @@ function checkAuth() {
     loadRooms();
 }
 
+// Exchange the refresh token for a new token pair; returns the new access token or null
+let refreshInFlight = null;
+function refreshAccessToken() {
+    if (refreshInFlight) return refreshInFlight;
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (!refreshToken) return Promise.resolve(null);
+
+    refreshInFlight = fetch(`${API_URL}/auth/refresh`, {
+        method: 'POST',
+        headers: { 'Authorization': `Bearer ${refreshToken}` }
+    })
+        .then(async (response) => {
+            if (!response.ok) return null;
+            const data = await response.json();
+            localStorage.setItem('access_token', data.access_token);
+            localStorage.setItem('refresh_token', data.refresh_token);
+            scheduleTokenRefresh(data.access_token);
+            reconnectSocket(data.access_token);
+            return data.access_token;
+        })
+        .catch(() => null)
+        .finally(() => { refreshInFlight = null; });
+    return refreshInFlight;
+}
+
+// Refresh about a minute before the access token expires
+let tokenRefreshTimer = null;
+function scheduleTokenRefresh(token) {
+    clearTimeout(tokenRefreshTimer);
+    try {
+        const payload = JSON.parse(atob(token.split('.')[1].replace(/-/g, '+').replace(/_/g, '/')));
+        const delay = Math.max(payload.exp * 1000 - Date.now() - 60000, 5000);
+        tokenRefreshTimer = setTimeout(refreshAccessToken, delay);
+    } catch (e) {
+        console.warn('Could not read token expiry', e);
+    }
+}
+
+// fetch() with the access token; refreshes once and retries on 401
+async function authFetch(url, options = {}) {
+    const withToken = (token) => ({
+        ...options,
+        headers: { ...(options.headers || {}), 'Authorization': `Bearer ${token}` }
+    });
+    let response = await fetch(url, withToken(localStorage.getItem('access_token')));
+    if (response.status === 401) {
+        const token = await refreshAccessToken();
+        if (token) response = await fetch(url, withToken(token));
+    }
+    return response;
+}
+
 // Fetch current user info
 async function fetchUserInfo(token) {
     try {
         console.log('Fetching user info from:', `${API_URL}/auth/me`);
-        const response = await fetch(`${API_URL}/auth/me`, {
-            headers: {
-                'Authorization': `Bearer ${token}`
-            }
-        });
+        const response = await authFetch(`${API_URL}/auth/me`);
 
         console.log('Response status:', response.status);
 
@@ -110,6 +160,14 @@ async function fetchUserInfo(token) {
     }
 }
 
+// Reconnect the socket with a fresh access token (the token is sent on the handshake)
+function reconnectSocket(token) {
+    if (!socket) return;
+    socket.io.opts.query = { token: token };
+    socket.disconnect();
+    socket.connect();
+}
+
 // Connect to Socket.IO server
 function connectSocket(token) {
     socket = io(API_URL, {
@@ -123,6 +181,16 @@ function connectSocket(token) {
 
         // Notify server that user is online
         socket.emit('user_online');
+
+        // Rejoin the open conversation after a reconnect (e.g. token refresh)
+        if (isPrivateChat && currentPrivateChat && currentUser) {
+            socket.emit('join_private_chat', {
+                room_id: getPrivateRoomId(currentUser.id, currentPrivateChat.id),
+                other_user_id: currentPrivateChat.id
+            });
+        } else if (currentRoom) {
+            socket.emit('join_room', { room_id: currentRoom.id });
+        }
     });
 
     socket.on('disconnect', () => {
@@ -150,6 +218,12 @@ function connectSocket(token) {
         }
         // Don't show notification when switching rooms - it's less intrusive
         // User already knows they're joining a room by clicking on it
+
+        // History is only served to members, so request it once the join is confirmed
+        if (currentRoom && currentRoom.id == data.room_id) {
+            console.log('Requesting message history for room:', data.room_id);
+            socket.emit('get_messages', { room_id: data.room_id, limit: 50 });
+        }
     });
 
     socket.on('user_joined', (data) => {
@@ -200,6 +274,14 @@ function connectSocket(token) {
         }
     });
 
+    // A message delivered while the database was down has now been stored
+    socket.on('message_saved', (data) => {
+        const messageEl = document.querySelector(`[data-message-id="spool-${data.spool_id}"]`);
+        if (messageEl) {
+            messageEl.dataset.messageId = data.message.id;
+        }
+    });
+
     // Message deletion events
     socket.on('message_deleted', (data) => {
         console.log('Message deleted:', data);
@@ -250,6 +332,10 @@ function connectSocket(token) {
     // Error handling
     socket.on('error', (data) => {
         console.error('Socket error:', data);
+        if (data && data.message === 'Token has expired') {
+            refreshAccessToken().then((token) => { if (!token) logout(); });
+            return;
+        }
         showNotification(data.message || 'An error occurred', 'error');
     });
 
@@ -310,14 +396,8 @@ function updateConnectionStatus(connected) {
 
 // Load all rooms
 async function loadRooms() {
-    const token = localStorage.getItem('access_token');
-
     try {
-        const response = await fetch(`${API_URL}/chat/rooms`, {
-            headers: {
-                'Authorization': `Bearer ${token}`
-            }
-        });
+        const response = await authFetch(`${API_URL}/chat/rooms`);
 
         if (response.ok) {
             const data = await response.json();
@@ -440,11 +520,8 @@ function selectRoom(roomId, roomName) {
 
     console.log('Joining room:', roomId);
     // Join room via Socket.IO
+    // Message history is requested from the joined_room handler
     socket.emit('join_room', { room_id: roomId });
-
-    console.log('Requesting message history for room:', roomId);
-    // Load message history
-    socket.emit('get_messages', { room_id: roomId, limit: 50 });
 }
 
 // Display message history
@@ -476,7 +553,8 @@ function displayMessage(message, animate = true) {
 
     const messageEl = document.createElement('div');
     messageEl.className = `message ${isOwn ? 'own' : ''}`;
-    messageEl.dataset.messageId = message.id;
+    // Messages spooled while the database is down have no id until message_saved
+    messageEl.dataset.messageId = message.id ?? `spool-${message.spool_id}`;
     if (!animate) messageEl.style.animation = 'none';
 
     // Check if message is deleted
@@ -887,13 +965,10 @@ async function createRoom() {
         return;
     }
 
-    const token = localStorage.getItem('access_token');
-
     try {
-        const response = await fetch(`${API_URL}/chat/rooms`, {
+        const response = await authFetch(`${API_URL}/chat/rooms`, {
             method: 'POST',
             headers: {
-                'Authorization': `Bearer ${token}`,
                 'Content-Type': 'application/json'
             },
             body: JSON.stringify({ name: name })
@@ -926,14 +1001,9 @@ async function deleteRoom(roomId, roomName) {
         return;
     }
 
-    const token = localStorage.getItem('access_token');
-
     try {
-        const response = await fetch(`${API_URL}/chat/rooms/${roomId}`, {
-            method: 'DELETE',
-            headers: {
-                'Authorization': `Bearer ${token}`
-            }
+        const response = await authFetch(`${API_URL}/chat/rooms/${roomId}`, {
+            method: 'DELETE'
         });
 
         if (response.ok) {
@@ -965,8 +1035,23 @@ function logout() {
         socket.disconnect();
     }
 
-    // Clear token
+    // Revoke and clear tokens
+    clearTimeout(tokenRefreshTimer);
+    const accessToken = localStorage.getItem('access_token');
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (accessToken) {
+        fetch(`${API_URL}/auth/logout`, {
+            method: 'POST',
+            keepalive: true,
+            headers: {
+                'Authorization': `Bearer ${accessToken}`,
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ refresh_token: refreshToken })
+        }).catch(() => {});
+    }
     localStorage.removeItem('access_token');
+    localStorage.removeItem('refresh_token');
 
     // Redirect to login
     window.location.href = 'login.html';
@@ -985,28 +1070,49 @@ document.addEventListener('DOMContentLoaded', () => {
     const userSearchInput = document.getElementById('userSearchInput');
     const userSearchResults = document.getElementById('userSearchResults');
     let userSearchTimeout = null;
+    let userSearchRequestId = 0;
+    let userSearchListening = false;
 
     if (userSearchInput) {
         userSearchInput.addEventListener('input', (e) => {
             const query = e.target.value.trim();
             clearTimeout(userSearchTimeout);
+            userSearchRequestId++;
             if (query.length < 2) {
                 userSearchResults.innerHTML = '';
                 return;
             }
+            if (socket && socket.connected) {
+                // The server debounces and drops superseded queries itself
+                searchUsersLive(query);
+                return;
+            }
             userSearchTimeout = setTimeout(() => {
                 searchUsers(query);
             }, 300);
         });
     }
 
+    function searchUsersLive(query) {
+        if (!userSearchListening) {
+            socket.on('user_search_results', (data) => {
+                // Ignore responses to older input
+                if (data.request_id !== userSearchRequestId) return;
+                renderUserSearchResults(data.users || []);
+            });
+            socket.on('search_users_error', (data) => {
+                if (data.request_id !== userSearchRequestId) return;
+                userSearchResults.innerHTML = '<div style="color:#f87171;padding:8px;">Error searching users</div>';
+            });
+            userSearchListening = true;
+        }
+        socket.emit('search_users', { name: query, request_id: userSearchRequestId });
+    }
+
     async function searchUsers(query) {
         // Use new backend endpoint for searching users
         try {
-            const token = localStorage.getItem('access_token');
-            const response = await fetch(`${API_URL}/profile/search_users?name=${encodeURIComponent(query)}`, {
-                headers: { 'Authorization': `Bearer ${token}` }
-            });
+            const response = await authFetch(`${API_URL}/profile/search_users?name=${encodeURIComponent(query)}`);
             if (!response.ok) throw new Error('Failed to fetch users');
             const data = await response.json();
             renderUserSearchResults(data.users || []);
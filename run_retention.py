@@ -0,0 +1,30 @@
+"""
+Apply message retention policies: archive old messages and purge tombstones.
+
+Configure with MESSAGE_RETENTION_DAYS, DM_RETENTION_DAYS, TOMBSTONE_GRACE_DAYS
+and RETENTION_BATCH_SIZE (see backend/utils/retention.py). Safe to run from
+cron; each batch is archived and removed in its own short transaction.
+"""
+
+import sys
+
+sys.path.insert(0, "backend")
+
+from utils.retention import apply_retention
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Message Retention")
+    print("=" * 60)
+
+    stats = apply_retention()
+
+    print("=" * 60)
+    if stats is None:
+        print("❌ Retention run failed - check the errors above")
+        sys.exit(1)
+    print(f"✓ Room messages archived:    {stats['room_messages_archived']}")
+    print(f"✓ Private messages archived: {stats['private_messages_archived']}")
+    print(f"✓ Tombstones purged:         {stats['tombstones_purged']}")
+    print("=" * 60)
@@ -19,13 +19,21 @@ test_user = {
     "password": "TestPass123",
 }
 
+# A second user who must not be able to delete the first user's rooms
+other_user = {
+    "first_name": "Other",
+    "last_name": "Tester",
+    "email": "othertester@example.com",
+    "password": "TestPass123",
+}
 
-def test_setup():
+
+def test_setup(user=test_user):
     """Register a test user and get access token."""
-    print("\n=== Setting up test user ===")
+    print(f"\n=== Setting up test user {user['email']} ===")
 
     # Try to register
-    response = requests.post(f"{AUTH_URL}/register", json=test_user)
+    response = requests.post(f"{AUTH_URL}/register", json=user)
 
     if response.status_code == 201:
         print("✓ User registered successfully")
@@ -36,7 +44,7 @@ def test_setup():
         # Login instead
         response = requests.post(
             f"{AUTH_URL}/login",
-            json={"email": test_user["email"], "password": test_user["password"]},
+            json={"email": user["email"], "password": user["password"]},
         )
         if response.status_code == 200:
             data = response.json()
@@ -120,6 +128,43 @@ def test_get_messages(token, room_id):
         return False
 
 
+def test_delete_room_requires_creator(token, room_id):
+    """Only the creator may delete a room or follow its deletion job."""
+    print("\n=== Testing Room Deletion Permissions ===")
+
+    other_token = test_setup(other_user)
+    if not other_token:
+        print("✗ Could not set up the second user")
+        return False
+
+    owner = {"Authorization": f"Bearer {token}"}
+    other = {"Authorization": f"Bearer {other_token}"}
+
+    response = requests.delete(f"{CHAT_URL}/rooms/{room_id}", headers=other)
+    if response.status_code != 403:
+        print(f"✗ Another user's delete answered {response.status_code}, expected 403")
+        return False
+    print("✓ Another user cannot delete the room (403)")
+
+    response = requests.delete(f"{CHAT_URL}/rooms/{room_id}", headers=owner)
+    if response.status_code != 202:
+        print(f"✗ Creator's delete failed: {response.status_code} - {response.text}")
+        return False
+    job_id = response.json()["job"]["id"]
+    print(f"✓ Creator deleted the room (job {job_id})")
+
+    response = requests.get(f"{CHAT_URL}/rooms/deletions/{job_id}", headers=other)
+    if response.status_code != 404:
+        print(f"✗ Another user can read the deletion job ({response.status_code})")
+        return False
+    response = requests.get(f"{CHAT_URL}/rooms/deletions/{job_id}", headers=owner)
+    if response.status_code != 200:
+        print(f"✗ Creator cannot read the deletion job ({response.status_code})")
+        return False
+    print("✓ Only the creator can follow the deletion job")
+    return True
+
+
 def test_websocket_info():
     """Display WebSocket connection info."""
     print("\n=== WebSocket Connection Info ===")
@@ -168,6 +213,10 @@ def main():
         test_get_room(token, room_id)
         test_get_messages(token, room_id)
 
+    # Deletion permissions (deletes the test room)
+    if room_id:
+        test_delete_room_requires_creator(token, room_id)
+
     # WebSocket info
     test_websocket_info()
 
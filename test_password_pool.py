@@ -0,0 +1,82 @@
+"""
+Test that password hashing workers don't boot a second copy of the backend.
+
+The hash pool's workers re-import the main module. If that started the
+message spool drainer (or the schedulers), a second drainer would delete
+spool segments the server is still writing. This script imports app like
+backend/app.py's own entry point does, boots it, hashes a password and
+inspects a worker.
+
+Run from the project root: python test_password_pool.py
+"""
+
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+# Keep this run's spool away from the real one
+os.environ.setdefault("SPOOL_DIR", tempfile.mkdtemp(prefix="spool-test-"))
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+import app  # noqa: E402  (must have no side effects, also in a worker)
+
+
+def worker_state():
+    """Runs inside a hash worker: what did importing the main module start?"""
+    spool = sys.modules.get("utils.message_spool")
+    return {
+        "app_bootstrapped": app._bootstrapped,
+        "drainer": spool is not None and spool._drainer is not None,
+        "threads": threading.active_count(),
+    }
+
+
+def test_hash_does_not_start_second_drainer():
+    """Hash a password with the server booted, then look inside a worker."""
+    print("\n=== Hash workers don't boot the backend ===")
+
+    app.create_app()
+    from utils import message_spool, password_hashing
+
+    # register_socket_events starts it; make sure it runs even without a database
+    message_spool.start_drainer(lambda entry: True)
+
+    password_hash = password_hashing.hash_password("TestPass123")
+    if not password_hashing.verify_password(password_hash, "TestPass123"):
+        print("✗ Hash did not verify")
+        return False
+
+    state = password_hashing._run(worker_state)
+    ok = True
+    if state["app_bootstrapped"]:
+        print("✗ Worker ran create_app()")
+        ok = False
+    if state["drainer"]:
+        print("✗ Worker started a second spool drainer")
+        ok = False
+    if state["threads"] != 1:
+        print(f"✗ Worker runs {state['threads']} threads, expected 1")
+        ok = False
+    if ok:
+        print("✓ Worker imported app without starting anything")
+    return ok
+
+
+def main():
+    """Run all tests."""
+    print("=" * 50)
+    print("Password Pool Test")
+    print("=" * 50)
+
+    ok = test_hash_does_not_start_second_drainer()
+
+    print("\n" + "=" * 50)
+    print("Test Complete" if ok else "Test FAILED")
+    print("=" * 50)
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)